@@ -0,0 +1,112 @@
+import ast
+import json
+import os
+import re
+
+########
+# enrichment results of sus_asn_detection.py, one ASN per line
+# written as JSON lines with a fixed flat schema (ANALYSIS_FIELDS), e.g.
+#   {"asn": 1, "rpki_status": "unknown", "rir": "ASSIGNED", "ipv4_visibility": "visible", "ipv6_visibility": "invisible", "as_path": 5.39}
+# the older output/asn_analysis_results_<year>.txt files hold one repr'd analysis dict per line and are read the same way
+# (python analysisresults.py writes a .jsonl next to each of them)
+# load_results reads every year into one pandas DataFrame with categorical status columns (pandas is imported on first use)
+########
+
+ANALYSIS_FIELDS = ("asn", "rpki_status", "rir", "ipv4_visibility", "ipv6_visibility", "as_path")
+STATUS_FIELDS = ("rpki_status", "rir", "ipv4_visibility", "ipv6_visibility")
+RESULTS_FILENAME = re.compile(r"^asn_analysis_results_(\d{4})\.(jsonl|txt)$")
+
+def results_filename(year, folder="output"):
+	return os.path.join(folder, f"asn_analysis_results_{year}.jsonl")
+
+def flatten_analysis(analysis):
+	"""
+	Analysis dict of sus_asn_detection.analyze_asn -> flat record with the ANALYSIS_FIELDS.
+	Without any visibility data the analysis holds ("unknown", 0, 0) instead of a dict: that is stored as
+	ipv4_visibility "unknown" and ipv6_visibility null, so it is scored once like before.
+	"""
+	visibility = analysis.get("visibility")
+	if isinstance(visibility, dict):
+		ipv4_visibility = visibility.get("ipv4_status", "unknown")
+		ipv6_visibility = visibility.get("ipv6_status", "unknown")
+	elif isinstance(visibility, (tuple, list)) and visibility and visibility[0] == "unknown":
+		ipv4_visibility, ipv6_visibility = "unknown", None
+	else:
+		ipv4_visibility = ipv6_visibility = None
+	rir = analysis.get("rir")
+	return {
+		"asn": int(analysis["asn"]),
+		"rpki_status": analysis.get("rpki_status"),
+		"rir": rir if isinstance(rir, str) else None,
+		"ipv4_visibility": ipv4_visibility,
+		"ipv6_visibility": ipv6_visibility,
+		"as_path": analysis.get("as_path"),
+	}
+
+def iter_results(path):
+	"""
+	Yield one flat record per line of a results file.
+	Lines are JSON records; repr'd analysis dicts (the old .txt output) are parsed and flattened.
+	"""
+	with open(path, "r") as file:
+		for line in file:
+			line = line.strip()
+			if not line:
+				continue
+			try:
+				record = json.loads(line)
+			except ValueError:
+				try:
+					record = ast.literal_eval(line)
+				except (ValueError, SyntaxError) as e:
+					print(f"Skipping invalid line (error: {e}): {line}")
+					continue
+			if not isinstance(record, dict) or "asn" not in record:
+				print(f"Skipping invalid line (not an analysis): {line}")
+				continue
+			yield record if "ipv4_visibility" in record else flatten_analysis(record)
+
+def list_result_files(folder="output"):
+	"""{year: path} of the yearly results files; a .jsonl file is preferred over a .txt file of the same year."""
+	files = {}
+	for filename in sorted(os.listdir(folder)):
+		match = RESULTS_FILENAME.match(filename)
+		if match and (match.group(2) == "jsonl" or int(match.group(1)) not in files):
+			files[int(match.group(1))] = os.path.join(folder, filename)
+	return dict(sorted(files.items()))
+
+def load_results(folder="output", years=None):
+	"""
+	Every yearly results file in one DataFrame: a year column plus the ANALYSIS_FIELDS,
+	the status columns as categoricals.
+	"""
+	import pandas as pd
+
+	years_column, records = [], []
+	for year, path in list_result_files(folder).items():
+		if years and year not in years:
+			continue
+		found = len(records)
+		records.extend(iter_results(path))
+		years_column.extend([year] * (len(records) - found))
+
+	table = pd.DataFrame.from_records(records, columns=ANALYSIS_FIELDS)
+	table.insert(0, "year", pd.Series(years_column, dtype="int64"))
+	table["asn"] = table["asn"].astype("int64")
+	table["as_path"] = table["as_path"].astype("float64")
+	for field in STATUS_FIELDS:
+		table[field] = table[field].astype("category")
+	return table
+
+def convert_results(path):
+	"""Write the records of an old .txt results file as JSON lines next to it; returns the new path."""
+	output_path = os.path.splitext(path)[0] + ".jsonl"
+	with open(output_path, "w") as file:
+		for record in iter_results(path):
+			file.write(json.dumps(record) + "\n")
+	return output_path
+
+if __name__ == "__main__":
+	for year, path in list_result_files("output").items():
+		if path.endswith(".txt"):
+			print(f"{path} -> {convert_results(path)}")
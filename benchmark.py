@@ -0,0 +1,479 @@
+import argparse
+import multiprocessing
+import os
+import random
+import re
+import socket
+import struct
+import time
+
+########
+# micro-benchmarks for the hot paths of the scripts
+# usage: python benchmark.py parser [--data data] [--files 200]
+#        python benchmark.py rpki [--vrps 400000] [--routes 1000000]
+#        python benchmark.py detector [--updates 400000] [--prefixes 200000]
+#        python benchmark.py mrt [--dumps fixtures/mrt] [--workers 4] [--synthetic 200000 --files 8]
+#        python benchmark.py pushdown [--bgpstream --collector route-views2 --from "..." --until "..."] [--ipversion 4]
+########
+
+def legacy_parse_file(filepath):
+	"""The positional parser that used to be copied into durationcounter / find_onesession_yearly / moasperyear."""
+	records = []
+	with open(filepath, "r") as file:
+		lines = file.readlines()
+	for i in range(9, len(lines), 2):  # Step by 2 to process prefix-origin pairs
+		if i + 1 < len(lines):  # Ensure there is a matching Origin ASNs line
+			prefix_line = lines[i].strip()
+			origin_line = lines[i + 1].strip()
+			if prefix_line.startswith("Prefix:") and origin_line.startswith("Origin ASNs:"):
+				prefix = prefix_line.split(":")[1].strip()
+				origins = set(origin_line.split(":")[1].strip().split(", "))
+				records.append((prefix, origins))
+	return records
+
+def streaming_parse_file(filepath):
+	from summaryparser import iter_prefix_records
+
+	return [(record.prefix, set(record.origins)) for record in iter_prefix_records(filepath)]
+
+def time_parser(parse_file, filepaths, repeat):
+	"""Best-of-repeat wall time and record count for parsing every file once."""
+	best = None
+	for _ in range(repeat):
+		started = time.perf_counter()
+		count = 0
+		for filepath in filepaths:
+			count += len(parse_file(filepath))
+		elapsed = time.perf_counter() - started
+		best = elapsed if best is None else min(best, elapsed)
+	return count, best
+
+def bench_parser(args):
+	from summaryparser import list_summary_files
+
+	filepaths = [os.path.join(args.data, filename) for filename in list_summary_files(args.data)]
+	if args.files:
+		filepaths = filepaths[:args.files]
+
+	print(f"Parsing {len(filepaths)} summary files, best of {args.repeat}")
+	for name, parse_file in (("legacy positional", legacy_parse_file), ("summaryparser", streaming_parse_file)):
+		count, elapsed = time_parser(parse_file, filepaths, args.repeat)
+		print(f"{name:<20}{count:>10} records{elapsed:>10.3f}s{count / elapsed:>14.0f} records/s")
+
+def random_ipv4_prefix(rng, min_length, max_length):
+	length = rng.randint(min_length, max_length)
+	net = rng.getrandbits(32) >> (32 - length) << (32 - length)
+	return f"{net >> 24}.{net >> 16 & 255}.{net >> 8 & 255}.{net & 255}/{length}"
+
+def bench_rpki(args):
+	from rpkivalidator import RpkiValidator
+
+	rng = random.Random(args.seed)
+	vrps = []
+	for _ in range(args.vrps):
+		prefix = random_ipv4_prefix(rng, 12, 24)
+		length = int(prefix.partition("/")[2])
+		vrps.append((prefix, min(24, length + rng.choice((0, 0, 2, 8))), rng.randint(1, 65000)))
+
+	# Routes: mostly more-specifics of VRP prefixes with the right or a wrong origin, the rest random /24s
+	routes = []
+	for _ in range(args.routes):
+		if rng.random() < 0.7:
+			prefix, _, asn = rng.choice(vrps)
+			address, _, length = prefix.partition("/")
+			prefix = f"{address}/{min(24, int(length) + rng.randint(0, 4))}"
+		else:
+			prefix, asn = random_ipv4_prefix(rng, 24, 24), rng.randint(1, 65000)
+		routes.append((prefix, asn if rng.random() < 0.7 else asn + 1))
+
+	started = time.perf_counter()
+	validator = RpkiValidator(vrps)
+	load_time = time.perf_counter() - started
+	print(f"Loaded {validator.count} VRPs in {load_time:.2f}s")
+
+	started = time.perf_counter()
+	statuses = {}
+	for prefix, asn in routes:
+		status = validator.validate(prefix, asn)
+		statuses[status] = statuses.get(status, 0) + 1
+	elapsed = time.perf_counter() - started
+	print(f"Validated {len(routes)} routes in {elapsed:.2f}s ({len(routes) / elapsed:.0f} routes/s): {statuses}")
+
+class SyntheticElem:
+	__slots__ = ("type", "fields")
+
+	def __init__(self, type, fields):
+		self.type = type
+		self.fields = fields
+
+def synthetic_stream(updates, prefixes, seed):
+	"""
+	Announcements with freshly built strings, like pybgpstream elems: 90% IPv4 /24s, 10% IPv6 /48s,
+	and about 2% of announcements from a second origin.
+	"""
+	rng = random.Random(seed)
+	for _ in range(updates):
+		index = rng.randrange(prefixes)
+		if index % 10:
+			prefix = f"{index >> 16 & 255}.{index >> 8 & 255}.{index & 255}.0/24"
+		else:
+			prefix = f"2001:{index >> 16 & 0xffff:x}:{index & 0xffff:x}::/48"
+		origin = 1000 + index % 60000 + (rng.random() < 0.02)
+		yield SyntheticElem("A", {"prefix": prefix, "as-path": f"3356 1299 174 {origin}"})
+
+def legacy_detect(stream):
+	"""The main.py loop before moasdetector.py: per-prefix sets of origin strings."""
+	prefix_to_origins = {}
+	moas_events = {}
+	total_updates = 0
+	moas_count = 0
+	for elem in stream:
+		if elem.type == "A":
+			total_updates += 1
+			prefix = elem.fields.get("prefix", None)
+			as_path = elem.fields.get("as-path", None)
+			if prefix and as_path:
+				origin_asn = as_path.split()[-1]
+				if prefix not in prefix_to_origins:
+					prefix_to_origins[prefix] = set()
+				if origin_asn not in prefix_to_origins[prefix]:
+					if len(prefix_to_origins[prefix]) > 0:
+						moas_count += 1
+						if prefix not in moas_events:
+							moas_events[prefix] = list(prefix_to_origins[prefix])
+						moas_events[prefix].append(origin_asn)
+				prefix_to_origins[prefix].add(origin_asn)
+	return total_updates, moas_count, moas_events
+
+def compact_detect(stream):
+	"""The main.py loop on MOASDetector."""
+	from moasdetector import MOASDetector
+
+	detector = MOASDetector()
+	total_updates = detector.process(stream)
+	return total_updates, detector.moas_count, detector.moas_events()
+
+def sub_moas_detect(stream):
+	"""The main.py loop on MOASDetector with sub-MOAS / super-MOAS tracking (--sub-moas)."""
+	from moasdetector import MOASDetector
+
+	detector = MOASDetector(sub_moas=True)
+	total_updates = detector.process(stream)
+	return total_updates, detector.moas_count, detector.moas_events()
+
+def stream_only(stream):
+	"""Consume the stream without detecting anything, to subtract the cost of generating it."""
+	total_updates = 0
+	for elem in stream:
+		total_updates += 1
+	return total_updates, 0, {}
+
+DETECTORS = {
+	"stream only": stream_only,
+	"legacy sets": legacy_detect,
+	"moasdetector": compact_detect,
+	"+ sub-MOAS": sub_moas_detect,
+}
+
+def detector_child(name, updates, prefixes, seed, queue):
+	"""Run one detector in a fresh process so its peak RSS is not shared with the others."""
+	import resource
+
+	baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+	started = time.perf_counter()
+	total_updates, moas_count, moas_events = DETECTORS[name](synthetic_stream(updates, prefixes, seed))
+	elapsed = time.perf_counter() - started
+	peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss  # KiB on Linux
+	queue.put((total_updates, moas_count, list(moas_events.items()), elapsed, peak - baseline))
+
+def bench_detector(args):
+	context = multiprocessing.get_context("spawn")
+	print(f"Detecting MOAS in {args.updates} synthetic announcements over {args.prefixes} prefixes")
+	results = {}
+	for name in DETECTORS:
+		queue = context.Queue()
+		process = context.Process(target=detector_child, args=(name, args.updates, args.prefixes, args.seed, queue))
+		process.start()
+		results[name] = queue.get()
+		process.join()
+
+	stream_time = results["stream only"][3]
+	for name, (total_updates, moas_count, moas_events, elapsed, peak_growth) in results.items():
+		if name == "stream only":
+			print(f"{name:<16}{elapsed:>8.2f}s (subtracted below){peak_growth / 1024:>10.1f} MiB peak RSS growth")
+			continue
+		detect_time = max(elapsed - stream_time, 1e-9)
+		print(f"{name:<16}{elapsed:>8.2f}s{total_updates / detect_time:>12.0f} updates/s{peak_growth / 1024:>10.1f} MiB peak RSS growth"
+			f"{moas_count:>8} MOAS")
+	# The detector hands a pair to the sub-MOAS tracker when a prefix is first seen and on every MOAS event
+	pairs = len({(elem.fields["prefix"], elem.fields["as-path"]) for elem in synthetic_stream(args.updates, args.prefixes, args.seed)})
+	sub_moas_time = max(results["+ sub-MOAS"][3] - results["moasdetector"][3], 1e-9)
+	print(f"sub-MOAS tracker: {pairs} new (prefix, origin) pairs, {pairs / sub_moas_time:.0f} pairs/s over moasdetector")
+	if not results["legacy sets"][:3] == results["moasdetector"][:3] == results["+ sub-MOAS"][:3]:
+		print("WARNING: the detectors disagree")
+
+# MRT encoding, for the bundled fixture (fixtures/mrt) and larger synthetic dump sets
+AS_TRANS = 23456
+
+def encode_prefix(prefix):
+	address, _, length = prefix.partition("/")
+	packed = socket.inet_pton(socket.AF_INET6 if ":" in address else socket.AF_INET, address)
+	return bytes([int(length)]) + packed[:(int(length) + 7) >> 3]
+
+def encode_as_path(tokens, as_size):
+	"""AS_PATH attribute value: runs of plain ASNs as AS_SEQUENCE segments, "{a,b}" tokens as AS_SET segments."""
+	code = "I" if as_size == 4 else "H"
+	segments = []
+	sequence = []
+	for token in tokens + [None]:
+		if token is None or token.startswith("{"):
+			for start in range(0, len(sequence), 255):
+				chunk = sequence[start:start + 255]
+				segments.append(struct.pack(f">BB{len(chunk)}{code}", 2, len(chunk), *chunk))
+			sequence = []
+			if token is not None:
+				members = [int(asn) for asn in token.strip("{}").split(",")]
+				segments.append(struct.pack(f">BB{len(members)}{code}", 1, len(members), *members))
+		else:
+			sequence.append(int(token))
+	return b"".join(segments)
+
+def encode_attribute(attribute_type, value, flags=0x40):
+	if len(value) > 255:
+		return struct.pack(">BBH", flags | 0x10, attribute_type, len(value)) + value
+	return struct.pack(">BBB", flags, attribute_type, len(value)) + value
+
+def encode_update(elem_type, prefix, as_path, as_size):
+	"""BGP UPDATE message (marker included) announcing or withdrawing one prefix; IPv6 goes through MP_REACH / MP_UNREACH."""
+	ipv6 = ":" in prefix
+	withdrawn = nlri = b""
+	attributes = []
+	if elem_type == "W":
+		if ipv6:
+			attributes.append(encode_attribute(15, struct.pack(">HB", 2, 1) + encode_prefix(prefix), 0x80))
+		else:
+			withdrawn = encode_prefix(prefix)
+	else:
+		tokens = as_path.split()
+		attributes.append(encode_attribute(1, b"\x00"))  # ORIGIN IGP
+		if as_size == 2 and any(int(asn) > 0xffff for token in tokens for asn in token.strip("{}").split(",")):
+			# 2-byte session: AS_TRANS in AS_PATH, the real path in AS4_PATH
+			two_byte = [re.sub(r"\d+", lambda asn: asn.group() if int(asn.group()) <= 0xffff else str(AS_TRANS), token) for token in tokens]
+			attributes.append(encode_attribute(2, encode_as_path(two_byte, 2)))
+			attributes.append(encode_attribute(17, encode_as_path(tokens, 4), 0xc0))
+		else:
+			attributes.append(encode_attribute(2, encode_as_path(tokens, as_size)))
+		if ipv6:
+			next_hop = socket.inet_pton(socket.AF_INET6, "2001:db8::1")
+			attributes.append(encode_attribute(14, struct.pack(">HBB", 2, 1, len(next_hop)) + next_hop + b"\x00" + encode_prefix(prefix), 0x80))
+		else:
+			attributes.append(encode_attribute(3, socket.inet_pton(socket.AF_INET, "192.0.2.1")))
+			nlri = encode_prefix(prefix)
+	attributes = b"".join(attributes)
+	body = struct.pack(">H", len(withdrawn)) + withdrawn + struct.pack(">H", len(attributes)) + attributes + nlri
+	return b"\xff" * 16 + struct.pack(">HB", 19 + len(body), 2) + body
+
+def encode_record(elem_time, elem_type, prefix, as_path, peer_asn, peer_address, as_size):
+	"""One BGP4MP_ET record (MESSAGE_AS4, or MESSAGE for a 2-byte session) with microsecond timestamp."""
+	seconds = int(elem_time)
+	microseconds = round((elem_time - seconds) * 1000000)
+	ipv6_peer = ":" in peer_address
+	family = socket.AF_INET6 if ipv6_peer else socket.AF_INET
+	local_address = "2001:db8::2" if ipv6_peer else "192.0.2.2"
+	peer = struct.pack(">II" if as_size == 4 else ">HH", peer_asn, 6447) + struct.pack(">HH", 0, 2 if ipv6_peer else 1)
+	peer += socket.inet_pton(family, peer_address) + socket.inet_pton(family, local_address)
+	body = struct.pack(">I", microseconds) + peer + encode_update(elem_type, prefix, as_path, as_size)
+	return struct.pack(">IHHI", seconds, 17, 4 if as_size == 4 else 1, len(body)) + body
+
+def synthetic_updates(updates, prefixes, seed, start, span):
+	"""
+	(time, type, prefix, as_path, peer_asn, peer_address) tuples in time order over [start, start + span):
+	10% withdrawals, 10% IPv6, about 2% of announcements from a second origin, some AS sets and 32-bit origins,
+	a third of the peers on 2-byte sessions. Times have microseconds, like BGP4MP_ET records.
+	"""
+	rng = random.Random(seed)
+	peers = [(64500 + index, f"198.51.100.{index + 1}" if index % 4 else f"2001:db8:ffff::{index + 1:x}", 2 if index % 3 == 0 else 4) for index in range(12)]
+	step = span / updates
+	elems = []
+	for number in range(updates):
+		microseconds = int((number + rng.random()) * step * 1000000)
+		elem_time = start + microseconds // 1000000 + microseconds % 1000000 / 1000000
+		index = rng.randrange(prefixes)
+		if index % 10:
+			prefix = f"{index >> 16 & 255}.{index >> 8 & 255}.{index & 255}.0/24"
+		else:
+			prefix = socket.inet_ntop(socket.AF_INET6, struct.pack(">HHH10x", 0x2001, index >> 16 & 0xffff, index & 0xffff)) + "/48"  # As decoded
+		peer_asn, peer_address, as_size = rng.choice(peers)
+		if rng.random() < 0.1:
+			elems.append((elem_time, "W", prefix, None, peer_asn, peer_address, as_size))
+			continue
+		origin = 1000 + index % 60000 + (rng.random() < 0.02)
+		if index % 7 == 0:
+			origin += 200000  # 32-bit origin
+		if index % 97 == 0:
+			origin = f"{{{origin},{origin + 1}}}"
+		elems.append((elem_time, "A", prefix, f"{peer_asn} 3356 1299 {origin}", peer_asn, peer_address, as_size))
+	return elems
+
+def write_dump(path, elems):
+	"""Write elems (synthetic_updates tuples) as an MRT dump, compressed by the extension (.gz / .bz2)."""
+	import bz2
+	import gzip
+
+	os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+	opener = gzip.open if path.endswith(".gz") else bz2.open if path.endswith(".bz2") else open
+	with opener(path, "wb") as file:
+		for elem in elems:
+			file.write(encode_record(*elem))
+
+def write_dumps(folder, collector, updates, files, prefixes, seed, start=1704067200):
+	"""
+	Split synthetic updates over files consecutive 15-minute dumps (alternately .gz and .bz2) named like route-views'
+	updates.YYYYMMDD.HHMM files. Returns the elems as the decoder should yield them.
+	"""
+	elems = synthetic_updates(updates, prefixes, seed, start, files * 900)
+	for number in range(files):
+		dump_start = start + number * 900
+		name = time.strftime("updates.%Y%m%d.%H%M", time.gmtime(dump_start)) + (".gz" if number % 2 == 0 else ".bz2")
+		write_dump(os.path.join(folder, collector, name), [elem for elem in elems if dump_start <= elem[0] < dump_start + 900])
+	return [elem[:6] for elem in elems]
+
+def time_decode(paths, workers):
+	"""Wall time and elems of one full pass over the dumps, and the elems as tuples."""
+	from mrtreader import MRTStream
+
+	started = time.perf_counter()
+	stream = MRTStream(paths, workers=workers)
+	elems = [(elem.time, elem.type, elem.fields["prefix"], elem.fields.get("as-path"), elem.peer_asn, elem.peer_address) for elem in stream]
+	return time.perf_counter() - started, elems, stream.skipped
+
+def bench_mrt(args):
+	import tempfile
+
+	from moasdetector import MOASDetector
+	from mrtreader import MRTStream, list_dumps
+
+	if args.write_fixture:
+		write_dumps(args.dumps, args.collector, 10000, 2, 4000, args.seed)
+		print(f"Fixture written to {os.path.join(args.dumps, args.collector)}")
+		return
+	expected = None
+	temporary = None
+	if args.synthetic:
+		temporary = tempfile.TemporaryDirectory()
+		args.dumps = temporary.name
+		started = time.perf_counter()
+		expected = write_dumps(args.dumps, args.collector, args.synthetic, args.files, args.prefixes, args.seed)
+		print(f"Wrote {args.synthetic} synthetic updates to {args.files} dumps in {time.perf_counter() - started:.1f}s")
+
+	paths = list_dumps(args.dumps, args.collector)
+	size = sum(os.path.getsize(path) for path in paths)
+	print(f"Decoding {len(paths)} dumps ({size / 1024 / 1024:.1f} MiB compressed), best of {args.repeat}")
+	results = {}
+	for workers in dict.fromkeys((1, args.workers)):
+		best = None
+		for _ in range(args.repeat):
+			elapsed, elems, skipped = time_decode(paths, workers)
+			best = elapsed if best is None else min(best, elapsed)
+		results[workers] = elems
+		print(f"{workers} worker(s){'':<8}{len(elems):>10} elems{best:>10.2f}s{len(elems) / best:>14.0f} elems/s{skipped:>6} skipped")
+
+	started = time.perf_counter()
+	detector = MOASDetector()
+	total_updates = detector.process(MRTStream(paths, workers=args.workers))
+	elapsed = time.perf_counter() - started
+	print(f"decode + detect{'':<5}{total_updates:>10} updates{elapsed:>8.2f}s{total_updates / elapsed:>12.0f} updates/s{detector.moas_count:>8} MOAS")
+
+	if len(results) > 1 and results[1] != results[args.workers]:
+		print("WARNING: serial and parallel decoding disagree")
+	if expected is not None and results[1] != expected:
+		print("WARNING: decoded elems differ from the synthetic updates")
+	if temporary is not None:
+		temporary.cleanup()
+
+def time_filter(source, bgp_filter, args):
+	"""One pass of the main.py batch loop over the fixed window: (elems reaching Python, stream wait, loop time, detector)."""
+	from collectormetrics import TimedStream
+	from main import get_stream
+	from moasdetector import MOASDetector
+
+	stream = TimedStream(get_stream(args.from_time, args.until_time, args.collector, bgp_filter, source))
+	detector = MOASDetector()
+	total_updates = detector.process(stream)
+	return stream, total_updates, detector
+
+def bench_pushdown(args):
+	from main import stream_filter
+
+	source = None if args.bgpstream else (args.dumps, 1)
+	pushed = stream_filter(ipversion=args.ipversion, prefixes=args.prefix, peers=args.peer)
+	print(f"{args.collector} {args.from_time} to {args.until_time} from {'BGPStream' if args.bgpstream else args.dumps}, best of {args.repeat}")
+	results = {}
+	for name, bgp_filter in (("before", "type updates"), ("after", pushed)):
+		best = None
+		for _ in range(args.repeat):
+			stream, total_updates, detector = time_filter(source, bgp_filter, args)
+			if best is None or stream.loop < best[0].loop:
+				best = (stream, total_updates, detector)
+		stream, total_updates, detector = best
+		results[name] = (total_updates, detector.moas_count, detector.moas_events(), stream.loop, stream.elems)
+		print(f"{name:<8}{bgp_filter!r}")
+		print(f"{'':<8}{stream.elems:>10} elems{stream.loop:>8.2f}s ({stream.wait:.2f}s in the stream){stream.elems / stream.loop:>12.0f} elems/s"
+			f"{total_updates / stream.loop:>12.0f} announcements/s{detector.moas_count:>8} MOAS")
+	before_elems, after_elems = results["before"][4], results["after"][4]
+	print(f"{before_elems - after_elems} fewer elems reach Python ({1 - after_elems / max(before_elems, 1):.0%});"
+		f" loop time {results['after'][3] / results['before'][3]:.2f}x that of the old filter")
+	if not (args.ipversion or args.prefix or args.peer) and results["before"][:3] != results["after"][:3]:
+		print("WARNING: the pushed-down filter changed the MOAS results")
+
+def main():
+	parser = argparse.ArgumentParser(description="Benchmark the MOAS analysis hot paths")
+	subparsers = parser.add_subparsers(dest="benchmark", required=True)
+
+	parser_bench = subparsers.add_parser("parser", help="Summary log parsing: legacy positional parser vs summaryparser")
+	parser_bench.add_argument("--data", default="data", help="Folder with summary_*.txt files")
+	parser_bench.add_argument("--files", type=int, default=0, help="Only parse the first N files (0 = all)")
+	parser_bench.add_argument("--repeat", type=int, default=3, help="Number of timed repetitions")
+	parser_bench.set_defaults(func=bench_parser)
+
+	parser_bench = subparsers.add_parser("rpki", help="Offline RPKI validation of synthetic routes against synthetic VRPs")
+	parser_bench.add_argument("--vrps", type=int, default=400000, help="Number of VRPs")
+	parser_bench.add_argument("--routes", type=int, default=1000000, help="Number of (prefix, origin) routes to validate")
+	parser_bench.add_argument("--seed", type=int, default=1, help="Random seed")
+	parser_bench.set_defaults(func=bench_rpki)
+
+	parser_bench = subparsers.add_parser("detector", help="MOAS detector hot loop: legacy string sets vs moasdetector (updates/s, peak RSS)")
+	parser_bench.add_argument("--updates", type=int, default=400000, help="Number of announcements")
+	parser_bench.add_argument("--prefixes", type=int, default=200000, help="Number of distinct prefixes")
+	parser_bench.add_argument("--seed", type=int, default=1, help="Random seed")
+	parser_bench.set_defaults(func=bench_detector)
+
+	parser_bench = subparsers.add_parser("mrt", help="Offline MRT replay: decode throughput with 1 vs N worker processes, then decode + detect")
+	parser_bench.add_argument("--dumps", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "mrt"), help="Folder with <collector>/updates.* dumps (default: the bundled fixture)")
+	parser_bench.add_argument("--collector", default="route-views2", help="Collector subfolder")
+	parser_bench.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Decoder processes of the parallel run")
+	parser_bench.add_argument("--synthetic", type=int, default=0, help="Benchmark this many synthetic updates (written to a temporary folder) instead")
+	parser_bench.add_argument("--files", type=int, default=8, help="Number of 15-minute dumps of --synthetic")
+	parser_bench.add_argument("--prefixes", type=int, default=100000, help="Number of distinct prefixes of --synthetic")
+	parser_bench.add_argument("--repeat", type=int, default=3, help="Number of timed repetitions")
+	parser_bench.add_argument("--seed", type=int, default=1, help="Random seed")
+	parser_bench.add_argument("--write-fixture", action="store_true", help="Regenerate the bundled fixture in --dumps and exit")
+	parser_bench.set_defaults(func=bench_mrt)
+
+	parser_bench = subparsers.add_parser("pushdown", help="main.py batch loop over a fixed window with the old filter vs the pushed-down elem filter (elems/s)")
+	parser_bench.add_argument("--bgpstream", action="store_true", help="Stream the window from BGPStream (needs pybgpstream) instead of the MRT dumps")
+	parser_bench.add_argument("--dumps", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "mrt"), help="Folder with <collector>/updates.* dumps (default: the bundled fixture)")
+	parser_bench.add_argument("--collector", default="route-views2", help="Collector")
+	parser_bench.add_argument("--from", dest="from_time", default="2024-01-01 00:00:00", help="Window start (UTC)")
+	parser_bench.add_argument("--until", dest="until_time", default="2024-01-01 00:30:00", help="Window end (UTC)")
+	parser_bench.add_argument("--ipversion", choices=["4", "6"], help="Also push down an IP version")
+	parser_bench.add_argument("--prefix", nargs="+", default=[], help="Also push down these prefixes (and more-specifics)")
+	parser_bench.add_argument("--peer", type=int, nargs="+", default=[], help="Also push down these peer ASNs")
+	parser_bench.add_argument("--repeat", type=int, default=3, help="Number of timed repetitions")
+	parser_bench.set_defaults(func=bench_pushdown)
+
+	args = parser.parse_args()
+	args.func(args)
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,136 @@
+import os
+import time
+from contextlib import contextmanager
+
+########
+# instrumentation for main.py --metrics / --profile
+# TimedStream wraps a pybgpstream stream and adds up the time spent inside next() (fetching and decoding records),
+# so the time of the detector loop splits into stream wait and processing
+# IntervalMetrics collects one unit's numbers; main.py appends them as one JSON line per unit to <data>/metrics.jsonl
+# --profile runs each unit under cProfile (or pyinstrument, if installed) and writes one profile per unit
+########
+
+class TimedStream:
+	"""Iterable over a stream that records elems seen, time waiting for them and the time of the whole loop."""
+	def __init__(self, stream):
+		self.stream = stream
+		self.elems = 0
+		self.wait = 0.0
+		self.loop = 0.0
+
+	def __iter__(self):
+		clock = time.perf_counter
+		iterator = iter(self.stream)
+		elems = 0
+		wait = 0.0
+		loop_started = clock()
+		try:
+			while True:
+				started = clock()
+				try:
+					elem = next(iterator)
+				except StopIteration:
+					wait += clock() - started
+					break
+				wait += clock() - started
+				elems += 1
+				yield elem
+		finally:
+			# Kept in locals inside the loop, written back once
+			self.elems += elems
+			self.wait += wait
+			self.loop += clock() - loop_started
+
+def peak_rss_kib():
+	"""Peak resident set size of this process so far (KiB), or None where the resource module is missing."""
+	try:
+		import resource
+	except ImportError:
+		return None
+	return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss  # KiB on Linux
+
+def current_rss_kib():
+	"""Current resident set size (KiB) from /proc, or None elsewhere."""
+	try:
+		with open("/proc/self/statm", "r") as file:
+			return int(file.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") // 1024
+	except (OSError, ValueError, IndexError):
+		return None
+
+class IntervalMetrics:
+	"""Numbers of one (collector, interval) unit: wall time split, elems/s, RSS and detector state sizes."""
+	def __init__(self, collector, start_time, mode):
+		self.collector = collector
+		self.start_time = start_time
+		self.mode = mode
+		self.started = time.perf_counter()
+		self.stream = None
+		self.state = {}
+
+	def wrap(self, stream):
+		self.stream = TimedStream(stream)
+		return self.stream
+
+	def record_state(self, detector):
+		"""Sizes of the detector state; called when the stream is exhausted, before anything is flushed."""
+		self.state = detector.state_sizes()
+
+	def as_dict(self, announcements):
+		wall = time.perf_counter() - self.started
+		stream = self.stream or TimedStream(())
+		processing = max(stream.loop - stream.wait, 0.0)
+		return {
+			"collector": self.collector,
+			"start_time": self.start_time.strftime("%Y-%m-%d %H:%M:%S"),
+			"mode": self.mode,
+			"worker": os.getpid(),
+			"wall_s": round(wall, 3),
+			"stream_wait_s": round(stream.wait, 3),
+			"processing_s": round(processing, 3),
+			"other_s": round(max(wall - stream.loop, 0.0), 3),  # Stream setup and writing the output files
+			"elems": stream.elems,
+			"announcements": announcements,
+			"elems_per_s": round(stream.elems / stream.loop) if stream.loop > 0 else 0,
+			"processing_elems_per_s": round(stream.elems / processing) if processing > 0 else 0,
+			"peak_rss_kib": peak_rss_kib(),  # Of the worker process so far, which may have run earlier units
+			"rss_kib": current_rss_kib(),
+			**self.state,
+		}
+
+PROFILERS = ("cprofile", "pyinstrument")
+
+@contextmanager
+def profiled(kind, path):
+	"""
+	Profile the body with cProfile (writes path + ".prof", read it with pstats or snakeviz)
+	or pyinstrument (writes path + ".html"); kind None profiles nothing.
+	"""
+	if kind is None:
+		yield
+		return
+	os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+	if kind == "cprofile":
+		import cProfile
+
+		profiler = cProfile.Profile()
+		profiler.enable()
+		try:
+			yield
+		finally:
+			profiler.disable()
+			profiler.dump_stats(path + ".prof")
+	elif kind == "pyinstrument":
+		try:
+			from pyinstrument import Profiler
+		except ImportError:
+			raise RuntimeError("--profile pyinstrument needs pyinstrument (pip install pyinstrument)")
+		profiler = Profiler()
+		profiler.start()
+		try:
+			yield
+		finally:
+			profiler.stop()
+			with open(path + ".html", "w") as file:
+				file.write(profiler.output_html())
+	else:
+		raise ValueError(f"Unknown profiler {kind!r}, expected one of {', '.join(PROFILERS)}")
@@ -1,33 +1,17 @@
-import os
 import matplotlib.pyplot as plt
-
-def parse_log_file(filepath):
-	"""Parses a log file to extract the total updates and MOAS count."""
-	with open(filepath, "r") as file:
-		lines = file.readlines()
-		total_updates = 0
-		moas_count = 0
-		
-		for line in lines:
-			if line.startswith("Total Updates:"):
-				total_updates = int(line.split(":")[1].strip())
-			elif line.startswith("MOAS Count:"):
-				moas_count = int(line.split(":")[1].strip())
-		
-		return total_updates, moas_count
+from summarystore import load_sessions
 
 def process_logs(data_folder="data"):
 	"""Processes all log files in the data folder and returns parsed results."""
 	data = []
 	
-	for filename in sorted(os.listdir(data_folder)):
-		if filename.endswith(".txt"):
-			filepath = os.path.join(data_folder, filename)
-			total_updates, moas_count = parse_log_file(filepath)
-			
-			if total_updates > 0:  # Avoid division by zero
-				moas_ratio = moas_count / total_updates
-				data.append((filename, moas_ratio, moas_count))
+	for session in load_sessions(data_folder):
+		total_updates = session["total_updates"]
+		moas_count = session["moas_count"]
+		
+		if total_updates > 0:  # Avoid division by zero
+			moas_ratio = moas_count / total_updates
+			data.append((session["filename"], moas_ratio, moas_count))
 	
 	return data
 
@@ -0,0 +1,131 @@
+import bisect
+import json
+from collections import defaultdict
+
+from rpkivalidator import RpkiValidator
+
+########
+# local datasets for ASN enrichment, so sus_asn_detection.py can run without stat.ripe.net
+# LocalSource answers the same questions as RipeStatSource (sus_asn_detection.py) from files loaded once into memory:
+#   RIR delegated-stats files (delegated-<rir>-extended-latest) -> rir status
+#   a VRP CSV/JSON dump -> rpki-validation statuses (rpkivalidator.py)
+#   a prefix-to-AS snapshot (CAIDA pfx2as "address<TAB>length<TAB>asn", or "prefix asn") -> announced prefixes
+#   optional JSON snapshots {"<asn>": [...]} of the RIPEstat visibility "visibilities" and as-path-length "stats" lists
+########
+
+# delegated-stats status -> RIPEstat rir status
+DELEGATED_STATUS = {
+	"allocated": "ALLOCATED",
+	"assigned": "ASSIGNED",
+	"reserved": "RESERVED",
+	"available": "UNALLOCATED",
+}
+
+def summarize_rir_statuses(statuses):
+	"""Collapse the statuses of every RIR entry for an ASN into one value, as stored in the analysis dict."""
+	statuses = list(statuses)
+	if not statuses:
+		return "no_rir_data"
+	if len(set(statuses)) == 1:
+		return statuses[0]
+	return "multiple_statuses"
+
+class AsnRanges:
+	"""
+	Sorted, non-overlapping ASN ranges of one registry; a lookup is one bisect.
+	"""
+	def __init__(self):
+		self.starts = []
+		self.ends = []
+		self.statuses = []
+
+	def add(self, start, count, status):
+		self.starts.append(start)
+		self.ends.append(start + count - 1)
+		self.statuses.append(status)
+
+	def sort(self):
+		order = sorted(range(len(self.starts)), key=self.starts.__getitem__)
+		self.starts = [self.starts[i] for i in order]
+		self.ends = [self.ends[i] for i in order]
+		self.statuses = [self.statuses[i] for i in order]
+
+	def get(self, asn):
+		index = bisect.bisect_right(self.starts, asn) - 1
+		if index >= 0 and asn <= self.ends[index]:
+			return self.statuses[index]
+		return None
+
+def iter_delegated_asns(path):
+	"""Yield (registry, first asn, count, status) for the asn lines of a delegated-stats file."""
+	with open(path, "r") as file:
+		for line in file:
+			if line.startswith("#"):
+				continue
+			fields = line.rstrip("\n").split("|")
+			# registry|cc|type|start|value|date|status[|opaque-id|...]; version and summary lines have fewer fields or a '*' cc
+			if len(fields) < 7 or fields[2] != "asn" or fields[1] == "*":
+				continue
+			status = DELEGATED_STATUS.get(fields[6].lower(), fields[6].upper())
+			yield fields[0], int(fields[3]), int(fields[4]), status
+
+def iter_pfx2as(path):
+	"""Yield (prefix, [origin asns]) from a prefix-to-AS snapshot; multi-origin (1_2) and AS-set (1,2) entries give every member."""
+	with open(path, "r") as file:
+		for line in file:
+			fields = line.split()
+			if not fields or line.startswith("#"):
+				continue
+			if len(fields) >= 3:
+				prefix, origins = f"{fields[0]}/{fields[1]}", fields[2]
+			else:
+				prefix, origins = fields[0], fields[1]
+			yield prefix, [int(asn) for asn in origins.replace("_", ",").split(",") if asn.isdigit()]
+
+def load_snapshot(path):
+	"""{"<asn>": [...]} -> {asn: [...]}."""
+	with open(path, "r") as file:
+		return {int(asn): entries for asn, entries in json.load(file).items()}
+
+class LocalSource:
+	"""
+	Offline data source. Every lookup is a dict, bisect or trie lookup; nothing goes over the network.
+	Datasets that are not given answer as RIPEstat does for an ASN it knows nothing about.
+	"""
+	def __init__(self, delegated_files=(), vrp_file=None, pfx2as_file=None, visibility_file=None, as_path_file=None):
+		self.registries = defaultdict(AsnRanges)
+		for path in delegated_files:
+			for registry, start, count, status in iter_delegated_asns(path):
+				self.registries[registry].add(start, count, status)
+		for ranges in self.registries.values():
+			ranges.sort()
+
+		self.validator = RpkiValidator.from_file(vrp_file) if vrp_file else RpkiValidator()
+
+		self.prefixes = defaultdict(list)
+		if pfx2as_file:
+			for prefix, origins in iter_pfx2as(pfx2as_file):
+				for asn in origins:
+					self.prefixes[asn].append(prefix)
+
+		self.visibilities = load_snapshot(visibility_file) if visibility_file else {}
+		self.path_stats = load_snapshot(as_path_file) if as_path_file else {}
+		print(f"Loaded {sum(len(ranges.starts) for ranges in self.registries.values())} RIR ASN ranges, "
+			f"{self.validator.count} VRPs, {len(self.prefixes)} originating ASNs")
+
+	def announced_prefixes(self, asn):
+		return list(self.prefixes.get(int(asn), []))
+
+	def rpki_data(self, asn, prefixes):
+		return self.validator.validate_prefixes(asn, prefixes)
+
+	def visibility(self, asn):
+		return self.visibilities.get(int(asn), [])
+
+	def rir_status(self, asn):
+		asn = int(asn)
+		statuses = (ranges.get(asn) for ranges in self.registries.values())
+		return summarize_rir_statuses(status for status in statuses if status is not None)
+
+	def as_path_stats(self, asn):
+		return self.path_stats.get(int(asn), [])
@@ -1,6 +1,6 @@
-import os
 from collections import defaultdict
 from datetime import datetime
+from lifetimeindex import format_peer_counts, update_index
 
 
 ###############
@@ -10,34 +10,19 @@ from datetime import datetime
 
 def parse_logs(data_folder="data"):
 	# Dictionary to store prefix details
+	from summarystore import iter_prefix_records  # numpy is only needed for this full rescan, not for the index
 	prefix_data = defaultdict(lambda: {"first_seen": None, "last_seen": None, "origins": set(), "last_seen_changes": 0})
 	
-	# Iterate through all files in the data folder
-	for filename in sorted(os.listdir(data_folder)):
-		if filename.endswith(".txt"):
-			filepath = os.path.join(data_folder, filename)
-			with open(filepath, "r") as file:
-				lines = file.readlines()
-			
-			# Extract relevant data starting from line 10
-			for i in range(9, len(lines), 2):  # Step by 2 to process prefix-origin pairs
-				if i + 1 < len(lines):  # Ensure there is a matching Origin ASNs line
-					prefix_line = lines[i].strip()
-					origin_line = lines[i + 1].strip()
-					
-					# Parse prefix and origins
-					if prefix_line.startswith("Prefix:") and origin_line.startswith("Origin ASNs:"):
-						prefix = prefix_line.split(":")[1].strip()
-						origins = set(origin_line.split(":")[1].strip().split(", "))
-						
-						# Update dictionary
-						if prefix not in prefix_data:
-							prefix_data[prefix]["first_seen"] = filename
-						# Check if last_seen is changing
-						if prefix_data[prefix]["last_seen"] != filename:
-							prefix_data[prefix]["last_seen_changes"] += 1
-						prefix_data[prefix]["last_seen"] = filename
-						prefix_data[prefix]["origins"].update(origins)
+	# Iterate through every prefix record of every summary file (store or text)
+	for filename, prefix, origins in iter_prefix_records(data_folder):
+		# Update dictionary
+		if prefix not in prefix_data:
+			prefix_data[prefix]["first_seen"] = filename
+		# Check if last_seen is changing
+		if prefix_data[prefix]["last_seen"] != filename:
+			prefix_data[prefix]["last_seen_changes"] += 1
+		prefix_data[prefix]["last_seen"] = filename
+		prefix_data[prefix]["origins"].update(origins)
 	
 	return prefix_data
 
@@ -59,22 +44,30 @@ def write_logs(prefix_data, single_session_file="one_session.txt", multi_session
 			first_seen = data["first_seen"]
 			last_seen = data["last_seen"]
 			last_seen_changes = data["last_seen_changes"]
-			origins = ", ".join(sorted(data["origins"]))
+			sorted_origins = sorted(data["origins"])
+			origins = ", ".join(sorted_origins)
+			peer_counts = format_peer_counts(sorted_origins, data.get("peer_counts"))  # Only the index has them
 			
 			# Write to respective file based on session count
 			if first_seen == last_seen:  # One-session events
 				single_file.write(f"Prefix: {prefix}\n")
 				single_file.write(f"  Seen in: {first_seen}\n")
-				single_file.write(f"  Origin ASNs: {origins}\n\n")
+				single_file.write(f"  Origin ASNs: {origins}\n")
+				if peer_counts:
+					single_file.write(f"  Peer Counts: {peer_counts}\n")
+				single_file.write("\n")
 			else:  # Multiple-session events
 				multi_file.write(f"Prefix: {prefix}\n")
 				multi_file.write(f"  First Seen: {first_seen}\n")
 				multi_file.write(f"  Last Seen: {last_seen}\n")
 				multi_file.write(f"  Last Seen Changes: {last_seen_changes}\n")
-				multi_file.write(f"  Origin ASNs: {origins}\n\n")
+				multi_file.write(f"  Origin ASNs: {origins}\n")
+				if peer_counts:
+					multi_file.write(f"  Peer Counts: {peer_counts}\n")
+				multi_file.write("\n")
 
 if __name__ == "__main__":
-	# Parse logs and separate data
-	prefix_data = parse_logs("data")
+	# Read prefix lifetimes from the index, parsing only summary files it has not seen yet
+	prefix_data = update_index("data").prefix_data()
 	write_logs(prefix_data, "one_session.txt", "multi_session.txt")
 	print("##########\n#Finished#\n##########")
@@ -0,0 +1,127 @@
+import json
+import os
+
+from summaryparser import PeerCountRecord, iter_prefix_records, source_signature
+
+########
+# persistent prefix lifetime index
+# keeps first_seen, last_seen, session count and the origin union of every MOAS prefix
+# plus, for summaries written with main.py --peers, the most peers any session saw behind each origin
+# only summary files that are not in the index yet are parsed; build or update it with: python lifetimeindex.py
+# the index remembers the data folder it was built from and is rebuilt when it is updated from another one
+########
+
+INDEX_PATH = "lifetime_index.json"
+INDEX_VERSION = 3
+
+class LifetimeIndex:
+	"""
+	Prefix -> [first_seen, last_seen, session_count, origins, peer_counts] built from the summary files;
+	peer_counts is {origin: most peers seen announcing it in one session}, empty without --peers summaries.
+	'files' holds the size and mtime of every indexed file of 'data_folder' (absolute path).
+	"""
+	def __init__(self, index_path=INDEX_PATH):
+		self.index_path = index_path
+		self.data_folder = None
+		self.files = {}
+		self.prefixes = {}
+
+		if os.path.exists(index_path):
+			with open(index_path, "r") as file:
+				index = json.load(file)
+			if index.get("version") == INDEX_VERSION:
+				self.data_folder = index["data_folder"]
+				self.files = index["files"]
+				self.prefixes = {
+					prefix: [first, last, count, set(origins), peer_counts]
+					for prefix, (first, last, count, origins, peer_counts) in index["prefixes"].items()
+				}
+
+	def add_session(self, filename, records):
+		"""Merge the (prefix, origins) records of one session, and the PeerCountRecords following them, into the index."""
+		seen = set()
+		origins = ()
+		for record in records:
+			if type(record) is PeerCountRecord:
+				peer_counts = self.prefixes[record.prefix][4]
+				for origin, count in zip(origins, record.counts):
+					if count > peer_counts.get(origin, 0):
+						peer_counts[origin] = count
+				continue
+			prefix, origins = record
+			entry = self.prefixes.get(prefix)
+			if entry is None:
+				self.prefixes[prefix] = [filename, filename, 1, set(origins), {}]
+				seen.add(prefix)
+				continue
+			if filename < entry[0]:
+				entry[0] = filename
+			if filename > entry[1]:
+				entry[1] = filename
+			if prefix not in seen:
+				entry[2] += 1
+				seen.add(prefix)
+			entry[3].update(origins)
+
+	def update(self, data_folder="data"):
+		"""
+		Parse only the summary files that are not indexed yet.
+		If an indexed file changed or disappeared, or the index was built from another folder, it is rebuilt from scratch.
+		Returns the number of files parsed.
+		"""
+		signature = {filename: [size, mtime] for filename, size, mtime in source_signature(data_folder)}
+		folder = os.path.abspath(data_folder)
+		if self.files and self.data_folder != folder:
+			print(f"Lifetime index was built from {self.data_folder}, rebuilding it from {folder}")
+			self.files, self.prefixes = {}, {}
+		elif any(signature.get(filename) != stamp for filename, stamp in self.files.items()):
+			print("Indexed summary files changed, rebuilding the lifetime index")
+			self.files, self.prefixes = {}, {}
+		self.data_folder = folder
+
+		new_files = sorted(filename for filename in signature if filename not in self.files)
+		for filename in new_files:
+			self.add_session(filename, iter_prefix_records(os.path.join(data_folder, filename), peer_counts=True))
+			self.files[filename] = signature[filename]
+		return len(new_files)
+
+	def save(self):
+		"""Write the index to a temporary file and swap it in."""
+		index = {
+			"version": INDEX_VERSION,
+			"data_folder": self.data_folder,
+			"files": self.files,
+			"prefixes": {
+				prefix: [first, last, count, sorted(origins), peer_counts]
+				for prefix, (first, last, count, origins, peer_counts) in self.prefixes.items()
+			},
+		}
+		with open(self.index_path + ".tmp", "w") as file:
+			json.dump(index, file)
+		os.replace(self.index_path + ".tmp", self.index_path)
+
+	def prefix_data(self):
+		"""Return the index in the shape produced by durationcounter.parse_logs, plus the peer_counts."""
+		return {
+			prefix: {"first_seen": first, "last_seen": last, "origins": origins, "last_seen_changes": count, "peer_counts": peer_counts}
+			for prefix, (first, last, count, origins, peer_counts) in self.prefixes.items()
+		}
+
+def format_peer_counts(origins, peer_counts):
+	"""'Peer Counts' value for the sorted origins of an event ('-' for an origin without a count), or None without counts."""
+	if not peer_counts:
+		return None
+	return ", ".join(str(peer_counts.get(origin, "-")) for origin in origins)
+
+def update_index(data_folder="data", index_path=INDEX_PATH):
+	"""Load the index, parse any new summary files and save it back."""
+	index = LifetimeIndex(index_path)
+	parsed = index.update(data_folder)
+	if parsed:
+		index.save()
+	print(f"Lifetime index: {parsed} new files parsed, {len(index.prefixes)} prefixes from {index.data_folder}")
+	return index
+
+if __name__ == "__main__":
+	update_index("data", INDEX_PATH)
+	print("##########\n#Finished#\n##########")
@@ -1,18 +1,55 @@
 import argparse
-import pybgpstream
+import calendar
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from collections import defaultdict
 from datetime import datetime, timedelta
+import ipaddress
+import json
 import os
+import time
+
+from collectormetrics import PROFILERS, IntervalMetrics, profiled
+from moasdetector import MOASDetector, StreamingMOASDetector, TimedMOASDetector
+from summaryparser import iter_prefix_records
 
 # Configurations for automation
 years = [2017,2018,2020,2021,2022,2023]
 session_times = ["00:00:00", "12:00:00"]  # Times per day
 session_duration = timedelta(hours=2)  # Each session lasts 2 hours
 collectors = ["route-views2", "route-views.sg", "route-views.linx"]
+manifest_name = "manifest.jsonl"  # Run manifest kept next to the summaries
+metrics_name = "metrics.jsonl"  # Per-unit metrics of --metrics, next to the manifest
 
-def get_stream(from_time, until_time, collector, bgp_filter="type updates"):
+def stream_filter(withdrawals=False, ipversion=None, prefixes=(), peers=()):
+	"""
+	BGPStream filter pushed down to libBGPStream, so elems the detector would drop are never turned into Python objects:
+	announcements only (withdrawals too for --timing), optionally one IP version, prefixes (with their more-specifics)
+	and peer ASNs. libBGPStream ORs the values of a repeated term and ANDs different terms.
+	"""
+	terms = ["type updates", "elemtype announcements"]
+	if withdrawals:
+		terms.append("elemtype withdrawals")
+	if ipversion:
+		terms.append(f"ipversion {ipversion}")
+	terms.extend(f"prefix more {prefix}" for prefix in prefixes)
+	terms.extend(f"peer {peer}" for peer in peers)
+	return " and ".join(terms)
+
+def get_stream(from_time, until_time, collector, bgp_filter="type updates", mrt=None):
 	"""
 	Initializes and returns a pybgpstream object with given parameters.
+	pybgpstream is imported here, so the rest of main.py can be imported without it.
+	With mrt=(folder, workers) the updates are replayed from local MRT dumps instead (mrtreader.py, --mrt).
 	"""
+	if mrt is not None:
+		from mrtreader import MRTStream, list_dumps, parse_time
+
+		folder, workers = mrt
+		dumps = list_dumps(folder, collector, parse_time(from_time), parse_time(until_time))
+		return MRTStream(dumps, from_time, until_time, workers, bgp_filter)
+
+	import pybgpstream
+
 	return pybgpstream.BGPStream(
 		from_time=from_time,
 		until_time=until_time,
@@ -40,76 +77,503 @@ def generate_intervals():
 					intervals.append((start_time, end_time))
 	return intervals
 
-def setup():
-	os.makedirs("data", exist_ok=True)
+def generate_units(collector_names, intervals):
+	"""
+	Build the (collector, start_time, end_time) work units, one per summary file.
+	Units are ordered collector first, then interval, matching a serial run.
+	"""
+	return [
+		(collector, start_time, end_time)
+		for collector in collector_names
+		for start_time, end_time in intervals
+	]
+
+def summary_filename(collector, start_time, data_folder="data"):
+	sanitized_time = start_time.strftime("%Y%m%d_%H%M")
+	return os.path.join(data_folder, f"summary_{collector}_{sanitized_time}.txt")
+
+def timing_filename(collector, start_time, data_folder="data"):
+	"""Per-origin timing table written next to the summary with --timing."""
+	sanitized_time = start_time.strftime("%Y%m%d_%H%M")
+	return os.path.join(data_folder, f"timing_{collector}_{sanitized_time}.tsv")
+
+def events_filename(collector, start_time, data_folder="data"):
+	"""Per-event log written next to the summary in streaming mode."""
+	sanitized_time = start_time.strftime("%Y%m%d_%H%M")
+	return os.path.join(data_folder, f"events_{collector}_{sanitized_time}.jsonl")
+
+def process_interval(collector, start_time, end_time, detector=None, metrics=None, mrt=None, bgp_filter=None):
+	"""
+	Stream one interval from a collector and detect MOAS events.
+	Returns the total update count, MOAS count and the MOAS events per prefix.
+	A detector can be passed in (e.g. a TimedMOASDetector) to read more than the events afterwards.
+	With metrics (collectormetrics.IntervalMetrics) the stream is timed and the detector state sizes recorded.
+	mrt=(folder, workers) reads local MRT dumps instead of BGPStream.
+	bgp_filter defaults to stream_filter(), with withdrawals for a TimedMOASDetector.
+	"""
+	start_time_str = start_time.strftime("%Y-%m-%d %H:%M:%S")
+	end_time_str = end_time.strftime("%Y-%m-%d %H:%M:%S")
+	if detector is None:
+		detector = MOASDetector()  # Tracks the origins (last AS) of each prefix and the MOAS events
+	if bgp_filter is None:
+		bgp_filter = stream_filter(withdrawals=isinstance(detector, TimedMOASDetector))
+
+	# Initialize the BGPStream object
+	stream = get_stream(start_time_str, end_time_str, collector, bgp_filter, mrt)
+	if metrics is not None:
+		stream = metrics.wrap(stream)
+
+	# To analyze each event individually, feed the announcements to detector.announce(prefix, as_path) instead;
+	# it returns True when the announcement caused a MOAS event
+	total_updates = detector.process(stream)
+	if metrics is not None:
+		metrics.record_state(detector)
+
+	return total_updates, detector.moas_count, detector.moas_events()
+
+def write_summary_header(file, collector, start_time, end_time, total_updates, moas_count, sub_moas_count=None, peers=None):
+	start_time_str = start_time.strftime("%Y-%m-%d %H:%M:%S")
+	end_time_str = end_time.strftime("%Y-%m-%d %H:%M:%S")
+	file.write(f"\nBGPStream Summary for {collector} ({start_time_str} to {end_time_str})\n\n")
+	file.write("MOAS Events Summary:\n")
+	file.write(f"\nTotal Updates: {total_updates}\n")
+	file.write(f"MOAS Count: {moas_count}\n")
+	file.write(f"MOAS Ratio: {moas_count}/{total_updates}\n")
+	if sub_moas_count is not None:
+		file.write(f"Sub-MOAS Count: {sub_moas_count}\n")
+	if peers is not None:
+		file.write(f"Peers: {peers}\n")
+	file.write("\n")
 
-def main():
-	setup()
-	parser = argparse.ArgumentParser(description="Automate BGPStream sessions")
-	parser.add_argument("collector_index", type=int, choices=range(len(collectors)), help="Choose the collector index (0, 1, ...)")
-	args = parser.parse_args()
+def write_prefix_record(file, prefix, origins, peer_counts=None):
+	file.write(f"Prefix: {prefix}\n")
+	file.write(f"  Origin ASNs: {', '.join(origins)}\n")
+	if peer_counts is not None:
+		file.write(f"  Peer Counts: {', '.join(map(str, peer_counts))}\n")
 
-	collector = collectors[args.collector_index]
-	print(f"Using collector: {collector}")
+def write_sub_moas_record(file, prefix, origins, covering_prefix, covering_origins, conflict):
+	file.write(f"Sub-MOAS Prefix: {prefix}\n")
+	file.write(f"  Origin ASNs: {', '.join(origins)}\n")
+	file.write(f"  Covering Prefix: {covering_prefix}\n")
+	file.write(f"  Covering Origin ASNs: {', '.join(covering_origins)}\n")
+	file.write(f"  Conflict: {conflict}\n")
+
+def write_summary(filename, collector, start_time, end_time, total_updates, moas_count, moas_events, sub_moas=None, peer_counts=None, peers=None):
+	"""
+	Write the summary to a .part file and rename it once complete,
+	so an interrupted run never leaves a truncated summary behind.
+	sub_moas records (SubMOASTracker.records) follow the MOAS records when given;
+	peer_counts ({prefix: peers per origin}) adds a Peer Counts line to each record and peers the Peers header line.
+	"""
+	partial_filename = filename + ".part"
+	with open(partial_filename, "w") as file:
+		write_summary_header(file, collector, start_time, end_time, total_updates, moas_count, None if sub_moas is None else len(sub_moas), peers)
+		for prefix, origins in moas_events.items():
+			write_prefix_record(file, prefix, origins, None if peer_counts is None else peer_counts[prefix])
+		for record in sub_moas or ():
+			write_sub_moas_record(file, *record)
+	os.replace(partial_filename, filename)
+
+def write_timing(filename, start_time, rows):
+	"""
+	Write the per-origin timing rows of a TimedMOASDetector as TSV, times in seconds from the session start.
+	moas_first is '-' for prefixes whose origins were never up at the same time.
+	"""
+	session_start = calendar.timegm(start_time.timetuple())
+	partial_filename = filename + ".part"
+	with open(partial_filename, "w") as file:
+		file.write(f"# session_start {session_start}\n")
+		file.write("prefix\torigin\tfirst\tlast\tannouncements\tup_seconds\tmoas_first\tmoas_seconds\twithdrawals\n")
+		for prefix, origin, first, last, count, up_seconds, moas_first, moas_seconds, withdrawals in rows:
+			moas_first = "-" if moas_first is None else moas_first - session_start
+			file.write(f"{prefix}\t{origin}\t{first - session_start}\t{last - session_start}\t{count}\t{up_seconds}\t{moas_first}\t{moas_seconds}\t{withdrawals}\n")
+	os.replace(partial_filename, filename)
+
+def merge_prefix_records(body_filename):
+	"""
+	{prefix: origins} of the records in a streaming summary body, in the order they were written.
+	A prefix that expired and conflicted again was flushed twice; it gets one record with the origins of both, in order.
+	"""
+	merged = {}
+	for prefix, origins in iter_prefix_records(body_filename):
+		known = merged.setdefault(prefix, [])
+		known.extend(origin for origin in origins if origin not in known)
+	return merged
+
+def stream_interval(collector, start_time, end_time, filename, events_file, idle_timeout, metrics=None, mrt=None, bgp_filter=None):
+	"""
+	Streaming variant of process_interval + write_summary with memory bounded by the active prefixes:
+	every MOAS event is appended to events_file (JSON lines with its timestamp) as soon as it is detected,
+	prefixes idle for idle_timeout seconds are forgotten, and their records are written to the summary body right away.
+	The header needs the final counts, so it is written last and the body copied behind it, one record per prefix
+	(merge_prefix_records).
+	Returns the total update count and MOAS count.
+	"""
+	start_time_str = start_time.strftime("%Y-%m-%d %H:%M:%S")
+	end_time_str = end_time.strftime("%Y-%m-%d %H:%M:%S")
+	stream = get_stream(start_time_str, end_time_str, collector, bgp_filter or stream_filter(), mrt)
+	if metrics is not None:
+		stream = metrics.wrap(stream)
+
+	body_filename = filename + ".body.part"
+	partial_events_file = events_file + ".part"
+	with open(body_filename, "w") as body, open(partial_events_file, "w") as events:
+		def on_event(time, prefix, origins):
+			events.write(json.dumps({"time": time, "prefix": prefix, "origins": origins}) + "\n")
+
+		def on_flush(prefix, origins):
+			write_prefix_record(body, prefix, origins)
+
+		detector = StreamingMOASDetector(idle_timeout, on_event, on_flush)
+		total_updates = detector.process(stream)
+		if metrics is not None:
+			metrics.record_state(detector)
+		detector.finish()
+
+	partial_filename = filename + ".part"
+	with open(partial_filename, "w") as file:
+		write_summary_header(file, collector, start_time, end_time, total_updates, detector.moas_count)
+		for prefix, origins in merge_prefix_records(body_filename).items():
+			write_prefix_record(file, prefix, origins)
+	os.remove(body_filename)
+	os.replace(partial_events_file, events_file)
+	os.replace(partial_filename, filename)
+	print(f"{collector} {start_time_str}: {detector.expired} idle prefixes expired")
+	return total_updates, detector.moas_count
+
+def unit_key(collector, start_time):
+	return f"{collector} {start_time.strftime('%Y-%m-%d %H:%M:%S')}"
+
+def unit_options(idle_timeout=None, timing=False, sub_moas=False, peers=False, filters=None, mrt=None):
+	"""
+	What a unit's files depend on besides its interval, kept in its manifest record:
+	a unit only counts as done when it was collected with the same options and end time.
+	"""
+	return {
+		"mode": "stream" if idle_timeout else "timing" if timing else "batch",
+		"idle_timeout": idle_timeout,
+		"sub_moas": sub_moas,
+		"peers": peers,
+		"filter": stream_filter(timing, **(filters or {})),
+		"mrt": os.path.abspath(mrt[0]) if mrt else None,
+	}
+
+def load_manifest(data_folder="data"):
+	"""
+	Read the run manifest and return the latest record for each unit.
+	"""
+	manifest = {}
+	manifest_path = os.path.join(data_folder, manifest_name)
+	if not os.path.exists(manifest_path):
+		return manifest
+	with open(manifest_path, "r") as file:
+		for line in file:
+			try:
+				record = json.loads(line)
+			except ValueError:
+				continue  # A run killed mid-write can leave a torn last line
+			manifest[unit_key(record["collector"], datetime.strptime(record["start_time"], "%Y-%m-%d %H:%M:%S"))] = record
+	return manifest
+
+def record_unit(result, data_folder="data"):
+	"""
+	Append the outcome of one unit to the run manifest.
+	Only the scheduling process calls this, so serial and parallel runs share it.
+	"""
+	record = {
+		"collector": result["collector"],
+		"start_time": result["start_time"].strftime("%Y-%m-%d %H:%M:%S"),
+		"end_time": result["end_time"].strftime("%Y-%m-%d %H:%M:%S") if result.get("end_time") else None,
+		"options": result.get("options"),
+		"status": result["status"],
+		"filename": result["filename"],
+		"total_updates": result.get("total_updates"),
+		"moas_count": result.get("moas_count"),
+		"error": result.get("error"),
+		"finished_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+	}
+	with open(os.path.join(data_folder, manifest_name), "a") as file:
+		file.write(json.dumps(record) + "\n")
+		file.flush()
+		os.fsync(file.fileno())
+
+def partial_filenames(collector, start_time, data_folder="data"):
+	"""The .part files a unit writes before renaming them: summary, streaming body and events, timing table."""
+	summary = summary_filename(collector, start_time, data_folder)
+	return [summary + ".part", summary + ".body.part", events_filename(collector, start_time, data_folder) + ".part",
+		timing_filename(collector, start_time, data_folder) + ".part"]
+
+def remove_partial_files(units, data_folder="data"):
+	"""
+	Remove the .part files an interrupted run left for these units before they are redone.
+	Only the given units are touched, so the .part files of another run writing to the same folder stay.
+	"""
+	for collector, start_time, _ in units:
+		for filename in partial_filenames(collector, start_time, data_folder):
+			if os.path.exists(filename):
+				os.remove(filename)
+
+def pending_units(units, data_folder="data", options=None):
+	"""
+	Drop units the manifest marks as done with the same end time and options (unit_options) and whose summary
+	(and timing table, in timing mode) is still on disk.
+	Returns the pending units and, among them, those whose files were written with another end time or other options.
+	"""
+	options = options or unit_options()
+	timing = options["mode"] == "timing"
+	manifest = load_manifest(data_folder)
+	pending = []
+	mismatched = []
+	for collector, start_time, end_time in units:
+		record = manifest.get(unit_key(collector, start_time))
+		if record and record["status"] == "done" and os.path.exists(summary_filename(collector, start_time, data_folder)) \
+				and (not timing or os.path.exists(timing_filename(collector, start_time, data_folder))):
+			if record.get("end_time") == end_time.strftime("%Y-%m-%d %H:%M:%S") and record.get("options") == options:
+				continue
+			mismatched.append((collector, start_time, end_time))
+		pending.append((collector, start_time, end_time))
+	return pending, mismatched
+
+def profile_filename(collector, start_time, data_folder="data"):
+	"""Profile path without extension (.prof for cProfile, .html for pyinstrument)."""
+	sanitized_time = start_time.strftime("%Y%m%d_%H%M")
+	return os.path.join(data_folder, "profiles", f"profile_{collector}_{sanitized_time}")
+
+def run_unit(unit, data_folder="data", idle_timeout=None, timing=False, sub_moas=False, metrics=False, profile=None, mrt=None, filters=None, peers=False):
+	"""
+	Process one (collector, interval) unit and write its summary file.
+	Runs in the calling process or in a pool worker; every unit writes its own file.
+	With an idle_timeout (seconds) the unit runs in streaming mode (stream_interval);
+	with timing a timing_*.tsv of the MOAS prefixes is written as well,
+	with sub_moas the summary also lists the sub-MOAS / super-MOAS conflicts.
+	With metrics the result carries a "metrics" dict (collectormetrics.py); profile ("cprofile" / "pyinstrument")
+	writes a profile of the unit to data/profiles/. mrt=(folder, workers) replays local MRT dumps (--mrt).
+	filters ({"ipversion", "prefixes", "peers"}) narrow the stream filter (stream_filter);
+	with peers the summary records how many peers announced each origin of a MOAS prefix.
+	"""
+	collector, start_time, end_time = unit
+	started = time.perf_counter()
+	filename = summary_filename(collector, start_time, data_folder)
+	mode = "stream" if idle_timeout else "timing" if timing else "batch"
+	unit_metrics = IntervalMetrics(collector, start_time, mode) if metrics else None
+	bgp_filter = stream_filter(timing, **(filters or {}))
+	options = unit_options(idle_timeout, timing, sub_moas, peers, filters, mrt)
+	try:
+		with profiled(profile, profile_filename(collector, start_time, data_folder)):
+			if idle_timeout:
+				events_file = events_filename(collector, start_time, data_folder)
+				total_updates, moas_count = stream_interval(collector, start_time, end_time, filename, events_file, idle_timeout, unit_metrics, mrt, bgp_filter)
+			else:
+				detector = TimedMOASDetector(sub_moas, peers) if timing else MOASDetector(sub_moas, peers)
+				total_updates, moas_count, moas_events = process_interval(collector, start_time, end_time, detector, unit_metrics, mrt, bgp_filter)
+				if timing:
+					detector.finish(calendar.timegm(end_time.timetuple()))
+					write_timing(timing_filename(collector, start_time, data_folder), start_time, detector.timing_rows())
+				sub_moas_records = list(detector.sub_moas.records()) if sub_moas else None
+				peer_counts = detector.peer_counts() if peers else None
+				peer_total = len(detector.peers.bits) if peers else None
+				write_summary(filename, collector, start_time, end_time, total_updates, moas_count, moas_events, sub_moas_records, peer_counts, peer_total)
+	except Exception as e:
+		return {
+			"collector": collector,
+			"start_time": start_time,
+			"end_time": end_time,
+			"options": options,
+			"filename": filename,
+			"status": "failed",
+			"error": f"{type(e).__name__}: {e}",
+			"elapsed": time.perf_counter() - started,
+			"worker": os.getpid(),
+		}
+	result = {
+		"collector": collector,
+		"start_time": start_time,
+		"end_time": end_time,
+		"options": options,
+		"filename": filename,
+		"status": "done",
+		"total_updates": total_updates,
+		"moas_count": moas_count,
+		"elapsed": time.perf_counter() - started,
+		"worker": os.getpid(),
+	}
+	if unit_metrics is not None:
+		result["metrics"] = unit_metrics.as_dict(total_updates)
+	return result
+
+def run_units(units, workers=1, data_folder="data", idle_timeout=None, timing=False, sub_moas=False, metrics=False, profile=None, mrt=None, filters=None, peers=False):
+	"""
+	Run the work units serially (workers <= 1) or across a process pool.
+	Yields one result per unit as soon as it finishes.
+	"""
+	if workers <= 1:
+		for unit in units:
+			yield run_unit(unit, data_folder, idle_timeout, timing, sub_moas, metrics, profile, mrt, filters, peers)
+		return
+
+	with ProcessPoolExecutor(max_workers=workers) as executor:
+		futures = [executor.submit(run_unit, unit, data_folder, idle_timeout, timing, sub_moas, metrics, profile, mrt, filters, peers) for unit in units]
+		for future in as_completed(futures):
+			yield future.result()
+
+def record_metrics(result, data_folder="data"):
+	"""Append the metrics of one unit to metrics.jsonl (scheduling process only, like the manifest)."""
+	if "metrics" not in result:
+		return
+	with open(os.path.join(data_folder, metrics_name), "a") as file:
+		file.write(json.dumps(result["metrics"]) + "\n")
+
+def report_metrics(results):
+	"""Print where the time went per collector: stream wait vs processing, elems/s and the largest state."""
+	per_collector = defaultdict(lambda: {"units": 0, "elems": 0, "wait": 0.0, "processing": 0.0, "other": 0.0, "peak_rss_kib": 0, "prefixes": 0})
+	for result in results:
+		metrics = result.get("metrics")
+		if not metrics:
+			continue
+		stats = per_collector[metrics["collector"]]
+		stats["units"] += 1
+		stats["elems"] += metrics["elems"]
+		stats["wait"] += metrics["stream_wait_s"]
+		stats["processing"] += metrics["processing_s"]
+		stats["other"] += metrics["other_s"]
+		stats["peak_rss_kib"] = max(stats["peak_rss_kib"], metrics["peak_rss_kib"] or 0)
+		stats["prefixes"] = max(stats["prefixes"], metrics.get("prefixes", 0))
+
+	print("\n########## Collector Metrics ##########")
+	for collector, stats in sorted(per_collector.items()):
+		total = stats["wait"] + stats["processing"] + stats["other"]
+		share = stats["wait"] / total if total > 0 else 0
+		rate = stats["elems"] / stats["processing"] if stats["processing"] > 0 else 0
+		print(f"{collector}: {stats['units']} units, {stats['elems']} elems, stream wait {stats['wait']:.1f}s ({share:.0%}), "
+			f"processing {stats['processing']:.1f}s ({rate:.0f} elems/s), output {stats['other']:.1f}s, "
+			f"peak RSS {stats['peak_rss_kib'] / 1024:.0f} MiB, max {stats['prefixes']} prefixes")
+	print("#######################################")
+
+def report_throughput(results):
+	"""
+	Print the number of units, updates and updates/sec handled by each worker.
+	"""
+	per_worker = defaultdict(lambda: {"units": 0, "updates": 0, "elapsed": 0.0})
+	for result in results:
+		if result["status"] != "done":
+			continue
+		stats = per_worker[result["worker"]]
+		stats["units"] += 1
+		stats["updates"] += result["total_updates"]
+		stats["elapsed"] += result["elapsed"]
+
+	print("\n########## Worker Throughput ##########")
+	for worker, stats in sorted(per_worker.items()):
+		rate = stats["updates"] / stats["elapsed"] if stats["elapsed"] > 0 else 0
+		print(f"Worker {worker}: {stats['units']} units, {stats['updates']} updates in {stats['elapsed']:.1f}s ({rate:.0f} updates/s)")
+	print("#######################################")
+
+def setup(data_folder="data"):
+	os.makedirs(data_folder, exist_ok=True)
+
+def main(argv=None, prog=None):
+	global session_duration, years
+	parser = argparse.ArgumentParser(prog=prog, description="Automate BGPStream sessions")
+	parser.add_argument("collector_index", type=int, nargs="+", choices=range(len(collectors)), help="Choose one or more collector indexes (0, 1, ...)")
+	parser.add_argument("--years", type=int, nargs="+", help=f"Years to collect (default {' '.join(map(str, years))})")
+	parser.add_argument("--data", default="data", help="Folder the summaries and the run manifest are written to")
+	parser.add_argument("--workers", type=int, default=1, help="Number of worker processes (1 runs serially)")
+	parser.add_argument("--restart", action="store_true", help="Ignore the run manifest and redo every unit")
+	parser.add_argument("--duration", type=float, help="Session length in hours (default 2)")
+	parser.add_argument("--stream", action="store_true", help="Streaming mode: write events as they are detected and expire idle prefixes")
+	parser.add_argument("--idle-timeout", type=float, default=2 * 60 * 60, help="Seconds without an announcement before a prefix is forgotten (streaming mode)")
+	parser.add_argument("--timing", action="store_true", help="Also follow withdrawals and write per-origin MOAS timings (timing_*.tsv)")
+	parser.add_argument("--sub-moas", action="store_true", help="Also detect sub-MOAS / super-MOAS conflicts between overlapping prefixes")
+	parser.add_argument("--peers", action="store_true", help="Count the peers announcing each origin of a MOAS prefix (Peer Counts lines in the summary)")
+	parser.add_argument("--metrics", action="store_true", help=f"Write per-unit timing, elems/s, RSS and state sizes to <data>/{metrics_name}")
+	parser.add_argument("--profile", choices=PROFILERS, help="Profile every unit, writing <data>/profiles/profile_<collector>_<time>.prof / .html")
+	parser.add_argument("--mrt", metavar="DIR", help="Replay local MRT update dumps (gzip / bz2, under DIR/<collector>/ or DIR) instead of BGPStream")
+	parser.add_argument("--mrt-workers", type=int, default=1, help="Processes decoding the dump files of one unit (--mrt)")
+	parser.add_argument("--ipversion", choices=["4", "6"], help="Only IPv4 or IPv6 prefixes (filtered inside libBGPStream)")
+	parser.add_argument("--prefix", nargs="+", default=[], help="Only these prefixes and their more-specifics (filtered inside libBGPStream)")
+	parser.add_argument("--peer", type=int, nargs="+", default=[], help="Only elems from these peer ASNs (filtered inside libBGPStream)")
+	parser.add_argument("--schedule", metavar="CONFIG", help="JSON session schedule (schedule.py) instead of the first-week grid; --years and --duration override it")
+	args = parser.parse_args(argv)
+	for prefix in args.prefix:
+		try:
+			ipaddress.ip_network(prefix, strict=False)
+		except ValueError:
+			parser.error(f"--prefix: {prefix} is not a prefix")
+	if args.mrt and not os.path.isdir(args.mrt):
+		parser.error(f"--mrt: {args.mrt} is not a folder")
+	if args.stream and (args.timing or args.sub_moas or args.peers):
+		parser.error("--timing, --sub-moas and --peers are not available in streaming mode")
+	if args.schedule:
+		from schedule import load_config
+
+		try:
+			schedule_config = load_config(args.schedule, years=args.years, duration_hours=args.duration)
+		except (OSError, ValueError) as e:
+			parser.error(f"--schedule: {e}")
+	if args.profile == "pyinstrument":
+		try:
+			import pyinstrument  # Checked up front rather than failing every unit
+		except ImportError:
+			parser.error("--profile pyinstrument needs pyinstrument (pip install pyinstrument)")
+	setup(args.data)
+
+	if args.years:
+		years = args.years
+	if args.duration:
+		session_duration = timedelta(hours=args.duration)
+	idle_timeout = args.idle_timeout if args.stream else None
+	mrt = (args.mrt, args.mrt_workers) if args.mrt else None
+	filters = {"ipversion": args.ipversion, "prefixes": args.prefix, "peers": args.peer}
+	print(f"Stream filter: {stream_filter(args.timing, **filters)}")
+
+	collector_names = [collectors[index] for index in dict.fromkeys(args.collector_index)]
+	print(f"Using collectors: {', '.join(collector_names)}")
 
 	# Generate intervals (for testing, limit to the first 3 intervals with [:3] )
-	intervals = generate_intervals()
+	if args.schedule:
+		from schedule import plan, print_cost
+
+		intervals, costs = plan(schedule_config, collector_names, args.data, args.workers)
+		print(f"Schedule {args.schedule}: {len(intervals)} sessions per collector, estimated cost:")
+		print_cost(costs)
+	else:
+		intervals = generate_intervals()
 	#print(intervals)
 
-	for start_time, end_time in intervals:
-		start_time_str = start_time.strftime("%Y-%m-%d %H:%M:%S")
-		end_time_str = end_time.strftime("%Y-%m-%d %H:%M:%S")
-		print(f"\nProcessing interval: {start_time_str} to {end_time_str}")
-
-		# Initialize the BGPStream object
-		stream = get_stream(start_time_str, end_time_str, collector)
-
-		prefix_to_origins = {}  # Tracks unique origins (last AS) for each prefix
-		moas_events = {}        # Stores detected MOAS events
-		total_updates = 0
-		moas_count = 0
-
-		for elem in stream:
-			if elem.type == "A":  # Only process announcements
-				total_updates += 1
-				prefix = elem.fields.get("prefix", None)
-				as_path = elem.fields.get("as-path", None)
-
-				if prefix and as_path:
-					origin_asn = as_path.split()[-1]
-
-					if prefix not in prefix_to_origins:
-						prefix_to_origins[prefix] = set()
-
-					if origin_asn not in prefix_to_origins[prefix]:
-						if len(prefix_to_origins[prefix]) > 0:
-							######################3
-							# UNCOMMENT THIS TO ANALYZE EACH EVENT INDV.
-							# print(f"MOAS Event Detected: Prefix {prefix}")
-							# print(f"Existing Origins: {prefix_to_origins[prefix]}")
-							# print(f"New Origin ASN: {origin_asn}")
-							moas_count += 1
-
-							if prefix not in moas_events:
-								moas_events[prefix] = list(prefix_to_origins[prefix])
-							moas_events[prefix].append(origin_asn)
-
-					prefix_to_origins[prefix].add(origin_asn)
-
-		# Write the summary to a file
-		sanitized_time = start_time.strftime("%Y%m%d_%H%M")
-		filename = f"data/summary_{collector}_{sanitized_time}.txt"
-		with open(filename, "w") as file:
-			file.write(f"\nBGPStream Summary for {collector} ({start_time_str} to {end_time_str})\n\n")
-			file.write("MOAS Events Summary:\n")
-			file.write(f"\nTotal Updates: {total_updates}\n")
-			file.write(f"MOAS Count: {moas_count}\n")
-			file.write(f"MOAS Ratio: {moas_count}/{total_updates}\n\n")
-			for prefix, origins in moas_events.items():
-				file.write(f"Prefix: {prefix}\n")
-				file.write(f"  Origin ASNs: {', '.join(origins)}\n")
-
-		print(f"Summary written to {filename}")
+	units = generate_units(collector_names, intervals)
+	if args.restart:
+		manifest_path = os.path.join(args.data, manifest_name)
+		if os.path.exists(manifest_path):
+			os.remove(manifest_path)
+	pending, mismatched = pending_units(units, args.data, unit_options(idle_timeout, args.timing, args.sub_moas, args.peers, filters, mrt))
+	if mismatched:
+		collector, start_time, end_time = mismatched[0]
+		parser.error(
+			f"{len(mismatched)} completed units in {args.data} were collected with other options or another session length "
+			f"(e.g. {unit_key(collector, start_time)}); rerun with --restart to redo them, or use another --data folder"
+		)
+	remove_partial_files(pending, args.data)
+	print(f"Skipping {len(units) - len(pending)} completed units")
+	print(f"Scheduling {len(pending)} units on {max(args.workers, 1)} worker(s)")
+
+	results = []
+	for result in run_units(pending, args.workers, args.data, idle_timeout, args.timing, args.sub_moas, args.metrics, args.profile, mrt, filters, args.peers):
+		record_unit(result, args.data)
+		record_metrics(result, args.data)
+		start_time_str = result["start_time"].strftime("%Y-%m-%d %H:%M:%S")
+		if result["status"] == "done":
+			print(f"Processed {result['collector']} interval starting {start_time_str} in {result['elapsed']:.1f}s")
+			print(f"Summary written to {result['filename']}")
+		else:
+			print(f"Failed {result['collector']} interval starting {start_time_str}: {result['error']}")
+		results.append(result)
+
+	failed = sum(1 for result in results if result["status"] != "done")
+	if failed:
+		print(f"{failed} units failed; rerun to retry them")
+	report_throughput(results)
+	if args.metrics:
+		report_metrics(results)
 
 if __name__ == "__main__":
 	main()
@@ -1,7 +1,6 @@
-import os
-import re
 import matplotlib.pyplot as plt
 import pandas as pd  # Optional, but helpful for managing data
+from summarystore import load_sessions
 
 ########
 # creates 2 seperate graphs
@@ -16,29 +15,17 @@ def parse_logs(log_dir):
 	"""
 	data = []
 	
-	for filename in os.listdir(log_dir):
-		if filename.endswith(".txt"):  # Ensure we process only text files
-			filepath = os.path.join(log_dir, filename)
+	for session in load_sessions(log_dir):
+		if session["start_time"]:
+			total_updates = session["total_updates"]
+			moas_count = session["moas_count"]
 			
-			with open(filepath, "r") as file:
-				lines = file.readlines()
-				
-				# Extract details using known line structure
-				timestamp_match = re.search(r"(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2})", lines[1])
-				updates_match = re.search(r"Total Updates: (\d+)", lines[5])
-				moas_match = re.search(r"MOAS Count: (\d+)", lines[6])
-				
-				if timestamp_match and updates_match and moas_match:
-					timestamp = timestamp_match.group(1)
-					total_updates = int(updates_match.group(1))
-					moas_count = int(moas_match.group(1))
-					
-					data.append({
-						"timestamp": timestamp,
-						"total_updates": total_updates,
-						"moas_count": moas_count,
-						"moas_ratio": moas_count / total_updates if total_updates > 0 else 0
-					})
+			data.append({
+				"timestamp": session["start_time"],
+				"total_updates": total_updates,
+				"moas_count": moas_count,
+				"moas_ratio": moas_count / total_updates if total_updates > 0 else 0
+			})
 	
 	return pd.DataFrame(data)
 
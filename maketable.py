@@ -1,53 +1,90 @@
-import os
-from collections import defaultdict
+import argparse
 
-def analyze_data(data_folder="data", one_session_file="one_session.txt", output_file="moas_table.txt"):
-	# Initialize dictionary to hold yearly data
-	yearly_data = {year: {"announcement_count": 0, "moas_count": 0, "short_count": 0} for year in range(2014, 2025)}
+from summaryparser import iter_event_log
+from summarystore import TIME_KEYS, add_time_keys, session_table
 
-	# Step 1: Process files in the data folder
-	for filename in sorted(os.listdir(data_folder)):
-		if filename.endswith(".txt"):
-			filepath = os.path.join(data_folder, filename)
+GROUP_KEYS = list(TIME_KEYS) + ["collector"]
 
-			with open(filepath, "r") as file:
-				lines = file.readlines()
+def short_lived_table(one_session_files):
+	"""
+	One row per event of the one-session files, with the collector, start_time and time keys
+	of the session it was seen in (from names like "summary_route-views2_20140304_0000.txt").
+	"""
+	import pandas as pd
 
-				# Extract year from the second line (line 1 in Python)
-				year_line = lines[1].split("(")[1].split("-")[0].strip()
-				year = int(year_line)
+	seen_in = [
+		event["seen_in"]
+		for one_session_file in one_session_files
+		for event in iter_event_log(one_session_file)
+		if "seen_in" in event
+	]
+	table = pd.DataFrame({"seen_in": pd.Series(seen_in, dtype=object)})
+	parts = table["seen_in"].str.extract(r"summary_(.+)_(\d{8}_\d{4})\.txt")
+	table["collector"] = parts[0]
+	table["start_time"] = pd.to_datetime(parts[1], format="%Y%m%d_%H%M")
+	return add_time_keys(table)
 
-				# Extract announcement count and MOAS count from lines 6 and 7 (lines 5 and 6 in Python)
-				announcement_count = int(lines[5].split(":")[1].strip())
-				moas_count = int(lines[6].split(":")[1].strip())
+def aggregate(sessions, short_lived, keys=("year",)):
+	"""
+	Announcements, MOAS count, MOAS ratio and short-lived MOAS count per group of sessions.
+	keys can be any of GROUP_KEYS (year, month, day, hour, weekday, collector).
+	"""
+	keys = list(keys)
+	sessions = sessions.assign(collector=sessions["collector"].astype(str))
+	table = sessions.groupby(keys)[["total_updates", "moas_count"]].sum()
+	table["moas_ratio"] = table["moas_count"] / table["total_updates"]
+	table["short_count"] = short_lived.groupby(keys).size().reindex(table.index, fill_value=0).astype(int)
+	return table
 
-				# Update the dictionary
-				yearly_data[year]["announcement_count"] += announcement_count
-				yearly_data[year]["moas_count"] += moas_count
+def write_table(table, keys, output_file):
+	"""Write the table with one column per key, each as wide as its longest value or header plus two spaces."""
+	keys = list(keys)
+	groups = [group if isinstance(group, tuple) else (group,) for group in table.index]
+	widths = [
+		max([len(key)] + [len(str(group[column])) for group in groups]) + 2
+		for column, key in enumerate(keys)
+	]
+	with open(output_file, "w") as file:
+		file.write("".join(f"{key.capitalize():<{width}}" for key, width in zip(keys, widths)))
+		file.write(f"{'Announcements':<15}{'MOAS Count':<15}{'MOAS Ratio':<15}{'Short-Lived MOAS':<10}\n")
+		file.write("=" * (sum(widths) + 61) + "\n")
+		for group, (_, row) in zip(groups, table.iterrows()):
+			ratio = "{:.6f}".format(row["moas_ratio"])
+			file.write("".join(f"{str(value):<{width}}" for value, width in zip(group, widths)))
+			file.write(f"{int(row['total_updates']):<15}{int(row['moas_count']):<15}{ratio:<15}{int(row['short_count']):<10}\n")
 
-	# Step 2: Process the one-session file for short-lived MOAS counts
-	with open(one_session_file, "r") as file:
-		lines = file.readlines()
+def analyze_data(data_folder="data", one_session_file="one_session.txt", output_file="moas_table.txt", keys=("year",), years=None, collectors=None):
+	"""
+	Aggregate the session headers (store or text) and the one-session events per group and write the table.
+	one_session_file can be one path or a list of paths; years / collectors restrict the sessions.
+	"""
+	one_session_files = [one_session_file] if isinstance(one_session_file, str) else list(one_session_file)
 
-		# Extract years from lines like "Seen in: summary_route-views2_20140304_0000.txt"
-		for i in range(1, len(lines), 4):  # Start from line 2 in text (index 1 in Python), step by 4
-			line = lines[i]
-			if "Seen in:" in line:
-				year = int(line.split("_")[2][:4])  # Extract year from the filename
-				yearly_data[year]["short_count"] += 1
+	# Step 1: One row per session, one row per short-lived MOAS event
+	sessions = session_table(data_folder)
+	short_lived = short_lived_table(one_session_files)
+	if years:
+		sessions = sessions[sessions["year"].isin(years)]
+		short_lived = short_lived[short_lived["year"].isin(years)]
+	if collectors:
+		sessions = sessions[sessions["collector"].isin(collectors)]
+		short_lived = short_lived[short_lived["collector"].isin(collectors)]
 
-	# Step 3: Write results to output file
-	with open(output_file, "w") as file:
-		file.write(f"{'Year':<10}{'Announcements':<15}{'MOAS Count':<15}{'MOAS Ratio':<15}{'Short-Lived MOAS':<10}\n")
-		file.write("=" * 70 + "\n")
-		for year in range(2014, 2025):
-			announcements = yearly_data[year]["announcement_count"]
-			moas = yearly_data[year]["moas_count"]
-			ratio = "{:.6f}".format(moas/announcements)
-			short = yearly_data[year]["short_count"]
-			file.write(f"{year:<10}{announcements:<15}{moas:<15}{ratio:<15}{short:<10}\n")
+	# Step 2: Group both tables by the same keys
+	table = aggregate(sessions, short_lived, keys)
 
+	# Step 3: Write results to output file
+	write_table(table, keys, output_file)
 	print(f"Analysis complete. Results written to {output_file}")
+	return table
 
 if __name__ == "__main__":
-	analyze_data("data", "one_session.txt", "moas_table.txt")
+	parser = argparse.ArgumentParser(description="Announcements, MOAS and short-lived MOAS counts per group of sessions")
+	parser.add_argument("--data", default="data", help="Folder with the summary files (or the store built from them)")
+	parser.add_argument("--one-session", nargs="+", default=["one_session.txt"], help="One-session files with the short-lived events")
+	parser.add_argument("--output", default="moas_table.txt", help="Table to write")
+	parser.add_argument("--by", nargs="+", default=["year"], choices=GROUP_KEYS, help="Group keys, e.g. --by year collector")
+	parser.add_argument("--years", type=int, nargs="+", help="Only these years")
+	parser.add_argument("--collectors", nargs="+", help="Only these collectors")
+	args = parser.parse_args()
+	analyze_data(args.data, args.one_session, args.output, args.by, args.years, args.collectors)
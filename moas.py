@@ -0,0 +1,136 @@
+import argparse
+import sys
+
+########
+# one entry point for the whole pipeline: python moas.py <command> [options]
+#   collect      run the BGPStream sessions and write the summaries (main.py)
+#   monitor      follow a live (or replayed) stream and write a summary per rolling window (monitor.py)
+#   lifetimes    one_session / multi_session files from the lifetime index (durationcounter.py)
+#   one-session  yearly one_session_<year>.txt files (find_onesession_yearly.py)
+#   table        yearly MOAS table (maketable.py)
+#   graph        MOAS count / ratio graphs (combinedgraph.py, makegraph.py)
+#   enrich       RIPEstat or offline ASN enrichment (sus_asn_detection.py)
+#   score        suspicion score distributions or the per-event ranking (suspicionscorer.py)
+# only argparse is imported up front; each command imports its module (and pandas, matplotlib, pybgpstream) when it runs
+########
+
+# maketable.GROUP_KEYS, repeated here so that parsing the command line does not import pandas
+TABLE_KEYS = ["year", "month", "day", "hour", "weekday", "collector"]
+
+def run_collect(args):
+	import main
+	main.main(args.args, prog="moas collect")
+
+def run_monitor(args):
+	import monitor
+	monitor.main(args.args, prog="moas monitor")
+
+def load_index(args):
+	"""The lifetime index, updated with the new summary files unless --no-update."""
+	from lifetimeindex import LifetimeIndex, update_index
+
+	return LifetimeIndex(args.index) if args.no_update else update_index(args.data, args.index)
+
+def run_lifetimes(args):
+	from durationcounter import write_logs
+
+	write_logs(load_index(args).prefix_data(), args.one_session, args.multi_session)
+	print(f"Wrote {args.one_session} and {args.multi_session}")
+
+def run_one_session(args):
+	from find_onesession_yearly import write_logs_by_year
+
+	write_logs_by_year(load_index(args).prefix_data(), args.output, args.years)
+
+def run_table(args):
+	from maketable import analyze_data
+
+	analyze_data(args.data, args.one_session, args.output, args.by, args.years, args.collectors)
+
+def run_graph(args):
+	if args.kind == "combined":
+		from combinedgraph import plot_combined_graph, process_logs
+
+		plot_combined_graph(process_logs(args.data), args.output)
+		print(f"Graph saved: {args.output}")
+	else:
+		from makegraph import parse_logs, plot_data
+
+		plot_data(parse_logs(args.data))
+
+def run_enrich(args):
+	import sus_asn_detection
+	sus_asn_detection.main(args.args, prog="moas enrich")
+
+def run_score(args):
+	from suspicionscorer import analyze_asn_scores, score_events
+
+	if args.events:
+		score_events(args.events, args.folder, args.ranking, args.years)
+	else:
+		analyze_asn_scores(args.folder, args.years)
+
+def build_parser():
+	parser = argparse.ArgumentParser(prog="moas", description="MOAS collection and analysis pipeline")
+	commands = parser.add_subparsers(dest="command", metavar="command", required=True)
+
+	# collect, monitor and enrich pass every option through to main.py / monitor.py / sus_asn_detection.py, --help included
+	command = commands.add_parser("collect", add_help=False, help="Run BGPStream sessions and write the summaries (options of main.py)")
+	command.set_defaults(run=run_collect, passthrough=True)
+
+	command = commands.add_parser("monitor", add_help=False, help="Follow a live or replayed stream in rolling windows (options of monitor.py)")
+	command.set_defaults(run=run_monitor, passthrough=True)
+
+	command = commands.add_parser("lifetimes", help="Write one_session / multi_session files from the lifetime index")
+	command.add_argument("--data", default="data", help="Folder with the summary files")
+	command.add_argument("--index", default="lifetime_index.json", help="Lifetime index file")
+	command.add_argument("--no-update", action="store_true", help="Read the index as it is, without parsing new summary files")
+	command.add_argument("--one-session", default="one_session.txt", help="Prefixes seen in one session")
+	command.add_argument("--multi-session", default="multi_session.txt", help="Prefixes seen in several sessions")
+	command.set_defaults(run=run_lifetimes)
+
+	command = commands.add_parser("one-session", help="Write one_session_<year>.txt files from the lifetime index")
+	command.add_argument("--data", default="data", help="Folder with the summary files")
+	command.add_argument("--index", default="lifetime_index.json", help="Lifetime index file")
+	command.add_argument("--no-update", action="store_true", help="Read the index as it is, without parsing new summary files")
+	command.add_argument("--output", default="output", help="Folder for the yearly files")
+	command.add_argument("--years", type=int, nargs="+", help="Only these years")
+	command.set_defaults(run=run_one_session)
+
+	command = commands.add_parser("table", help="Announcements, MOAS and short-lived MOAS counts per year")
+	command.add_argument("--data", default="data", help="Folder with the summary files (or the store built from them)")
+	command.add_argument("--one-session", nargs="+", default=["one_session.txt"], help="One-session files with the short-lived events")
+	command.add_argument("--output", default="moas_table.txt", help="Table to write")
+	command.add_argument("--by", nargs="+", default=["year"], choices=TABLE_KEYS, help="Group keys, e.g. --by year collector")
+	command.add_argument("--years", type=int, nargs="+", help="Only these years")
+	command.add_argument("--collectors", nargs="+", help="Only these collectors")
+	command.set_defaults(run=run_table)
+
+	command = commands.add_parser("graph", help="Plot MOAS count and ratio")
+	command.add_argument("--data", default="data", help="Folder with the summary files")
+	command.add_argument("--kind", choices=["combined", "timeline"], default="combined", help="combined: one saved figure, timeline: two figures shown on screen")
+	command.add_argument("--output", default="combined_graph.png", help="Image written by the combined graph")
+	command.set_defaults(run=run_graph)
+
+	command = commands.add_parser("enrich", add_help=False, help="Analyze the ASNs of one-session events (options of sus_asn_detection.py)")
+	command.set_defaults(run=run_enrich, passthrough=True)
+
+	command = commands.add_parser("score", help="Suspicion score distributions, or the per-event ranking with --events")
+	command.add_argument("--folder", default="output", help="Folder with the asn_analysis_results_<year> files")
+	command.add_argument("--years", type=int, nargs="+", help="Only these years (default: every year found)")
+	command.add_argument("--events", nargs="+", help="One-session files whose events are ranked")
+	command.add_argument("--ranking", default="output/moas_event_ranking.tsv", help="Per-event ranking written with --events")
+	command.set_defaults(run=run_score)
+	return parser
+
+def main(argv=None):
+	parser = build_parser()
+	args, extra = parser.parse_known_args(argv)
+	if getattr(args, "passthrough", False):
+		args.args = extra
+	elif extra:
+		parser.error(f"unrecognized arguments: {' '.join(extra)}")
+	args.run(args)
+
+if __name__ == "__main__":
+	main(sys.argv[1:])
@@ -1,4 +1,7 @@
+import os
 from datetime import datetime
+from statistics import median
+from summaryparser import iter_event_log, iter_timing, list_timing_files
 
 def calculate_event_durations(input_file="multi_session.txt"):
 	# Variables to store total durations and counts
@@ -18,37 +21,25 @@ def calculate_event_durations(input_file="multi_session.txt"):
 			print(f"Error parsing date from {filename}: {e}")
 			return None
 
-	# Open and process the file
-	with open(input_file, "r") as file:
-		lines = file.readlines()
+	# Process the "First Seen" and "Last Seen" filenames of every event
+	for event in iter_event_log(input_file):
+		if "first_seen" in event and "last_seen" in event:
+			# Parse dates
+			first_seen_date = parse_date(event["first_seen"])
+			last_seen_date = parse_date(event["last_seen"])
 
-		# Process every pair of "First Seen" and "Last Seen" lines
-		for i in range(1, len(lines), 6):  # Line 2, 3, 8, 9... in text file (indices 1, 2, 7, 8 in Python)
-			if i + 1 < len(lines):
-				first_seen_line = lines[i].strip()
-				last_seen_line = lines[i + 1].strip()
+			if first_seen_date and last_seen_date:
+				# Calculate duration in days
+				duration = (last_seen_date - first_seen_date).total_seconds() / (60 * 60 * 24)  # Convert seconds to days
 
-				# Extract filenames
-				if first_seen_line.startswith("First Seen:") and last_seen_line.startswith("Last Seen:"):
-					first_seen_file = first_seen_line.split(":")[1].strip()
-					last_seen_file = last_seen_line.split(":")[1].strip()
+				# Update total stats
+				total_duration += duration
+				total_count += 1
 
-					# Parse dates
-					first_seen_date = parse_date(first_seen_file)
-					last_seen_date = parse_date(last_seen_file)
-
-					if first_seen_date and last_seen_date:
-						# Calculate duration in days
-						duration = (last_seen_date - first_seen_date).total_seconds() / (60 * 60 * 24)  # Convert seconds to days
-
-						# Update total stats
-						total_duration += duration
-						total_count += 1
-
-						# Update short-duration stats if duration < 30 days
-						if duration < 30:
-							short_duration += duration
-							short_count += 1
+				# Update short-duration stats if duration < 30 days
+				if duration < 30:
+					short_duration += duration
+					short_count += 1
 
 	# Calculate averages
 	overall_avg = total_duration / total_count if total_count > 0 else 0
@@ -62,5 +53,34 @@ def calculate_event_durations(input_file="multi_session.txt"):
 	print(f"Short-Lived Average Duration: {short_avg:.2f} days")
 	print("#############################")
 
+def calculate_timed_durations(data_folder="data", short_minutes=60):
+	"""
+	Minute-level MOAS durations from the timing_*.tsv tables (main.py --timing):
+	one duration per MOAS prefix and session, the time two or more of its origins were announced at once.
+	"""
+	durations = []
+	for filename in list_timing_files(data_folder):
+		seen = set()
+		for record in iter_timing(os.path.join(data_folder, filename)):
+			if record.prefix in seen:
+				continue  # The prefix-level columns repeat on every origin row
+			seen.add(record.prefix)
+			durations.append(record.moas_seconds / 60)
+
+	if not durations:
+		print(f"No timing tables in {data_folder}; run main.py with --timing")
+		return
+
+	short = [duration for duration in durations if duration < short_minutes]
+	print("########## Timed Results ##########")
+	print(f"Total Events: {len(durations)}")
+	print(f"Average Duration: {sum(durations) / len(durations):.1f} minutes (median {median(durations):.1f})")
+	print(f"Never Overlapping (0 minutes): {sum(1 for duration in durations if duration == 0)}")
+	print(f"Short-Lived Events (Duration < {short_minutes} minutes): {len(short)}")
+	if short:
+		print(f"Short-Lived Average Duration: {sum(short) / len(short):.1f} minutes")
+	print("###################################")
+
 if __name__ == "__main__":
 	calculate_event_durations("./output/multi_session.txt")
+	calculate_timed_durations("data")
@@ -0,0 +1,394 @@
+from peerorigins import PeerOrigins
+from submoas import SubMOASTracker
+
+########
+# compact MOAS detector used by main.py
+# prefixes are keyed on the prefix string as received and origins are interned ints,
+# a prefix with a single origin stores that int inline; a set is only allocated once a second origin shows up
+# (packing prefixes into ints saved little memory over the strings but made every update slower than the legacy sets)
+# the origin is sliced off the end of the AS path instead of splitting the whole path
+# detection and output are the same as the original per-prefix string sets
+# StreamingMOASDetector reports events as they happen and forgets idle prefixes, for windows of a day or more
+# TimedMOASDetector also follows withdrawals and times every origin of a MOAS prefix to the second
+# with sub_moas=True new (prefix, origin) pairs also go to a SubMOASTracker (submoas.py) for overlapping-prefix conflicts
+# with peers=True every announcement also marks its peer in PeerOrigins (peerorigins.py), to count the peers behind each origin
+########
+
+def parse_origin(token):
+	"""Origin AS token -> int, or the token itself for AS sets such as '{1,2}'."""
+	return int(token) if token.isdigit() else token
+
+class MOASDetector:
+	"""
+	Tracks the origins seen for each prefix and records a MOAS event whenever a new origin
+	joins a prefix that already has one.
+	Origin tokens are interned, so every prefix announced by one AS points at the same int.
+	"""
+	def __init__(self, sub_moas=False, peers=False):
+		self.origins = {}  # prefix -> origin, or set of origins once there are several
+		self.events = {}   # prefix -> [prefix, origins in the order they appeared]
+		self.asns = {}     # origin token -> interned origin
+		self.moas_count = 0
+		self.sub_moas = SubMOASTracker() if sub_moas else None
+		self.peers = PeerOrigins() if peers else None
+
+	def announce(self, prefix, as_path, peer=None):
+		"""Process one announcement (from peer, the peer address, when peers are tracked); returns True if it caused a MOAS event."""
+		token = as_path.rpartition(" ")[2] or as_path.split()[-1]  # split only for trailing whitespace
+		origin = self.asns.get(token)
+		if origin is None:
+			origin = self.asns[token] = parse_origin(token)
+		current = self.origins.get(prefix)
+		if self.peers is not None:
+			self.peers.see(prefix, current, origin, peer)
+		if current is None:
+			self.origins[prefix] = origin
+			if self.sub_moas is not None:
+				self.sub_moas.add(prefix, origin)
+			return False
+		if type(current) is set:
+			if origin in current:
+				return False
+			current.add(origin)
+		else:
+			if current == origin:
+				return False
+			self.origins[prefix] = {current, origin}
+
+		self.record_event(prefix, current, origin)
+		if self.sub_moas is not None:
+			self.sub_moas.add(prefix, origin)
+		return True
+
+	def process(self, stream):
+		"""
+		Run every announcement of a pybgpstream stream through the detector; returns the number of announcements.
+		Same steps as announce, inlined because this loop runs once per update.
+		"""
+		origins = self.origins
+		asns = self.asns
+		sub_moas = self.sub_moas
+		peers = self.peers
+		total_updates = 0
+		for elem in stream:
+			if elem.type != "A":  # Only process announcements
+				continue
+			total_updates += 1
+			fields = elem.fields
+			prefix = fields.get("prefix", None)
+			as_path = fields.get("as-path", None)
+			if not prefix or not as_path:
+				continue
+
+			token = as_path.rpartition(" ")[2] or as_path.split()[-1]
+			origin = asns.get(token)
+			if origin is None:
+				origin = asns[token] = parse_origin(token)
+
+			current = origins.get(prefix)
+			if peers is not None:
+				peers.see(prefix, current, origin, elem.peer_address)
+			if current is None:
+				origins[prefix] = origin
+				if sub_moas is not None:
+					sub_moas.add(prefix, origin)
+				continue
+			if type(current) is set:
+				if origin in current:
+					continue
+				current.add(origin)
+			elif current == origin:
+				continue
+			else:
+				origins[prefix] = {current, origin}
+			self.record_event(prefix, current, origin)
+			if sub_moas is not None:
+				sub_moas.add(prefix, origin)
+		return total_updates
+
+	def record_event(self, prefix, current, origin):
+		"""
+		A new origin joined a prefix; current is what the prefix held before (one origin or the set).
+		Returns the prefix's event: [prefix, origins in order].
+		"""
+		self.moas_count += 1
+		event = self.events.get(prefix)
+		if event is None:
+			event = self.events[prefix] = [prefix, current, origin]  # First conflict: current is still the single earlier origin
+		else:
+			event.append(origin)
+		return event
+
+	def moas_events(self):
+		"""{prefix: [origin ASNs as strings]} in detection order, as written to the summary."""
+		return {event[0]: [str(origin) for origin in event[1:]] for event in self.events.values()}
+
+	def peer_counts(self):
+		"""{prefix: [number of peers that announced each origin]} in the order of moas_events (needs peers=True)."""
+		return {prefix: self.peers.counts(prefix, event[1:]) for prefix, event in self.events.items()}
+
+	def state_sizes(self):
+		"""Entry counts of the detector state, for main.py --metrics."""
+		sizes = {"prefixes": len(self.origins), "moas_prefixes": len(self.events), "asns": len(self.asns)}
+		if self.sub_moas is not None:
+			sizes["sub_moas_prefixes"] = self.sub_moas.size
+			sizes["sub_moas_conflicts"] = len(self.sub_moas)
+		if self.peers is not None:
+			sizes.update(self.peers.state_sizes())
+		return sizes
+
+	def __len__(self):
+		return len(self.origins)
+
+class StreamingMOASDetector(MOASDetector):
+	"""
+	MOASDetector with bounded state for long windows.
+	on_event(time, prefix, origins) is called for every MOAS event as it is detected.
+	Prefix state lives in two generations rotated every idle_timeout seconds of stream time:
+	a prefix not announced for idle_timeout is forgotten by the second rotation (so after 1-2x idle_timeout),
+	and its event, if any, is handed to on_flush(prefix, origins) first.
+	A forgotten prefix starts over, so an origin that returns after a long silence is not a new conflict.
+	"""
+	def __init__(self, idle_timeout, on_event=None, on_flush=None):
+		super().__init__()
+		self.idle_timeout = idle_timeout
+		self.on_event = on_event
+		self.on_flush = on_flush
+		self.previous_origins = {}
+		self.previous_events = {}
+		self.rotate_at = None
+		self.expired = 0
+
+	def rotate(self, now):
+		"""Drop the older generation (flushing its events) and start a new one."""
+		self.expired += len(self.previous_origins)
+		for event in self.previous_events.values():
+			self.flush_event(event)
+		self.previous_origins, self.origins = self.origins, {}
+		self.previous_events, self.events = self.events, {}
+		self.rotate_at = now + self.idle_timeout
+
+	def flush_event(self, event):
+		if self.on_flush is not None:
+			self.on_flush(event[0], [str(origin) for origin in event[1:]])
+
+	def process(self, stream):
+		"""
+		Same as MOASDetector.process, plus generation rotation on elem.time and the on_event callback.
+		"""
+		asns = self.asns
+		total_updates = 0
+		for elem in stream:
+			if elem.type != "A":  # Only process announcements
+				continue
+			total_updates += 1
+			now = elem.time
+			if self.rotate_at is None:
+				self.rotate_at = now + self.idle_timeout
+			elif now >= self.rotate_at:
+				self.rotate(now)
+			fields = elem.fields
+			prefix = fields.get("prefix", None)
+			as_path = fields.get("as-path", None)
+			if not prefix or not as_path:
+				continue
+
+			token = as_path.rpartition(" ")[2] or as_path.split()[-1]
+			origin = asns.get(token)
+			if origin is None:
+				origin = asns[token] = parse_origin(token)
+
+			origins = self.origins
+			current = origins.get(prefix)
+			if current is None:
+				current = self.previous_origins.pop(prefix, None)
+				if current is None:
+					origins[prefix] = origin
+					continue
+				origins[prefix] = current  # Announced again: move the prefix (and its event) to the current generation
+				event = self.previous_events.pop(prefix, None)
+				if event is not None:
+					self.events[prefix] = event
+			if type(current) is set:
+				if origin in current:
+					continue
+				current.add(origin)
+			elif current == origin:
+				continue
+			else:
+				origins[prefix] = {current, origin}
+			event = self.record_event(prefix, current, origin)
+			if self.on_event is not None:
+				self.on_event(now, prefix, [str(origin) for origin in event[1:]])
+		return total_updates
+
+	def finish(self):
+		"""Flush the events still held, oldest generation first; returns the number of prefixes still tracked."""
+		for event in self.previous_events.values():
+			self.flush_event(event)
+		for event in self.events.values():
+			self.flush_event(event)
+		tracked = len(self.previous_origins) + len(self.origins)
+		self.previous_events, self.events = {}, {}
+		return tracked
+
+	def state_sizes(self):
+		sizes = super().state_sizes()
+		sizes["prefixes"] += len(self.previous_origins)
+		sizes["moas_prefixes"] += len(self.previous_events)
+		sizes["expired_prefixes"] = self.expired
+		return sizes
+
+	def __len__(self):
+		return len(self.origins) + len(self.previous_origins)
+
+class PrefixTiming:
+	"""
+	Online interval tracking for one MOAS prefix.
+	origins: origin -> [first announcement, last announcement, announcements, seconds up, up since (None when down)]
+	moas_seconds accumulates the time two or more origins were up at once.
+	"""
+	__slots__ = ("origins", "up", "moas_since", "moas_first", "moas_seconds", "withdrawals")
+
+	def __init__(self):
+		self.origins = {}
+		self.up = 0
+		self.moas_since = None
+		self.moas_first = None
+		self.moas_seconds = 0
+		self.withdrawals = 0
+
+	def announce(self, origin, now):
+		state = self.origins.get(origin)
+		if state is None:
+			state = self.origins[origin] = [now, now, 0, 0, None]
+		state[1] = now
+		state[2] += 1
+		if state[4] is None:
+			state[4] = now
+			self.up += 1
+			if self.up == 2:
+				self.moas_since = now
+				if self.moas_first is None:
+					self.moas_first = now
+
+	def down(self, now):
+		"""Every origin goes down (a withdrawal, or the end of the window)."""
+		for state in self.origins.values():
+			if state[4] is not None:
+				state[3] += now - state[4]
+				state[4] = None
+		if self.moas_since is not None:
+			self.moas_seconds += now - self.moas_since
+			self.moas_since = None
+		self.up = 0
+
+class TimedMOASDetector(MOASDetector):
+	"""
+	MOASDetector that also reads withdrawals ("W" elems) and times the origins of every MOAS prefix.
+	An origin is up from an announcement until the next withdrawal of the prefix or the end of the window.
+	Peers are merged, so a withdrawal from any peer takes every origin of the prefix down (an approximation).
+	Prefixes with a single origin only keep [first, last, announcements, up since, seconds up, withdrawals]
+	until a second origin shows up; all of it carries over, so flaps before the first conflict are counted.
+	"""
+	def __init__(self, sub_moas=False, peers=False):
+		super().__init__(sub_moas, peers)
+		self.singles = {}  # prefix -> [first, last, announcements, up since or None, seconds up, withdrawals] of its only origin
+		self.timings = {}  # MOAS prefix -> PrefixTiming
+
+	def process(self, stream):
+		"""Same as MOASDetector.process, plus withdrawals and timing; times are whole seconds."""
+		asns = self.asns
+		origins = self.origins
+		singles = self.singles
+		timings = self.timings
+		sub_moas = self.sub_moas
+		peers = self.peers
+		total_updates = 0
+		for elem in stream:
+			elem_type = elem.type
+			if elem_type == "W":
+				prefix = elem.fields.get("prefix", None)
+				if prefix:
+					timing = timings.get(prefix)
+					if timing is not None:
+						timing.withdrawals += 1
+						timing.down(int(elem.time))
+					else:
+						single = singles.get(prefix)
+						if single is not None:
+							single[5] += 1
+							if single[3] is not None:
+								single[4] += int(elem.time) - single[3]
+								single[3] = None
+				continue
+			if elem_type != "A":
+				continue
+			total_updates += 1
+			fields = elem.fields
+			prefix = fields.get("prefix", None)
+			as_path = fields.get("as-path", None)
+			if not prefix or not as_path:
+				continue
+
+			now = int(elem.time)
+			token = as_path.rpartition(" ")[2] or as_path.split()[-1]
+			origin = asns.get(token)
+			if origin is None:
+				origin = asns[token] = parse_origin(token)
+
+			timing = timings.get(prefix)
+			if timing is not None:
+				timing.announce(origin, now)
+			current = origins.get(prefix)
+			if peers is not None:
+				peers.see(prefix, current, origin, elem.peer_address)
+			if current is None:
+				origins[prefix] = origin
+				singles[prefix] = [now, now, 1, now, 0, 0]
+				if sub_moas is not None:
+					sub_moas.add(prefix, origin)
+				continue
+			if type(current) is set:
+				if origin in current:
+					continue
+				current.add(origin)
+			elif current == origin:
+				single = singles[prefix]
+				single[1] = now
+				single[2] += 1
+				if single[3] is None:
+					single[3] = now
+				continue
+			else:
+				origins[prefix] = {current, origin}
+			self.record_event(prefix, current, origin)
+			if sub_moas is not None:
+				sub_moas.add(prefix, origin)
+
+			if timing is None:
+				# First conflict: move the single origin's times into a PrefixTiming, then add the new origin
+				first, last, count, up_since, up_seconds, withdrawals = singles.pop(prefix)
+				timing = timings[prefix] = PrefixTiming()
+				timing.origins[current] = [first, last, count, up_seconds, up_since]
+				timing.up = 0 if up_since is None else 1
+				timing.withdrawals = withdrawals
+				timing.announce(origin, now)
+		return total_updates
+
+	def state_sizes(self):
+		sizes = super().state_sizes()
+		sizes["single_origin_timings"] = len(self.singles)
+		sizes["moas_timings"] = len(self.timings)
+		return sizes
+
+	def finish(self, end_time):
+		"""Close every open interval at the end of the window (unix seconds)."""
+		for timing in self.timings.values():
+			timing.down(end_time)
+
+	def timing_rows(self):
+		"""(prefix, origin, first, last, announcements, up_seconds, moas_first, moas_seconds, withdrawals) per MOAS prefix and origin."""
+		for prefix, timing in self.timings.items():
+			for origin, (first, last, count, up_seconds, _) in timing.origins.items():
+				yield prefix, str(origin), first, last, count, up_seconds, timing.moas_first, timing.moas_seconds, timing.withdrawals
@@ -1,59 +1,45 @@
-import os
-import re
-from collections import defaultdict
+import argparse
+
+from summarystore import record_table, session_table
 
 #this file checks for all moas events not limited to events which was seen only once
 
-# Path to the data folder
-data_folder = "./data/"
-
-# Dictionary to store prefix to ASN lists mapping
-prefix_asn_mapping = defaultdict(list)
-
-# Loop through all files in the data folder
-for file_name in os.listdir(data_folder):
-	# Process only files with '2014' in their name
-	if "2014" in file_name:
-		file_path = os.path.join(data_folder, file_name)
-		
-		with open(file_path, 'r') as file:
-			# Read all lines of the file
-			lines = file.readlines()
-			
-			# Start from the 10th line (index 9 if 0-based)
-			for i in range(9, len(lines), 2):  # Increment by 2 to handle pairs
-				# Line 10 (Prefix) and Line 11 (Origin ASNs)
-				prefix_line = lines[i].strip()
-				if i + 1 < len(lines):  # Ensure there is a next line
-					asn_line = lines[i + 1].strip()
-					
-					# Extract Prefix from the line
-					prefix_match = re.match(r"Prefix:\s+([\d\.\/]+)", prefix_line)
-					if prefix_match:
-						prefix = prefix_match.group(1)
-						
-						# Extract ASNs from the line
-						asn_match = re.match(r"Origin ASNs:\s+([\d,\s]+)", asn_line)
-						if asn_match:
-							# Parse ASNs into a list of integers
-							asns = list(map(str, asn_match.group(1).split(',')))
-							
-							# Add the ASN list for the prefix
-							prefix_asn_mapping[prefix].append(asns)
-
-# Group prefixes by the number of ASN lists, sorted in descending order
-grouped_prefixes = defaultdict(list)
-for prefix, asn_lists in prefix_asn_mapping.items():
-	grouped_prefixes[len(asn_lists)].append((prefix, asn_lists))
-
-# Write the results to a text file
-output_file = "grouped_prefixes_desc.txt"
-with open(output_file, "w") as file:
-	for group_size in sorted(grouped_prefixes, reverse=True):  # Sort descending
-		file.write(f"Prefixes with {group_size} ASN list(s):\n")
-		for prefix, asn_lists in grouped_prefixes[group_size]:
-			file.write(f"  Prefix: {prefix}\n")
-			file.write(f"    ASN Lists: {asn_lists}\n")
-		file.write("\n")
-
-print(f"Results have been written to {output_file}")
+def group_prefixes(data_folder="data", years=(2014,), collectors=None):
+	"""
+	{number of ASN lists: [(prefix, [ASN list per session]), ...]} for the sessions of the given years / collectors.
+	Prefixes keep the order of their first record.
+	"""
+	# Pick the sessions with a mask over the session table; only their records are loaded
+	sessions = session_table(data_folder)
+	mask = sessions["year"].isin(years)
+	if collectors:
+		mask &= sessions["collector"].isin(collectors)
+	records = record_table(data_folder, sessions=mask.to_numpy())
+
+	# One group per prefix: the ASN list of every session it was a MOAS prefix in
+	asn_lists = records.groupby("prefix", sort=False, observed=True)["origins"].agg(list)
+
+	grouped_prefixes = {}
+	for prefix, lists in asn_lists.items():
+		grouped_prefixes.setdefault(len(lists), []).append((prefix, lists))
+	return grouped_prefixes
+
+def write_grouped_prefixes(grouped_prefixes, output_file):
+	with open(output_file, "w") as file:
+		for group_size in sorted(grouped_prefixes, reverse=True):  # Sort descending
+			file.write(f"Prefixes with {group_size} ASN list(s):\n")
+			for prefix, asn_lists in grouped_prefixes[group_size]:
+				file.write(f"  Prefix: {prefix}\n")
+				file.write(f"    ASN Lists: {asn_lists}\n")
+			file.write("\n")
+
+if __name__ == "__main__":
+	parser = argparse.ArgumentParser(description="Prefixes grouped by the number of sessions they were a MOAS prefix in")
+	parser.add_argument("--data", default="data", help="Folder with the summary files (or the store built from them)")
+	parser.add_argument("--year", type=int, nargs="+", default=[2014], help="Years to include")
+	parser.add_argument("--collector", nargs="+", help="Only these collectors")
+	parser.add_argument("--output", default="grouped_prefixes_desc.txt", help="File to write")
+	args = parser.parse_args()
+
+	write_grouped_prefixes(group_prefixes(args.data, args.year, args.collector), args.output)
+	print(f"Results have been written to {args.output}")
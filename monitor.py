@@ -0,0 +1,208 @@
+import argparse
+import calendar
+import json
+import os
+import signal
+import time
+from datetime import datetime, timedelta, timezone
+from itertools import chain
+
+from lifetimeindex import INDEX_PATH, LifetimeIndex
+from main import collectors, get_stream, record_unit, setup, stream_filter, summary_filename, unit_options, write_summary
+from moasdetector import MOASDetector
+from summaryparser import PeerCountRecord, PrefixRecord
+
+########
+# long-running collection: follows a live BGPStream (or replays local MRT dumps with --mrt) for one collector
+# and cuts it into back-to-back windows aligned to the window length (2h: 00:00, 02:00, ...), so the windows that
+# fall on main.py's session grid get the same summary file; every closed window is written like a main.py session
+# (summary_<collector>_<time>.txt, manifest.jsonl record) without restarting the stream
+# the lifetime index is updated in memory after each window instead of rescanning data/, and each MOAS prefix is
+# classified as it goes: persistent once it shows up in a second window, short-lived once --horizon windows have passed
+# without it coming back; both go to <data>/moas_classes.jsonl, and the prefixes still waiting to <data>/moas_waiting.json
+# so a restart picks them up; a window the stream does not cover entirely (a --from inside it, or a stream that ends
+# before its end: --until, the end of an MRT replay) is not written, so main.py can still collect that session
+# e.g. python monitor.py 0, python monitor.py 0 --mrt fixtures/mrt --from "2024-01-01 00:00:00"
+########
+
+CLASSES_NAME = "moas_classes.jsonl"
+WAITING_NAME = "moas_waiting.json"
+
+class WindowMonitor:
+	"""
+	Cuts a time-ordered stream into windows of window seconds and writes one summary per window.
+	Each window gets a fresh detector, so its summary matches a main.py session over the same interval; what carries
+	over between windows is the lifetime index and the prefixes still waiting to be classified.
+	"""
+	def __init__(self, collector, window, data_folder="data", index_path=INDEX_PATH, horizon=12, sub_moas=False, peers=False, mrt=None):
+		self.collector = collector
+		self.window = window
+		self.data_folder = data_folder
+		self.horizon = horizon
+		self.sub_moas = sub_moas
+		self.peers = peers
+		self.options = unit_options(sub_moas=sub_moas, peers=peers, mrt=mrt)  # Manifest options, as main.py would record them
+		self.index = LifetimeIndex(index_path)
+		self.waiting = {}  # prefix seen in one window so far -> start of that window (unix seconds)
+		self.waiting_path = os.path.join(data_folder, WAITING_NAME)
+		if os.path.exists(self.waiting_path):
+			with open(self.waiting_path, "r") as file:
+				self.waiting = json.load(file)
+		self.pending = None  # First elem of the next window, read while closing the current one
+		self.windows = 0
+		self.skipped = 0
+
+	def window_elems(self, iterator, end):
+		"""Elems of the iterator until the first one at or past end, which is kept in pending."""
+		for elem in iterator:
+			if elem.time >= end:
+				self.pending = elem
+				return
+			yield elem
+
+	def process(self, stream, start=None, until=None):
+		"""
+		Run the stream through consecutive windows, closing each one as the first elem past its end arrives.
+		Windows start on multiples of the window length, the first one at start (unix seconds) or at the first elem;
+		windows without any elem are skipped. A window is only written when the stream covers it: it started by the
+		window's start and went past its end (an elem at or after it, or until at or after it); otherwise it is skipped.
+		"""
+		iterator = iter(stream)
+		self.pending = next(iterator, None)
+		window_start = int(start if start is not None else self.pending.time if self.pending else 0) // self.window * self.window
+		while self.pending is not None:
+			if self.pending.time >= window_start + self.window:
+				window_start = int(self.pending.time) // self.window * self.window
+			first, self.pending = self.pending, None
+			detector = MOASDetector(self.sub_moas, self.peers)
+			window_end = window_start + self.window
+			total_updates = detector.process(self.window_elems(chain((first,), iterator), window_end))
+			if (start is not None and start > window_start) or (self.pending is None and (until is None or until < window_end)):
+				self.skipped += 1
+				print(f"{self.collector} {datetime.fromtimestamp(window_start, timezone.utc):%Y-%m-%d %H:%M}: "
+					f"the stream does not cover the whole window, not written")
+			else:
+				self.close_window(window_start, detector, total_updates)
+			window_start = window_end
+
+	def close_window(self, window_start, detector, total_updates):
+		"""Write the window's summary and manifest record, update the lifetime index and classify."""
+		start_time = datetime.fromtimestamp(window_start, timezone.utc).replace(tzinfo=None)
+		end_time = start_time + timedelta(seconds=self.window)
+		filename = summary_filename(self.collector, start_time, self.data_folder)
+		moas_events = detector.moas_events()
+		peer_counts = detector.peer_counts() if self.peers else None
+		sub_moas_records = list(detector.sub_moas.records()) if self.sub_moas else None
+		write_summary(
+			filename, self.collector, start_time, end_time, total_updates, detector.moas_count, moas_events,
+			sub_moas_records, peer_counts, len(detector.peers.bits) if self.peers else None,
+		)
+		record_unit({
+			"collector": self.collector, "start_time": start_time, "end_time": end_time, "options": self.options, "status": "done", "filename": filename,
+			"total_updates": total_updates, "moas_count": detector.moas_count,
+		}, self.data_folder)
+
+		name = os.path.basename(filename)
+		if name in self.index.files or self.index.data_folder != os.path.abspath(self.data_folder):
+			# A window written before a restart (its file changed) or an index of another folder: rebuilt from the folder
+			self.index.update(self.data_folder)
+		else:
+			# The index takes the records straight from the detector and notes the file as indexed, so it is not parsed again
+			records = []
+			for prefix, origins in moas_events.items():
+				records.append(PrefixRecord(prefix, origins))
+				if peer_counts is not None:
+					records.append(PeerCountRecord(prefix, peer_counts[prefix]))
+			self.index.add_session(name, records)
+			stat = os.stat(filename)
+			self.index.files[name] = [stat.st_size, int(stat.st_mtime)]
+		self.index.save()
+
+		classified = self.classify(window_start, moas_events)
+		self.windows += 1
+		print(f"{self.collector} {start_time:%Y-%m-%d %H:%M}: {total_updates} updates, {detector.moas_count} MOAS, "
+			f"{classified['persistent']} persistent, {classified['short-lived']} short-lived, {len(self.waiting)} waiting")
+
+	def classify(self, window_start, moas_events):
+		"""
+		Persistent: the prefix is MOAS in a second window (also when it was called short-lived before, which it revises).
+		Short-lived: horizon windows passed since its only window.
+		Appends one JSON line per decision to moas_classes.jsonl, saves the prefixes still waiting and returns the number of each.
+		"""
+		classified = {"persistent": 0, "short-lived": 0}
+		decisions = []
+		for prefix in moas_events:
+			self.waiting.pop(prefix, None)
+			entry = self.index.prefixes[prefix]
+			if entry[2] == 1:
+				self.waiting[prefix] = window_start
+			elif entry[2] == 2:
+				decisions.append(("persistent", prefix, entry))
+		for prefix, seen_in in list(self.waiting.items()):
+			if (window_start - seen_in) // self.window >= self.horizon:
+				del self.waiting[prefix]
+				decisions.append(("short-lived", prefix, self.index.prefixes[prefix]))
+
+		with open(os.path.join(self.data_folder, CLASSES_NAME), "a") as file:
+			for label, prefix, (first_seen, last_seen, sessions, origins, peer_counts) in decisions:
+				classified[label] += 1
+				file.write(json.dumps({
+					"class": label, "prefix": prefix, "first_seen": first_seen, "last_seen": last_seen,
+					"sessions": sessions, "origins": sorted(origins), "peer_counts": peer_counts or None,
+				}) + "\n")
+		with open(self.waiting_path + ".tmp", "w") as file:
+			json.dump(self.waiting, file)
+		os.replace(self.waiting_path + ".tmp", self.waiting_path)
+		return classified
+
+def parse_start(value, window):
+	"""A UTC "YYYY-MM-DD HH:MM:SS" time (--from, --until) in unix seconds; without one, the start of the current window."""
+	if value:
+		return calendar.timegm(time.strptime(value, "%Y-%m-%d %H:%M:%S"))
+	return int(time.time()) // window * window
+
+def stop(signum, frame):
+	raise KeyboardInterrupt
+
+def main(argv=None, prog=None):
+	parser = argparse.ArgumentParser(prog=prog, description="Follow a collector and write a MOAS summary per rolling window")
+	parser.add_argument("collector_index", type=int, choices=range(len(collectors)), help="Collector index (see main.py)")
+	parser.add_argument("--data", default="data", help="Folder the summaries, the manifest and moas_classes.jsonl are written to")
+	parser.add_argument("--index", default=INDEX_PATH, help="Lifetime index updated after every window")
+	parser.add_argument("--window", type=float, default=2, help="Window length in hours (default 2, like the sessions)")
+	parser.add_argument("--horizon", type=int, default=12, help="Windows without the prefix coming back before a MOAS is short-lived")
+	parser.add_argument("--from", dest="from_time", help="Start (UTC, default: the start of the current window)")
+	parser.add_argument("--until", dest="until_time", help="End (UTC, default: none, follow the live stream)")
+	parser.add_argument("--mrt", metavar="DIR", help="Replay local MRT update dumps instead of BGPStream (see main.py --mrt)")
+	parser.add_argument("--mrt-workers", type=int, default=1, help="Processes decoding the dump files (--mrt)")
+	parser.add_argument("--sub-moas", action="store_true", help="Also detect sub-MOAS / super-MOAS conflicts (see main.py)")
+	parser.add_argument("--peers", action="store_true", help="Count the peers announcing each origin (see main.py)")
+	args = parser.parse_args(argv)
+	if args.mrt and not os.path.isdir(args.mrt):
+		parser.error(f"--mrt: {args.mrt} is not a folder")
+
+	window = int(args.window * 3600)
+	start = parse_start(args.from_time, window)
+	setup(args.data)
+	collector = collectors[args.collector_index]
+	from_time = time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(start))
+	# Without an end time BGPStream keeps polling for new dumps (live mode)
+	mrt = (args.mrt, args.mrt_workers) if args.mrt else None
+	until = parse_start(args.until_time, window) if args.until_time else None
+	stream = get_stream(from_time, args.until_time, collector, stream_filter(), mrt)
+	monitor = WindowMonitor(collector, window, args.data, args.index, args.horizon, args.sub_moas, args.peers, mrt)
+	parsed = monitor.index.update(args.data)  # Summaries written by batch runs since the index was saved
+	if parsed:
+		print(f"Lifetime index: {parsed} new files parsed")
+	print(f"Monitoring {collector} from {from_time} in {args.window:g}h windows")
+
+	signal.signal(signal.SIGTERM, stop)
+	try:
+		monitor.process(stream, start, until)
+	except KeyboardInterrupt:
+		print("Stopped; the open window is not written")  # Rerun with --from at its start to redo it
+	print(f"{monitor.windows} windows written ({monitor.skipped} not covered entirely, skipped), {len(monitor.waiting)} MOAS prefixes not classified yet")
+	return monitor
+
+if __name__ == "__main__":
+	main()
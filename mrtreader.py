@@ -0,0 +1,354 @@
+import bz2
+import calendar
+import gzip
+import heapq
+import os
+import re
+import socket
+import struct
+import time
+from collections import deque, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from operator import itemgetter
+
+########
+# offline replay of local MRT update dumps (RFC 6396 BGP4MP / BGP4MP_ET, e.g. route-views updates.YYYYMMDD.HHMM.bz2 or RIS .gz)
+# MRTStream yields elems shaped like pybgpstream's (type "A" / "W", fields {"prefix", "as-path"}, time, peer_asn, peer_address),
+# so the MOAS detectors and main.py read them unchanged (main.py --mrt <folder>)
+# every file is decoded by its own worker process (at most `workers` files in flight) and the decoded files are merged
+# in timestamp order with a heap; while only one file is active its elems are passed through without heap operations
+# only BGP UPDATE messages are read: state changes, RIB dumps and the add-path subtypes are skipped
+# the BGPStream filter string of main.py is applied while decoding (elemtype, ipversion, prefix, peer): withdrawn routes
+# are not decoded without "elemtype withdrawals", records of other peers are dropped before their message is read
+########
+
+HEADER = struct.Struct(">IHHI")  # timestamp, type, subtype, length
+BGP4MP, BGP4MP_ET = 16, 17
+MESSAGE_AS_SIZE = {1: 2, 4: 4, 6: 2, 7: 4}  # BGP4MP subtype -> AS number size (MESSAGE, MESSAGE_AS4 and their _LOCAL variants)
+BGP_UPDATE = 2
+AS_PATH, MP_REACH_NLRI, MP_UNREACH_NLRI, AS4_PATH = 2, 14, 15, 17
+AS_SET, AS_SEQUENCE = 1, 2
+AFI_FAMILY = {1: (socket.AF_INET, 4), 2: (socket.AF_INET6, 16)}
+SAFI_UNICAST = 1
+DUMP_NAME = re.compile(r"(\d{8})\.(\d{4})")  # Start time in the dump name, e.g. updates.20240101.0015.bz2
+DUMP_SPAN = 60 * 60  # Files starting this long before the window are still read (dumps cover 5 or 15 minutes)
+
+# Parsed BGPStream filter: elem_types {"announcements", "withdrawals"}, ipversion "4" / "6" or None,
+# prefixes [(match, ip_network)] and peers {asn}; values of a repeated term are ORed, different terms ANDed
+ElemFilter = namedtuple("ElemFilter", ["elem_types", "ipversion", "prefixes", "peers"])
+ELEM_TYPES = ("announcements", "withdrawals")
+PREFIX_MATCHES = ("any", "exact", "more", "less")
+IGNORED_TERMS = ("type", "collector", "project")  # Updates of the collector's dumps are all that is read
+
+def parse_filter(bgp_filter):
+	"""ElemFilter of a BGPStream filter string ("type updates and elemtype announcements and prefix more 10.0.0.0/8 ...")."""
+	import ipaddress
+
+	elem_types = set()
+	ipversion = None
+	prefixes = []
+	peers = set()
+	for term in (bgp_filter or "").split(" and "):
+		words = term.split()
+		if not words or words[0] in IGNORED_TERMS:
+			continue
+		name, values = words[0], words[1:]
+		if name == "elemtype" and set(values) <= set(ELEM_TYPES):
+			elem_types.update(values)
+		elif name == "ipversion" and len(values) == 1 and values[0] in ("4", "6"):
+			ipversion = values[0]
+		elif name == "peer" and values and all(value.isdigit() for value in values):
+			peers.update(int(value) for value in values)
+		elif name == "prefix" and len(values) == 2 and values[0] in PREFIX_MATCHES:
+			prefixes.append((values[0], ipaddress.ip_network(values[1], strict=False)))
+		else:
+			raise ValueError(f"Filter term {term.strip()!r} is not supported for MRT replay")
+	return ElemFilter(elem_types or set(ELEM_TYPES), ipversion, prefixes, peers)
+
+def prefix_matcher(elem_filter):
+	"""Function telling whether a prefix string passes the ipversion / prefix terms, or None when there are none."""
+	if elem_filter.ipversion is None and not elem_filter.prefixes:
+		return None
+	import ipaddress
+
+	def matches(prefix):
+		if elem_filter.ipversion is not None and (":" in prefix) != (elem_filter.ipversion == "6"):
+			return False
+		if not elem_filter.prefixes:
+			return True
+		network = ipaddress.ip_network(prefix, strict=False)
+		for match, other in elem_filter.prefixes:
+			if network.version != other.version:
+				continue
+			if match == "exact" and network == other:
+				return True
+			if match in ("more", "any") and network.subnet_of(other):
+				return True
+			if match in ("less", "any") and other.subnet_of(network):
+				return True
+		return False
+
+	return matches
+
+class MRTElem:
+	"""One announcement or withdrawal, with the attributes main.py reads from a pybgpstream elem."""
+	__slots__ = ("type", "time", "fields", "peer_asn", "peer_address")
+
+	def __init__(self, elem_type, time, fields, peer_asn, peer_address):
+		self.type = elem_type
+		self.time = time
+		self.fields = fields
+		self.peer_asn = peer_asn
+		self.peer_address = peer_address
+
+	def __repr__(self):
+		return f"{self.type}|{self.time}|{self.peer_address}|{self.peer_asn}|{self.fields.get('prefix')}|{self.fields.get('as-path', '')}"
+
+def parse_time(value):
+	"""'2024-01-01 00:00:00' (UTC, optionally with ' UTC'), a datetime or epoch seconds -> epoch seconds."""
+	if value is None or isinstance(value, (int, float)):
+		return value
+	if hasattr(value, "timetuple"):
+		return calendar.timegm(value.timetuple())
+	return calendar.timegm(time.strptime(value.replace(" UTC", "").strip(), "%Y-%m-%d %H:%M:%S"))
+
+def open_dump(path):
+	"""Open a dump for reading, gzip / bz2 / plain told apart by their magic bytes."""
+	with open(path, "rb") as file:
+		magic = file.read(3)
+	if magic[:2] == b"\x1f\x8b":
+		return gzip.open(path, "rb")
+	if magic == b"BZh":
+		return bz2.open(path, "rb")
+	return open(path, "rb")
+
+def decode_prefixes(data, offset, end, family, width):
+	"""Prefix strings of an NLRI / withdrawn routes field (length byte + the significant address bytes, repeated)."""
+	prefixes = []
+	while offset < end:
+		length = data[offset]
+		size = (length + 7) >> 3
+		if size > width:
+			raise ValueError(f"prefix length {length} too long")
+		address = data[offset + 1:offset + 1 + size]
+		prefixes.append(f"{socket.inet_ntop(family, address + bytes(width - len(address)))}/{length}")
+		offset += 1 + size
+	return prefixes
+
+def decode_as_path(data, offset, end, as_size):
+	"""AS path tokens as pybgpstream prints them: sequence members one by one, a set as one "{a,b}" token."""
+	tokens = []
+	code = "I" if as_size == 4 else "H"
+	while offset + 2 <= end:
+		segment_type, count = data[offset], data[offset + 1]
+		asns = struct.unpack_from(f">{count}{code}", data, offset + 2)
+		offset += 2 + count * as_size
+		if segment_type == AS_SEQUENCE:
+			tokens.extend(map(str, asns))
+		elif segment_type == AS_SET:
+			tokens.append("{" + ",".join(map(str, asns)) + "}")
+		# Confederation segments (3, 4) stay inside the confederation and never hold the origin
+	return tokens
+
+def decode_update(data, offset, end, as_size, withdrawals=True):
+	"""
+	(announced prefixes, withdrawn prefixes, AS path string or None) of a BGP UPDATE body.
+	Without withdrawals the withdrawn routes are skipped undecoded.
+	"""
+	withdrawn_length = struct.unpack_from(">H", data, offset)[0]
+	offset += 2
+	withdrawn = decode_prefixes(data, offset, offset + withdrawn_length, socket.AF_INET, 4) if withdrawals else []
+	offset += withdrawn_length
+	attributes_length = struct.unpack_from(">H", data, offset)[0]
+	offset += 2
+	attributes_end = offset + attributes_length
+	announced = []
+	as_path = as4_path = None
+
+	while offset < attributes_end:
+		flags, attribute_type = data[offset], data[offset + 1]
+		if flags & 0x10:  # Extended length
+			length = struct.unpack_from(">H", data, offset + 2)[0]
+			offset += 4
+		else:
+			length = data[offset + 2]
+			offset += 3
+		value_end = offset + length
+		if attribute_type == AS_PATH:
+			as_path = decode_as_path(data, offset, value_end, as_size)
+		elif attribute_type == AS4_PATH:
+			as4_path = decode_as_path(data, offset, value_end, 4)
+		elif attribute_type in (MP_REACH_NLRI, MP_UNREACH_NLRI):
+			afi, safi = struct.unpack_from(">HB", data, offset)
+			if safi == SAFI_UNICAST and afi in AFI_FAMILY:
+				family, width = AFI_FAMILY[afi]
+				if attribute_type == MP_REACH_NLRI:
+					nlri = offset + 4 + data[offset + 3] + 1  # Skip the next hop and the reserved byte
+					announced.extend(decode_prefixes(data, nlri, value_end, family, width))
+				elif withdrawals:
+					withdrawn.extend(decode_prefixes(data, offset + 3, value_end, family, width))
+		offset = value_end
+
+	announced.extend(decode_prefixes(data, attributes_end, end, socket.AF_INET, 4))
+	if as4_path is not None and as_path is not None and len(as_path) >= len(as4_path):
+		# 2-byte session: AS4_PATH holds the real tail of the path (RFC 6793)
+		as_path = as_path[:len(as_path) - len(as4_path)] + as4_path
+	return announced, withdrawn, " ".join(as_path) if as_path else None
+
+def decode_file(path, from_time=None, until_time=None, bgp_filter=None):
+	"""
+	Decode the BGP UPDATEs of one dump into (time, type, prefix, as_path, peer_asn, peer_address) tuples sorted by time,
+	keeping only from_time <= time <= until_time (epoch seconds) and the elems passing bgp_filter (a BGPStream filter string).
+	Returns (elems, number of malformed records skipped). Runs in a worker process; tuples are cheaper to send back than objects.
+	"""
+	elem_filter = parse_filter(bgp_filter)
+	announcements = "announcements" in elem_filter.elem_types
+	withdrawals = "withdrawals" in elem_filter.elem_types
+	peers = elem_filter.peers
+	matches = prefix_matcher(elem_filter)
+	with open_dump(path) as file:
+		data = file.read()
+	elems = []
+	skipped = 0
+	offset = 0
+	size = len(data)
+	while offset + 12 <= size:
+		timestamp, mrt_type, subtype, length = HEADER.unpack_from(data, offset)
+		body = offset + 12
+		offset = body + length
+		if offset > size:
+			skipped += 1  # Truncated last record
+			break
+		if mrt_type not in (BGP4MP, BGP4MP_ET) or subtype not in MESSAGE_AS_SIZE:
+			continue
+		elem_time = timestamp
+		if mrt_type == BGP4MP_ET:
+			elem_time = timestamp + struct.unpack_from(">I", data, body)[0] / 1000000
+			body += 4
+		if (from_time is not None and elem_time < from_time) or (until_time is not None and elem_time > until_time):
+			continue
+		try:
+			as_size = MESSAGE_AS_SIZE[subtype]
+			peer_asn = struct.unpack_from(">I" if as_size == 4 else ">H", data, body)[0]
+			if peers and peer_asn not in peers:
+				continue
+			position = body + 2 * as_size + 2  # Peer AS, local AS, interface index
+			afi = struct.unpack_from(">H", data, position)[0]
+			family, width = AFI_FAMILY[afi]
+			peer_address = socket.inet_ntop(family, data[position + 2:position + 2 + width])
+			message = position + 2 + 2 * width  # Behind the peer and local addresses: the BGP message with its marker
+			message_length, message_type = struct.unpack_from(">HB", data, message + 16)
+			if message_type != BGP_UPDATE:
+				continue
+			announced, withdrawn, as_path = decode_update(data, message + 19, min(message + message_length, offset), as_size, withdrawals)
+		except (struct.error, ValueError, KeyError, IndexError):
+			skipped += 1
+			continue
+		if not announcements:
+			announced = ()
+		if matches is not None:
+			announced = [prefix for prefix in announced if matches(prefix)]
+			withdrawn = [prefix for prefix in withdrawn if matches(prefix)]
+		for prefix in withdrawn:
+			elems.append((elem_time, "W", prefix, None, peer_asn, peer_address))
+		for prefix in announced:
+			elems.append((elem_time, "A", prefix, as_path, peer_asn, peer_address))
+	elems.sort(key=itemgetter(0))  # Stable: elems of the same second keep their order in the file
+	return elems, skipped
+
+def merge_decoded(decoded):
+	"""
+	Merge decoded files (an iterable of time-sorted elem lists, in the order of their start time) into one time-ordered
+	iterator. A file joins the heap once the earliest queued elem is not older than its first elem, so only overlapping
+	files are held at the same time.
+	"""
+	upcoming = iter(decoded)
+	next_file = next(upcoming, None)
+	heap = []
+	order = 0
+	while True:
+		while next_file is not None and (not heap or not next_file or next_file[0][0] <= heap[0][0]):
+			if next_file:
+				heapq.heappush(heap, (next_file[0][0], order, 0, next_file))
+				order += 1
+			next_file = next(upcoming, None)
+		if not heap:
+			return
+		if len(heap) == 1:
+			# Only one active file: pass its elems through until the next file starts
+			_, file_order, index, elems = heap[0]
+			limit = next_file[0][0] if next_file else None
+			end = len(elems)
+			while index < end and (limit is None or elems[index][0] < limit):
+				yield elems[index]
+				index += 1
+			if index < end:
+				heap[0] = (elems[index][0], file_order, index, elems)
+			else:
+				heap.pop()
+			continue
+		_, file_order, index, elems = heap[0]
+		yield elems[index]
+		index += 1
+		if index < len(elems):
+			heapq.heapreplace(heap, (elems[index][0], file_order, index, elems))
+		else:
+			heapq.heappop(heap)
+
+def list_dumps(folder, collector=None, from_time=None, until_time=None):
+	"""
+	Dump files under folder (or folder/<collector> when it exists), sorted by the start time in their names.
+	Files whose names carry a start time outside [from_time - DUMP_SPAN, until_time] are left out.
+	"""
+	if collector and os.path.isdir(os.path.join(folder, collector)):
+		folder = os.path.join(folder, collector)
+	dumps = []
+	for root, _, filenames in os.walk(folder):
+		for filename in filenames:
+			match = DUMP_NAME.search(filename)
+			start = calendar.timegm(time.strptime("".join(match.groups()), "%Y%m%d%H%M")) if match else None
+			if start is not None:
+				if (until_time is not None and start > until_time) or (from_time is not None and start < from_time - DUMP_SPAN):
+					continue
+			dumps.append((start if start is not None else 0, filename, os.path.join(root, filename)))
+	return [path for _, _, path in sorted(dumps)]
+
+class MRTStream:
+	"""
+	Stand-in for pybgpstream.BGPStream over local dump files: iterating yields MRTElems in timestamp order.
+	from_time / until_time are epoch seconds or "YYYY-MM-DD HH:MM:SS" (UTC), both inclusive like BGPStream;
+	bgp_filter is a BGPStream filter string (see parse_filter), checked here so a bad term fails before any decoding.
+	"""
+	def __init__(self, paths, from_time=None, until_time=None, workers=1, bgp_filter=None):
+		self.paths = list(paths)
+		self.from_time = parse_time(from_time)
+		self.until_time = parse_time(until_time)
+		self.workers = max(workers, 1)
+		self.bgp_filter = bgp_filter
+		parse_filter(bgp_filter)
+		self.skipped = 0
+
+	def decoded(self):
+		"""Elem lists of every file, in file order; with several workers up to `workers` files decode at once."""
+		if self.workers == 1 or len(self.paths) <= 1:
+			for path in self.paths:
+				elems, skipped = decode_file(path, self.from_time, self.until_time, self.bgp_filter)
+				self.skipped += skipped
+				yield elems
+			return
+		with ProcessPoolExecutor(max_workers=min(self.workers, len(self.paths))) as executor:
+			paths = iter(self.paths)
+			futures = deque(executor.submit(decode_file, path, self.from_time, self.until_time, self.bgp_filter) for path in islice(paths, self.workers))
+			while futures:
+				elems, skipped = futures.popleft().result()
+				path = next(paths, None)
+				if path is not None:
+					futures.append(executor.submit(decode_file, path, self.from_time, self.until_time, self.bgp_filter))
+				self.skipped += skipped
+				yield elems
+
+	def __iter__(self):
+		for elem_time, elem_type, prefix, as_path, peer_asn, peer_address in merge_decoded(self.decoded()):
+			fields = {"prefix": prefix} if as_path is None else {"prefix": prefix, "as-path": as_path}
+			yield MRTElem(elem_type, elem_time, fields, peer_asn, peer_address)
@@ -0,0 +1,41 @@
+########
+# which peers announced each origin of a prefix, for main.py --peers
+# peers are interned to one bit each, and every prefix keeps a bitmask of the peers that announced it:
+# a plain int while the prefix has a single origin (the origin itself is the detector's), {origin: mask} once it is MOAS
+# so the state is one small int per prefix however many full-feed peers carry it, and a MOAS event's peer count is a popcount
+########
+
+class PeerOrigins:
+	"""Bitmasks of the peers that announced each (prefix, origin); fed by the detectors with their own origin state."""
+	def __init__(self):
+		self.bits = {}   # peer address -> its bit
+		self.masks = {}  # prefix -> mask of its only origin, or {origin: mask} once the prefix has several
+
+	def see(self, key, current, origin, peer):
+		"""
+		peer announced origin for the prefix key; current is what the detector held for the prefix before
+		(None, the single origin, or the set of origins of a MOAS prefix).
+		"""
+		bit = self.bits.get(peer)
+		if bit is None:
+			bit = self.bits[peer] = 1 << len(self.bits)
+		masks = self.masks
+		if current is None:
+			masks[key] = bit
+		elif type(current) is set:
+			by_origin = masks[key]
+			by_origin[origin] = by_origin.get(origin, 0) | bit
+		elif current == origin:
+			masks[key] |= bit
+		else:
+			masks[key] = {current: masks[key], origin: bit}  # The prefix just became MOAS
+
+	def counts(self, key, origins):
+		"""Number of peers that announced each of the origins of a MOAS prefix, in the given order."""
+		by_origin = self.masks.get(key)
+		if type(by_origin) is not dict:
+			return [0] * len(origins)
+		return [by_origin.get(origin, 0).bit_count() for origin in origins]
+
+	def state_sizes(self):
+		return {"peers": len(self.bits), "peer_masks": len(self.masks)}
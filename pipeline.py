@@ -0,0 +1,258 @@
+import argparse
+import fnmatch
+import glob
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import time
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+########
+# runs the analysis steps as a DAG: every stage declares its input and output paths (files, folders or globs)
+# a stage depends on the stages whose outputs match its inputs, and independent stages run in parallel (--jobs)
+# a stage only reruns when it is stale: never run, command changed, an input's content changed or an output is missing / changed
+# content is a sha1 per file, recomputed only when the size or mtime changed; state is kept in pipeline_state.json
+# each stage runs as its own process (python <script> ...); its output goes to pipeline_logs/<stage>.log
+# e.g. python pipeline.py --jobs 4, python pipeline.py table --dry-run, python pipeline.py collect (collect only runs when named)
+########
+
+STATE_PATH = "pipeline_state.json"
+LOG_FOLDER = "pipeline_logs"
+SCRIPT_FOLDER = os.path.dirname(os.path.abspath(__file__))
+
+# command is [script, args...]; source stages (collect) produce data from outside and only run when named
+Stage = namedtuple("Stage", ["name", "command", "inputs", "outputs", "source"], defaults=(False,))
+
+def default_stages(years=(2024,), collector_indexes=(0,)):
+	"""The README's order (main.py -> lifetimes / one-session -> table -> enrichment -> scoring) as stages."""
+	stages = [
+		Stage("collect", ["moas.py", "collect", *map(str, collector_indexes), "--years", *map(str, years)], [], ["data"], source=True),
+		Stage("index", ["lifetimeindex.py"], ["data"], ["lifetime_index.json"]),
+		Stage("store", ["summarystore.py"], ["data"], ["data_store"]),
+		# the index stage is the only one writing lifetime_index.json
+		Stage("lifetimes", ["moas.py", "lifetimes", "--no-update"], ["lifetime_index.json"], ["one_session.txt", "multi_session.txt"]),
+		Stage("one-session", ["moas.py", "one-session", "--no-update"], ["lifetime_index.json"], ["output/one_session_*.txt"]),
+		Stage("table", ["moas.py", "table"], ["data", "data_store", "one_session.txt"], ["moas_table.txt"]),
+		Stage("grouped-prefixes", ["moasperyear.py"], ["data", "data_store"], ["grouped_prefixes_desc.txt"]),
+		Stage("graph", ["moas.py", "graph"], ["data", "data_store"], ["combined_graph.png"]),
+	]
+	for year in years:
+		stages.append(Stage(
+			f"enrich-{year}",
+			["moas.py", "enrich", "--input", f"output/one_session_{year}.txt", "--output", f"output/asn_analysis_results_{year}.jsonl"],
+			[f"output/one_session_{year}.txt"],
+			[f"output/asn_analysis_results_{year}.jsonl"],
+		))
+	stages.append(Stage(
+		"score",
+		["moas.py", "score", "--events", *[f"output/one_session_{year}.txt" for year in years]],
+		[f"output/one_session_{year}.txt" for year in years] + ["output/asn_analysis_results_*.jsonl"],
+		["output/moas_event_ranking.tsv"],
+	))
+	return stages
+
+def expand(pattern):
+	"""Files behind an input / output path: the file itself, every file below a folder, or the glob matches."""
+	if glob.has_magic(pattern):
+		return sorted(path for path in glob.glob(pattern) if os.path.isfile(path))
+	if os.path.isdir(pattern):
+		return sorted(os.path.join(root, filename) for root, _, filenames in os.walk(pattern) for filename in filenames)
+	return [pattern] if os.path.exists(pattern) else []
+
+def file_hash(path):
+	digest = hashlib.sha1()
+	with open(path, "rb") as file:
+		for chunk in iter(lambda: file.read(1 << 20), b""):
+			digest.update(chunk)
+	return digest.hexdigest()
+
+def fingerprint(patterns, previous=None):
+	"""{path: [size, mtime_ns, sha1]}; the hash of a file whose size and mtime did not change is reused."""
+	previous = previous or {}
+	result = {}
+	for pattern in patterns:
+		for path in expand(pattern):
+			stat = os.stat(path)
+			old = previous.get(path)
+			if old and old[0] == stat.st_size and old[1] == stat.st_mtime_ns:
+				result[path] = old
+			else:
+				result[path] = [stat.st_size, stat.st_mtime_ns, file_hash(path)]
+	return result
+
+def same_content(fingerprint, other):
+	return fingerprint.keys() == other.keys() and all(fingerprint[path][2] == other[path][2] for path in fingerprint)
+
+def overlaps(pattern, other):
+	"""True if two declared paths can name the same file (equal, a glob match, or one inside the other's folder)."""
+	pattern, other = os.path.normpath(pattern), os.path.normpath(other)
+	return (
+		pattern == other or fnmatch.fnmatch(pattern, other) or fnmatch.fnmatch(other, pattern)
+		or pattern.startswith(other + os.sep) or other.startswith(pattern + os.sep)
+	)
+
+def dependencies(stages):
+	"""{stage name: [names of the stages producing its inputs]}"""
+	return {
+		stage.name: [
+			other.name for other in stages
+			if other is not stage and any(overlaps(path, output) for path in stage.inputs for output in other.outputs)
+		]
+		for stage in stages
+	}
+
+def select_stages(stages, deps, targets=None):
+	"""The targets and every stage upstream of them (all stages without targets); source stages only when named."""
+	by_name = {stage.name: stage for stage in stages}
+	unknown = set(targets or ()) - set(by_name)
+	if unknown:
+		raise ValueError(f"Unknown stage(s): {', '.join(sorted(unknown))}")
+	names = set(targets) if targets else {stage.name for stage in stages if not stage.source}
+	queue = list(names)
+	while queue:
+		for dep in deps[queue.pop()]:
+			if dep not in names and not by_name[dep].source:
+				names.add(dep)
+				queue.append(dep)
+	return [stage for stage in stages if stage.name in names]
+
+def load_state(state_path=STATE_PATH):
+	if not os.path.exists(state_path):
+		return {}
+	with open(state_path, "r") as file:
+		return json.load(file)
+
+def save_state(state, state_path=STATE_PATH):
+	with open(state_path + ".part", "w") as file:
+		json.dump(state, file)
+	os.replace(state_path + ".part", state_path)
+
+def stale_reason(stage, record, inputs, force=False):
+	"""Why the stage has to run, or None when it is up to date."""
+	if force:
+		return "forced"
+	if record is None:
+		return "never run"
+	if record["command"] != stage.command:
+		return "command changed"
+	if not same_content(inputs, record["inputs"]):
+		changed = len(set(inputs) ^ set(record["inputs"])) + sum(
+			1 for path in set(inputs) & set(record["inputs"]) if inputs[path][2] != record["inputs"][path][2]
+		)
+		return f"inputs changed ({changed} files)"
+	outputs = fingerprint(stage.outputs, record["outputs"])
+	if any(not expand(path) for path in stage.outputs):
+		return "outputs missing"
+	if not same_content(outputs, record["outputs"]):
+		return "outputs changed"
+	return None
+
+def run_stage(stage, log_folder=LOG_FOLDER):
+	"""Run one stage as its own process; returns (returncode, elapsed seconds)."""
+	os.makedirs(log_folder, exist_ok=True)
+	started = time.perf_counter()
+	command = [sys.executable, os.path.join(SCRIPT_FOLDER, stage.command[0]), *stage.command[1:]]
+	with open(os.path.join(log_folder, f"{stage.name}.log"), "w") as log:
+		returncode = subprocess.run(command, stdout=log, stderr=subprocess.STDOUT).returncode
+	return returncode, time.perf_counter() - started
+
+def run_pipeline(stages, targets=None, jobs=1, force=(), dry_run=False, state_path=STATE_PATH, log_folder=LOG_FOLDER):
+	"""
+	Run the stale stages among the targets (and their upstream stages), each as soon as its dependencies are done.
+	Returns {stage name: status}; a stage whose dependency failed is not run.
+	"""
+	deps = dependencies(stages)
+	selected = select_stages(stages, deps, targets)
+	selected_names = {stage.name for stage in selected}
+	deps = {stage.name: [dep for dep in deps[stage.name] if dep in selected_names] for stage in selected}
+	state = load_state(state_path)
+	status = {}
+	pending = list(selected)
+	running = {}
+
+	with ThreadPoolExecutor(max_workers=max(jobs, 1)) as executor:
+		while pending or running:
+			for stage in list(pending):
+				if len(running) >= max(jobs, 1):
+					break
+				if any(dep not in status for dep in deps[stage.name]):
+					continue  # Waits for a dependency
+				pending.remove(stage)
+				if any(status[dep] in ("failed", "skipped") for dep in deps[stage.name]):
+					status[stage.name] = "skipped"
+					print(f"[{stage.name}] skipped: a dependency failed")
+					continue
+				record = state.get(stage.name)
+				inputs = fingerprint(stage.inputs, record["inputs"] if record else None)
+				reason = stale_reason(stage, record, inputs, stage.name in force)
+				if reason is None and dry_run and any(status[dep] == "would run" for dep in deps[stage.name]):
+					reason = "upstream stage would run"
+				if reason is None:
+					status[stage.name] = "up to date"
+					print(f"[{stage.name}] up to date")
+				elif dry_run:
+					status[stage.name] = "would run"
+					print(f"[{stage.name}] would run: {reason}")
+				else:
+					print(f"[{stage.name}] running: {reason}")
+					running[executor.submit(run_stage, stage, log_folder)] = (stage, inputs)
+			if not running:
+				if pending and all(any(dep not in status for dep in deps[stage.name]) for stage in pending):
+					raise ValueError(f"Dependency cycle between: {', '.join(stage.name for stage in pending)}")
+				continue
+
+			done, _ = wait(running, return_when=FIRST_COMPLETED)
+			for future in done:
+				stage, inputs = running.pop(future)
+				returncode, elapsed = future.result()
+				if returncode != 0:
+					if state.pop(stage.name, None) is not None:
+						save_state(state, state_path)  # Whatever it wrote is incomplete: stale until a run succeeds
+					status[stage.name] = "failed"
+					print(f"[{stage.name}] failed (exit {returncode}) after {elapsed:.1f}s, see {os.path.join(log_folder, stage.name + '.log')}")
+					continue
+				record = state.get(stage.name)
+				state[stage.name] = {
+					"command": stage.command,
+					"inputs": inputs,
+					"outputs": fingerprint(stage.outputs, record["outputs"] if record else None),
+					"elapsed": elapsed,
+				}
+				save_state(state, state_path)
+				status[stage.name] = "done"
+				print(f"[{stage.name}] done in {elapsed:.1f}s")
+	return status
+
+def main(argv=None, prog=None):
+	parser = argparse.ArgumentParser(prog=prog, description="Run the stale stages of the MOAS analysis pipeline")
+	parser.add_argument("targets", nargs="*", help="Stages to bring up to date with their upstream stages (default: all but collect)")
+	parser.add_argument("--jobs", type=int, default=os.cpu_count() or 1, help="Stages run at the same time")
+	parser.add_argument("--years", type=int, nargs="+", default=[2024], help="Years of the collect / enrich / score stages")
+	parser.add_argument("--collectors", type=int, nargs="+", default=[0], help="Collector indexes of the collect stage (see main.py)")
+	parser.add_argument("--force", nargs="+", default=[], help="Rerun these stages even if they are up to date")
+	parser.add_argument("--dry-run", action="store_true", help="Only print which stages would run and why")
+	parser.add_argument("--list", action="store_true", help="Print the stages and their dependencies")
+	args = parser.parse_args(argv)
+
+	stages = default_stages(args.years, args.collectors)
+	if args.list:
+		deps = dependencies(stages)
+		for stage in stages:
+			after = ", ".join(deps[stage.name]) or "-"
+			print(f"{stage.name:<18} after: {after}  (inputs: {' '.join(stage.inputs) or '-'}; outputs: {' '.join(stage.outputs)})")
+		return {}
+	try:
+		status = run_pipeline(stages, args.targets, args.jobs, set(args.force), args.dry_run)
+	except ValueError as e:
+		parser.error(str(e))
+	failed = [name for name, result in status.items() if result in ("failed", "skipped")]
+	if failed:
+		print(f"{len(failed)} stage(s) failed or skipped: {', '.join(failed)}")
+		sys.exit(1)
+	return status
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,26 @@
+import socket
+
+########
+# prefix parsing shared by rpkivalidator.py and submoas.py, which both index prefixes by (IP version, length, network bits)
+########
+
+WIDTH = {4: 32, 6: 128}
+
+def parse_prefix(prefix):
+	"""
+	'10.0.0.0/8' -> (4, network as int, 8); host bits are cleared.
+	Raises ValueError for malformed prefixes.
+	"""
+	address, _, length = prefix.partition("/")
+	try:
+		if ":" in address:
+			version, net = 6, int.from_bytes(socket.inet_pton(socket.AF_INET6, address), "big")
+		else:
+			version, net = 4, int.from_bytes(socket.inet_pton(socket.AF_INET, address), "big")
+	except OSError:
+		raise ValueError(f"invalid prefix {prefix}") from None
+	width = WIDTH[version]
+	length = int(length) if length else width
+	if not 0 <= length <= width:
+		raise ValueError(f"invalid prefix {prefix}")
+	return version, net >> (width - length) << (width - length) if length else 0, length
@@ -1,79 +1,42 @@
-from collections import defaultdict
-import ast
+import argparse
 
-def analyze_asn_file(file_path):
+from analysisresults import load_results
+
+def analyze_asn_file(folder="output", years=None):
 	"""
-	Analyze a file containing ASN data and count occurrences of various attributes.
+	Count the occurrences of every RPKI status, RIR status and IPv4 / IPv6 visibility per year.
 
 	Args:
-		file_path (str): Path to the file containing ASN data.
+		folder (str): Folder with the asn_analysis_results_<year> files.
+		years (list): Only these years (default: every year found).
 
 	Returns:
-		None
+		dict: {column: DataFrame of counts, one row per status and one column per year}
 	"""
-	print("Analayzing ",file_path)
+	print("Analayzing ", folder)
 	print("#############################")
-	rpki_status_counts = defaultdict(int)
-	rir_counts = defaultdict(int)
-	ipv4_visibility_counts = defaultdict(int)
-	ipv6_visibility_counts = defaultdict(int)
-
-	try:
-		with open(file_path, "r") as file:
-			for line in file:
-				# Parse each line as a dictionary
-				try:
-					asn_data = ast.literal_eval(line.strip())  # Safely evaluate the line as a Python dict
-				except Exception as e:
-					print(f"Error parsing line: {line.strip()} - {e}")
-					continue
-
-				# Count RPKI status
-				rpki_status = asn_data.get("rpki_status", "unknown")
-				rpki_status_counts[rpki_status] += 1
-
-				# Count RIR status
-				rir = asn_data.get("rir", "unknown")
-				rir_counts[rir] += 1
-
-				# Count IPv4 and IPv6 visibility statuses
-				visibility = asn_data.get("visibility", {})
-				if isinstance(visibility, dict):  # If visibility is a dictionary
-					ipv4_status = visibility.get("ipv4_status", "unknown")
-					ipv6_status = visibility.get("ipv6_status", "unknown")
-				elif isinstance(visibility, tuple):  # If visibility is a tuple
-					ipv4_status = "unknown"
-					ipv6_status = "unknown"
-				else:
-					ipv4_status = "unknown"
-					ipv6_status = "unknown"
-
-				ipv4_visibility_counts[ipv4_status] += 1
-				ipv6_visibility_counts[ipv6_status] += 1
-
-		# Print results
-		print("RPKI Status Counts:")
-		for status, count in rpki_status_counts.items():
-			print(f"  {status}: {count}")
-
-		print("\nRIR Counts:")
-		for rir, count in rir_counts.items():
-			print(f"  {rir}: {count}")
-
-		print("\nIPv4 Visibility Counts:")
-		for status, count in ipv4_visibility_counts.items():
-			print(f"  {status}: {count}")
-
-		print("\nIPv6 Visibility Counts:")
-		for status, count in ipv6_visibility_counts.items():
-			print(f"  {status}: {count}")
-
-	except FileNotFoundError:
-		print(f"File not found: {file_path}")
-	except Exception as e:
-		print(f"An error occurred: {e}")
+	results = load_results(folder, years)
+	titles = {
+		"rpki_status": "RPKI Status Counts:",
+		"rir": "RIR Counts:",
+		"ipv4_visibility": "IPv4 Visibility Counts:",
+		"ipv6_visibility": "IPv6 Visibility Counts:",
+	}
+
+	counts = {}
+	for column, title in titles.items():
+		statuses = results[column].cat.add_categories(["unknown"]) if "unknown" not in results[column].cat.categories else results[column]
+		statuses = statuses.fillna("unknown")
+		counts[column] = statuses.groupby([statuses, results["year"]], observed=True).size().unstack(fill_value=0)
+		print(title)
+		print(counts[column].to_string())
+		print()
+	return counts
 
 # Example usage
 if __name__ == "__main__":
-	file_path = "./output/asn_analysis_results_2024.txt"  # Replace with the actual file path
-	analyze_asn_file(file_path)
+	parser = argparse.ArgumentParser(description="Status counts of the analyzed ASNs per year")
+	parser.add_argument("--folder", default="output", help="Folder with the asn_analysis_results_<year>.jsonl / .txt files")
+	parser.add_argument("--years", type=int, nargs="+", help="Only these years (default: every year found)")
+	args = parser.parse_args()
+	analyze_asn_file(args.folder, args.years)
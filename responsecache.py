@@ -0,0 +1,128 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+import zlib
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+########
+# persistent cache for RIPEstat responses
+# entries are keyed by a hash of the endpoint path plus sorted query parameters,
+# expire after a per-endpoint TTL and are evicted least-recently-used when the cache is over its size limit
+########
+
+CACHE_PATH = "ripestat_cache.sqlite"
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+DAY = 24 * 60 * 60
+# Seconds a cached response stays valid, per RIPEstat endpoint
+ENDPOINT_TTLS = {
+	"announced-prefixes": DAY,
+	"rpki-validation": DAY,
+	"visibility": DAY,
+	"as-path-length": 7 * DAY,
+	"rir": 30 * DAY,
+	"whois": 30 * DAY,
+}
+DEFAULT_TTL = DAY
+
+def normalize_url(url):
+	"""Path plus sorted query parameters, so equivalent URLs share one entry."""
+	parts = urlsplit(url)
+	return parts.path + "?" + urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+
+def endpoint_name(url):
+	"""'/data/rir/data.json?...' -> 'rir'."""
+	path = urlsplit(url).path.strip("/").split("/")
+	return path[1] if len(path) > 1 and path[0] == "data" else path[0]
+
+class ResponseCache:
+	"""
+	SQLite-backed JSON response cache, safe to share between threads.
+	hits / misses / expired count lookups since the cache was opened.
+	"""
+	def __init__(self, path=CACHE_PATH, max_bytes=DEFAULT_MAX_BYTES, ttls=None):
+		self.path = path
+		self.max_bytes = max_bytes
+		self.ttls = dict(ENDPOINT_TTLS, **(ttls or {}))
+		self.hits = 0
+		self.misses = 0
+		self.expired = 0
+		self.evicted = 0
+		self.lock = threading.Lock()
+		self.connection = sqlite3.connect(path, check_same_thread=False)
+		self.connection.execute("PRAGMA journal_mode=WAL")
+		self.connection.execute(
+			"CREATE TABLE IF NOT EXISTS responses ("
+			"key TEXT PRIMARY KEY, endpoint TEXT, url TEXT, body BLOB, size INTEGER, fetched_at REAL, accessed_at REAL)"
+		)
+		self.connection.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed_at)")
+		self.connection.commit()
+		self.total_bytes = self.connection.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+	def key(self, url):
+		return hashlib.sha256(normalize_url(url).encode()).hexdigest()
+
+	def get(self, url):
+		"""Return the cached JSON for a URL, or None if it is missing or older than its endpoint TTL."""
+		key = self.key(url)
+		now = time.time()
+		with self.lock:
+			row = self.connection.execute("SELECT body, fetched_at FROM responses WHERE key = ?", (key,)).fetchone()
+			if row is None:
+				self.misses += 1
+				return None
+			body, fetched_at = row
+			if now - fetched_at > self.ttls.get(endpoint_name(url), DEFAULT_TTL):
+				self.expired += 1
+				self.misses += 1
+				return None
+			self.connection.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+			self.connection.commit()
+			self.hits += 1
+		return json.loads(zlib.decompress(body))
+
+	def put(self, url, data):
+		"""Store a JSON response and evict least-recently-used entries above the size limit."""
+		key = self.key(url)
+		body = zlib.compress(json.dumps(data).encode())
+		now = time.time()
+		with self.lock:
+			row = self.connection.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+			if row is not None:
+				self.total_bytes -= row[0]
+			self.connection.execute(
+				"INSERT OR REPLACE INTO responses (key, endpoint, url, body, size, fetched_at, accessed_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+				(key, endpoint_name(url), normalize_url(url), body, len(body), now, now),
+			)
+			self.total_bytes += len(body)
+			self._evict()
+			self.connection.commit()
+
+	def _evict(self):
+		while self.total_bytes > self.max_bytes:
+			rows = self.connection.execute("SELECT key, size FROM responses ORDER BY accessed_at LIMIT 100").fetchall()
+			if not rows:
+				break
+			for key, size in rows:
+				self.connection.execute("DELETE FROM responses WHERE key = ?", (key,))
+				self.total_bytes -= size
+				self.evicted += 1
+				if self.total_bytes <= self.max_bytes:
+					break
+
+	def stats(self):
+		lookups = self.hits + self.misses
+		return {
+			"hits": self.hits,
+			"misses": self.misses,
+			"expired": self.expired,
+			"evicted": self.evicted,
+			"hit_ratio": self.hits / lookups if lookups else 0,
+			"bytes": self.total_bytes,
+		}
+
+	def close(self):
+		with self.lock:
+			self.connection.close()
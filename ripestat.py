@@ -0,0 +1,216 @@
+import os
+import random
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+########
+# shared RIPEstat client
+# one pooled requests.Session for every fetch_* call, with a cap on the number of requests in flight
+# responses are served from an optional persistent cache (responsecache.py) before going to the network
+# requests are paced by an adaptive token bucket, retried with exponential backoff and jitter (honoring 429 / Retry-After)
+# and stopped by a circuit breaker when the API keeps failing
+# point RIPESTAT_BASE (or --base-url) at a local server to run against mocked responses
+########
+
+RIPESTAT_BASE = os.environ.get("RIPESTAT_BASE", "https://stat.ripe.net")
+DEFAULT_CONCURRENCY = 8
+DEFAULT_RATE = 10.0  # Requests per second
+DEFAULT_RETRIES = 5
+
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+class RipeStatError(Exception):
+	"""A RIPEstat request failed in a way retrying will not fix (e.g. 4xx other than 429)."""
+
+class RipeStatUnavailable(RipeStatError):
+	"""A RIPEstat request failed transiently; the result must not be recorded as data."""
+
+class TokenBucket:
+	"""
+	Thread-safe token bucket. The rate halves on a throttle (at most once per second,
+	so a burst of 429s counts once) and climbs back towards max_rate by a small step on every success.
+	"""
+	def __init__(self, rate=DEFAULT_RATE, burst=None, min_rate=0.5):
+		self.max_rate = rate
+		self.min_rate = min(min_rate, rate)
+		self.rate = rate
+		self.capacity = burst or max(1.0, rate)
+		self.tokens = self.capacity
+		self.updated = time.monotonic()
+		self.paused_until = 0.0
+		self.last_throttle = 0.0
+		self.lock = threading.Lock()
+
+	def acquire(self):
+		"""Block until a token is available."""
+		while True:
+			with self.lock:
+				now = time.monotonic()
+				if now >= self.paused_until:
+					self.tokens = min(self.capacity, self.tokens + max(now - self.updated, 0) * self.rate)
+					self.updated = now
+					if self.tokens >= 1:
+						self.tokens -= 1
+						return
+					wait = (1 - self.tokens) / self.rate
+				else:
+					wait = self.paused_until - now
+			time.sleep(wait)
+
+	def throttled(self, retry_after=None):
+		"""Slow down after a 429; pause every caller for retry_after seconds if given."""
+		with self.lock:
+			now = time.monotonic()
+			if now - self.last_throttle >= 1.0:
+				self.rate = max(self.min_rate, self.rate / 2)
+				self.last_throttle = now
+			if retry_after:
+				self.paused_until = max(self.paused_until, time.monotonic() + retry_after)
+
+	def succeeded(self):
+		with self.lock:
+			self.rate = min(self.max_rate, self.rate + self.max_rate * 0.05)
+
+class CircuitBreaker:
+	"""
+	Opens after `threshold` consecutive failures; while open, requests fail fast.
+	After `cooldown` seconds a single trial request is let through (half-open).
+	"""
+	def __init__(self, threshold=10, cooldown=30.0):
+		self.threshold = threshold
+		self.cooldown = cooldown
+		self.failures = 0
+		self.opened_at = None
+		self.trial_running = False
+		self.lock = threading.Lock()
+
+	def allow(self):
+		with self.lock:
+			if self.opened_at is None:
+				return True
+			if not self.trial_running and time.monotonic() - self.opened_at >= self.cooldown:
+				self.trial_running = True
+				return True
+			return False
+
+	def record_success(self):
+		with self.lock:
+			self.failures = 0
+			self.opened_at = None
+			self.trial_running = False
+
+	def record_failure(self):
+		with self.lock:
+			self.failures += 1
+			if self.trial_running or self.failures >= self.threshold:
+				self.opened_at = time.monotonic()
+			self.trial_running = False
+
+def retry_after_seconds(response):
+	"""Seconds from a Retry-After header (delta-seconds form), or None."""
+	value = response.headers.get("Retry-After")
+	try:
+		return max(0.0, float(value)) if value is not None else None
+	except ValueError:
+		return None
+
+class RipeStatClient:
+	"""
+	Thread-safe client that keeps connections open across calls.
+	At most `concurrency` requests are in flight and at most `rate` start per second.
+	"""
+	def __init__(self, base_url=RIPESTAT_BASE, concurrency=DEFAULT_CONCURRENCY, timeout=60, cache=None,
+			rate=DEFAULT_RATE, retries=DEFAULT_RETRIES, backoff=1.0, max_backoff=60.0):
+		self.base_url = base_url.rstrip("/")
+		self.timeout = timeout
+		self.cache = cache
+		self.retries = retries
+		self.backoff = backoff
+		self.max_backoff = max_backoff
+		self.bucket = TokenBucket(rate)
+		self.breaker = CircuitBreaker()
+		self.slots = threading.BoundedSemaphore(concurrency)
+		self.session = requests.Session()
+		adapter = HTTPAdapter(pool_connections=1, pool_maxsize=concurrency)
+		self.session.mount("http://", adapter)
+		self.session.mount("https://", adapter)
+
+	def url(self, path):
+		return self.base_url + path
+
+	def get_json(self, path):
+		"""
+		GET a path relative to the base URL and return the decoded JSON body.
+		Raises RipeStatUnavailable once retries are exhausted or the circuit is open.
+		"""
+		if self.cache is not None:
+			data = self.cache.get(path)
+			if data is not None:
+				return data
+
+		data = self._fetch(path)
+		if self.cache is not None:
+			self.cache.put(path, data)
+		return data
+
+	def _fetch(self, path):
+		for attempt in range(self.retries + 1):
+			if not self.breaker.allow():
+				raise RipeStatUnavailable(f"circuit open, not requesting {path}")
+
+			self.bucket.acquire()
+			retry_after = None
+			try:
+				with self.slots:
+					response = self.session.get(self.url(path), timeout=self.timeout)
+				if response.status_code in RETRY_STATUS:
+					retry_after = retry_after_seconds(response)
+					if response.status_code == 429:
+						self.bucket.throttled(retry_after)
+					error = f"HTTP {response.status_code}"
+				else:
+					response.raise_for_status()
+					data = response.json()
+					self.breaker.record_success()
+					self.bucket.succeeded()
+					return data
+			except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+				error = type(e).__name__
+			except requests.exceptions.HTTPError as e:
+				self.breaker.record_success()  # The API answered; the request itself is wrong
+				raise RipeStatError(f"{path}: {e}") from e
+			except ValueError as e:
+				raise RipeStatError(f"{path}: invalid JSON") from e
+
+			self.breaker.record_failure()
+			if attempt < self.retries:
+				# Exponential backoff with full jitter, never shorter than Retry-After
+				delay = random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+				time.sleep(max(delay, retry_after or 0))
+
+		raise RipeStatUnavailable(f"{path}: {error} after {self.retries + 1} attempts")
+
+	def close(self):
+		self.session.close()
+		if self.cache is not None:
+			self.cache.close()
+
+_default_client = None
+_default_client_lock = threading.Lock()
+
+def get_client():
+	"""Return the process-wide client, creating it on first use."""
+	global _default_client
+	with _default_client_lock:
+		if _default_client is None:
+			_default_client = RipeStatClient()
+		return _default_client
+
+def set_client(client):
+	"""Replace the process-wide client (e.g. with a different base URL or concurrency)."""
+	global _default_client
+	with _default_client_lock:
+		_default_client = client
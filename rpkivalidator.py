@@ -0,0 +1,118 @@
+import csv
+import json
+from bisect import bisect_right
+
+from prefixes import WIDTH, parse_prefix
+
+########
+# offline RPKI route origin validation (RFC 6811) against a local VRP dump
+# accepts the CSV (ASN,IP Prefix,Max Length,...) and JSON ({"roas": [...]}) exports of rpki-client / routinator
+# statuses use the RIPEstat names: valid, invalid_asn, invalid_length, unknown
+########
+
+def parse_asn(value):
+	"""'AS13335' or 13335 -> 13335."""
+	return int(str(value).upper().replace("AS", "").strip())
+
+def iter_vrps(path):
+	"""Yield (prefix, max_length, asn) from a VRP CSV or JSON export."""
+	if path.endswith(".json"):
+		with open(path, "r") as file:
+			for roa in json.load(file).get("roas", []):
+				prefix = roa["prefix"]
+				yield prefix, int(roa.get("maxLength") or prefix.partition("/")[2]), parse_asn(roa["asn"])
+		return
+
+	with open(path, "r", newline="") as file:
+		for row in csv.reader(file):
+			if len(row) < 3 or not row[0].strip().upper().lstrip("AS").isdigit():
+				continue  # Header or blank line
+			asn, prefix, max_length = row[0], row[1].strip(), row[2].strip()
+			yield prefix, int(max_length or prefix.partition("/")[2]), parse_asn(asn)
+
+class RpkiValidator:
+	"""
+	Two indexes over the VRPs, so a route costs one binary search and a few dict lookups:
+	- the outermost VRP prefixes (those no other VRP covers) as sorted address blocks; a route is covered
+	  when the block holding its first address is no longer than the route (VRP blocks nest or are disjoint)
+	- per ASN, one dict per VRP prefix length keyed by the network bits, with the largest max length,
+	  looked up only for the route's own origin
+	"""
+	def __init__(self, vrps=()):
+		self.by_asn = {4: {}, 6: {}}  # version -> asn -> [(length, {net >> host bits: max max_length})], longest first
+		self.prefixes = {4: set(), 6: set()}  # version -> {(net, length)} of every VRP
+		self.blocks = None  # version -> (starts, ends, lengths) of the outermost VRP prefixes, rebuilt after add
+		self.count = 0
+		for prefix, max_length, asn in vrps:
+			self.add(prefix, max_length, asn)
+		self.build_blocks()
+
+	@classmethod
+	def from_file(cls, path):
+		validator = cls(iter_vrps(path))
+		print(f"Loaded {validator.count} VRPs from {path}")
+		return validator
+
+	def add(self, prefix, max_length, asn):
+		version, net, length = parse_prefix(prefix)
+		self.prefixes[version].add((net, length))
+		self.blocks = None
+		self.count += 1
+		if asn == 0:
+			return  # AS0 VRPs only make their prefixes covered
+		tables = self.by_asn[version].setdefault(asn, [])
+		for table_length, table in tables:
+			if table_length == length:
+				break
+		else:
+			table = {}
+			tables.append((length, table))
+			tables.sort(key=lambda item: item[0], reverse=True)
+		net >>= WIDTH[version] - length
+		table[net] = max(table.get(net, -1), max_length)
+
+	def build_blocks(self):
+		"""Sorted (starts, ends, lengths) per IP version of the VRP prefixes not covered by another VRP."""
+		self.blocks = {}
+		for version, prefixes in self.prefixes.items():
+			width = WIDTH[version]
+			starts, ends, lengths = [], [], []
+			for net, length in sorted(prefixes):  # A covering prefix sorts before the prefixes it covers
+				if ends and net < ends[-1]:
+					continue
+				starts.append(net)
+				ends.append(net + (1 << (width - length)))
+				lengths.append(length)
+			self.blocks[version] = (starts, ends, lengths)
+
+	def validate(self, prefix, origin):
+		"""RFC 6811 origin validation state of a (prefix, origin ASN) route."""
+		try:
+			version, net, length = parse_prefix(prefix)
+			if not isinstance(origin, int):
+				origin = parse_asn(origin)
+		except ValueError:
+			return "unknown"
+		if self.blocks is None:
+			self.build_blocks()
+
+		starts, ends, lengths = self.blocks[version]
+		block = bisect_right(starts, net) - 1
+		if block < 0 or net >= ends[block] or lengths[block] > length:
+			return "unknown"
+
+		asn_matched = False
+		width = WIDTH[version]
+		for vrp_length, table in self.by_asn[version].get(origin, ()):
+			if vrp_length > length:
+				continue
+			max_length = table.get(net >> (width - vrp_length))
+			if max_length is not None:
+				if length <= max_length:
+					return "valid"
+				asn_matched = True
+		return "invalid_length" if asn_matched else "invalid_asn"
+
+	def validate_prefixes(self, asn, prefixes):
+		"""Validate every prefix announced by one ASN, in the shape of RIPEstat rpki-validation data."""
+		return [{"prefix": prefix, "status": self.validate(prefix, asn)} for prefix in prefixes]
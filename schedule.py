@@ -0,0 +1,261 @@
+import argparse
+import calendar
+import json
+import os
+import random
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+########
+# session schedules for main.py --schedule <config.json>, replacing the fixed grid of generate_intervals()
+# strategies: "grid" (the same days and times every month, main.py's first week x 00:00 / 12:00 by default),
+# "stratified" (a per-year budget spread evenly over months or weeks, random slots inside each) and "random" (uniform slots)
+# "densify" adds sessions around the past sessions with the highest MOAS count / ratio in data/
+# every schedule is seeded, so rerunning it yields the same units and main.py's manifest can resume it
+# the cost (expected updates and collection time) comes from the Total Updates of the existing summaries per collector and year
+# and the elems/s of data/metrics.jsonl; check it before running with: python schedule.py config.json --collectors 0 1
+########
+
+DEFAULT_CONFIG = {
+	"years": [2017, 2018, 2020, 2021, 2022, 2023],
+	"strategy": "grid",  # grid, stratified or random
+	"duration_hours": 2,
+	"days": [1, 2, 3, 4, 5, 6, 7],  # grid: days of every month
+	"times": ["00:00:00", "12:00:00"],  # grid: session start times of those days
+	"budget": None,  # Sessions per year (an int, or {"2024": 100, ...}); required by stratified / random, samples the grid
+	"strata": "month",  # stratified: month or week
+	"slot_hours": 2,  # stratified / random: sessions start on multiples of this many hours
+	"seed": 1,
+	"densify": None,  # {"top": 5, "neighbours": 2, "step_hours": 2, "metric": "moas_count" or "moas_ratio", "data": "data"}
+}
+DENSIFY_DEFAULTS = {"top": 5, "neighbours": 2, "step_hours": 2, "metric": "moas_count", "data": "data"}
+STRATEGIES = ("grid", "stratified", "random")
+DEFAULT_UPDATES_PER_HOUR = 1000000  # Without history; route-views2 averaged 0.6M-2.2M announcements per hour over 2014-2024
+DEFAULT_ELEMS_PER_SECOND = 20000  # Without data/metrics.jsonl (main.py --metrics)
+
+def load_config(path=None, **overrides):
+	"""DEFAULT_CONFIG updated with the JSON file and the overrides that are not None; checked up front."""
+	config = dict(DEFAULT_CONFIG)
+	if path:
+		with open(path, "r") as file:
+			config.update(json.load(file))
+	config.update({key: value for key, value in overrides.items() if value is not None})
+	unknown = set(config) - set(DEFAULT_CONFIG)
+	if unknown:
+		raise ValueError(f"Unknown schedule setting(s): {', '.join(sorted(unknown))}")
+	if config["strategy"] not in STRATEGIES:
+		raise ValueError(f"Unknown strategy {config['strategy']!r}, expected one of {', '.join(STRATEGIES)}")
+	if config["strategy"] != "grid":
+		missing = [str(year) for year in config["years"] if year_budget(config, year) is None]
+		if missing:
+			raise ValueError(f"The {config['strategy']} strategy needs a budget (sessions per year) for {', '.join(missing)}")
+	if config["strata"] not in ("month", "week"):
+		raise ValueError(f"Unknown strata {config['strata']!r}, expected month or week")
+	if config["densify"] is not None:
+		config["densify"] = dict(DENSIFY_DEFAULTS, **config["densify"])
+	return config
+
+def year_budget(config, year):
+	budget = config["budget"]
+	if isinstance(budget, dict):
+		return budget.get(str(year), budget.get(year))
+	return budget
+
+def slots(start, end, slot, duration):
+	"""Session starts on multiples of slot from start whose session ends by end."""
+	starts = []
+	while start + duration <= end:
+		starts.append(start)
+		start += slot
+	return starts
+
+def strata(year, kind):
+	"""(start, end) of every month or 7-day week (from January 1st; the last one is shorter) of the year."""
+	bounds = []
+	if kind == "month":
+		for month in range(1, 13):
+			bounds.append((datetime(year, month, 1), datetime(year + month // 12, month % 12 + 1, 1)))
+	else:
+		start, end = datetime(year, 1, 1), datetime(year + 1, 1, 1)
+		while start < end:
+			bounds.append((start, min(start + timedelta(days=7), end)))
+			start += timedelta(days=7)
+	return bounds
+
+def grid_starts(config, year):
+	"""The configured days x times of every month (days a month lacks are skipped)."""
+	times = [datetime.strptime(session_time, "%H:%M:%S").time() for session_time in config["times"]]
+	return [
+		datetime.combine(datetime(year, month, day), session_time)
+		for month in range(1, 13)
+		for day in config["days"] if day <= calendar.monthrange(year, month)[1]
+		for session_time in times
+	]
+
+def stratified_starts(config, year, budget, rng, duration):
+	"""budget sessions spread evenly over the strata (the remainder to randomly picked strata), random slots inside each."""
+	slot = timedelta(hours=config["slot_hours"])
+	year_strata = strata(year, config["strata"])
+	counts = [budget // len(year_strata)] * len(year_strata)
+	for index in rng.sample(range(len(year_strata)), budget % len(year_strata)):
+		counts[index] += 1
+	starts = []
+	for (start, end), count in zip(year_strata, counts):
+		candidates = slots(start, end, slot, duration)
+		starts.extend(rng.sample(candidates, min(count, len(candidates))))
+	return starts
+
+def year_starts(config, year, rng, duration):
+	"""Session starts of one year before densification."""
+	budget = year_budget(config, year)
+	if config["strategy"] == "grid":
+		starts = grid_starts(config, year)
+		return rng.sample(starts, budget) if budget is not None and budget < len(starts) else starts
+	if config["strategy"] == "stratified":
+		return stratified_starts(config, year, budget, rng, duration)
+	candidates = slots(datetime(year, 1, 1), datetime(year + 1, 1, 1), timedelta(hours=config["slot_hours"]), duration)
+	return rng.sample(candidates, min(budget, len(candidates)))
+
+def load_history(data_folder="data"):
+	"""Header dicts of the existing sessions (summarystore.load_sessions), or [] without a data folder."""
+	if not os.path.isdir(data_folder):
+		return []
+	from summarystore import load_sessions
+
+	return load_sessions(data_folder)
+
+def densify_starts(config, years, history, duration):
+	"""
+	Starts around the past sessions that scored highest on the densify metric: per year the top sessions
+	(per collector, counted once), each with neighbours sessions of step_hours before and after it.
+	"""
+	settings = config["densify"]
+	step = timedelta(hours=settings["step_hours"])
+	by_year = defaultdict(list)
+	for session in history:
+		start = datetime.strptime(session["start_time"], "%Y-%m-%d %H:%M:%S")
+		if start.year not in years:
+			continue
+		if settings["metric"] == "moas_ratio":
+			value = session["moas_count"] / session["total_updates"] if session["total_updates"] else 0
+		else:
+			value = session["moas_count"]
+		by_year[start.year].append((value, start))
+
+	starts = []
+	for year, sessions in by_year.items():
+		tops = list(dict.fromkeys(start for _, start in sorted(sessions, key=lambda session: (-session[0], session[1]))))[:settings["top"]]
+		for top in tops:
+			for offset in range(1, settings["neighbours"] + 1):
+				for start in (top - offset * step, top + offset * step):
+					if start.year == year and start + duration <= datetime(year + 1, 1, 1):
+						starts.append(start)
+	return starts
+
+def build_schedule(config, history=None):
+	"""
+	Sorted (start_time, end_time) intervals of the schedule, like main.generate_intervals().
+	history (header dicts of past sessions) is only read for densification; loaded from densify's data folder when None.
+	"""
+	rng = random.Random(config["seed"])
+	duration = timedelta(hours=config["duration_hours"])
+	starts = set()
+	for year in config["years"]:
+		starts.update(year_starts(config, year, rng, duration))
+	if config["densify"] is not None:
+		if history is None:
+			history = load_history(config["densify"]["data"])
+		starts.update(densify_starts(config, set(config["years"]), history, duration))
+	return [(start, start + duration) for start in sorted(starts)]
+
+def update_rates(history):
+	"""Announcements per hour of the past sessions: {(collector, year): rate} and {collector: rate}."""
+	totals = defaultdict(lambda: [0, 0.0])
+	for session in history:
+		start = datetime.strptime(session["start_time"], "%Y-%m-%d %H:%M:%S")
+		end = datetime.strptime(session["end_time"], "%Y-%m-%d %H:%M:%S")
+		hours = (end - start).total_seconds() / 3600
+		if hours <= 0:
+			continue
+		for key in ((session["collector"], start.year), session["collector"]):
+			totals[key][0] += session["total_updates"]
+			totals[key][1] += hours
+	return {key: updates / hours for key, (updates, hours) in totals.items()}
+
+def collection_rates(data_folder="data"):
+	"""Mean elems/s per collector from the metrics.jsonl of main.py --metrics."""
+	rates = defaultdict(list)
+	path = os.path.join(data_folder, "metrics.jsonl")
+	if os.path.exists(path):
+		with open(path, "r") as file:
+			for line in file:
+				try:
+					metrics = json.loads(line)
+				except ValueError:
+					continue
+				if metrics.get("elems_per_s"):
+					rates[metrics["collector"]].append(metrics["elems_per_s"])
+	return {collector: sum(values) / len(values) for collector, values in rates.items()}
+
+def update_rate(rates, collector, year):
+	"""Announcements per hour for a collector and year: its own history, else the collector's nearest year, else any."""
+	if (collector, year) in rates:
+		return rates[(collector, year)]
+	years = [key[1] for key in rates if isinstance(key, tuple) and key[0] == collector]
+	if years:
+		return rates[(collector, min(years, key=lambda other: abs(other - year)))]
+	collectors = [rate for key, rate in rates.items() if not isinstance(key, tuple)]
+	return sum(collectors) / len(collectors) if collectors else DEFAULT_UPDATES_PER_HOUR
+
+def estimate_cost(intervals, collector_names, history=(), elems_per_second=None, workers=1):
+	"""
+	{year: {"sessions", "hours", "updates", "seconds"}} plus a "total" entry: expected announcements from the past
+	Total Updates per hour, collection time from the measured elems/s per collector spread over the workers.
+	"""
+	rates = update_rates(history)
+	elems_per_second = elems_per_second or {}
+	costs = defaultdict(lambda: {"sessions": 0, "hours": 0.0, "updates": 0, "seconds": 0.0})
+	for collector in collector_names:
+		speed = elems_per_second.get(collector, DEFAULT_ELEMS_PER_SECOND)
+		for start, end in intervals:
+			hours = (end - start).total_seconds() / 3600
+			updates = update_rate(rates, collector, start.year) * hours
+			for key in (start.year, "total"):
+				costs[key]["sessions"] += 1
+				costs[key]["hours"] += hours
+				costs[key]["updates"] += round(updates)
+				costs[key]["seconds"] += updates / speed / max(workers, 1)
+	return dict(costs)
+
+def print_cost(costs):
+	print(f"{'year':<8}{'sessions':>10}{'hours':>10}{'updates':>16}{'collection':>14}")
+	for key, cost in sorted(costs.items(), key=lambda item: (item[0] == "total", str(item[0]))):
+		print(f"{key:<8}{cost['sessions']:>10}{cost['hours']:>10.0f}{cost['updates']:>16,}{cost['seconds'] / 3600:>13.1f}h")
+
+def plan(config, collector_names, data_folder="data", workers=1):
+	"""The schedule's intervals and its estimated cost (history and elems/s read from data_folder)."""
+	history = load_history(data_folder)
+	densify_history = history if config["densify"] is None or config["densify"]["data"] == data_folder else None
+	intervals = build_schedule(config, densify_history)
+	return intervals, estimate_cost(intervals, collector_names, history, collection_rates(data_folder), workers)
+
+if __name__ == "__main__":
+	from main import collectors
+
+	parser = argparse.ArgumentParser(description="Build a session schedule and estimate its cost before running it with main.py --schedule")
+	parser.add_argument("config", nargs="?", help="JSON schedule config (default: main.py's first-week grid)")
+	parser.add_argument("--collectors", type=int, nargs="+", default=[0], choices=range(len(collectors)), help="Collector indexes the cost is estimated for")
+	parser.add_argument("--years", type=int, nargs="+", help="Override the config's years")
+	parser.add_argument("--data", default="data", help="Folder with the past summaries and metrics.jsonl")
+	parser.add_argument("--workers", type=int, default=1, help="Worker processes main.py would run with")
+	parser.add_argument("--list", action="store_true", help="Print every interval")
+	args = parser.parse_args()
+	try:
+		config = load_config(args.config, years=args.years)
+	except (OSError, ValueError) as e:
+		parser.error(str(e))
+	intervals, costs = plan(config, [collectors[index] for index in args.collectors], args.data, args.workers)
+	if args.list:
+		for start, end in intervals:
+			print(f"{start:%Y-%m-%d %H:%M:%S} {end:%Y-%m-%d %H:%M:%S}")
+	print_cost(costs)
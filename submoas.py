@@ -0,0 +1,134 @@
+from prefixes import WIDTH, parse_prefix
+
+########
+# sub-MOAS / super-MOAS detection: a more-specific prefix announced by an origin its covering prefix does not have
+# prefixes live in one dict per (IP version, prefix length), keyed by the network bits as an int (net >> host bits),
+# so the covering prefixes of an announcement are one dict lookup per prefix length in use
+# prefixes at least BUCKET_LENGTH long are also listed in a bucket per /16 (IPv4) or /32 (IPv6), which is scanned for
+# more-specifics only when the bucket holds a longer prefix; shorter, rarer prefixes search every bucket below them
+# a prefix with a single origin stores it inline, like moasdetector.py
+# only new (prefix, origin) pairs reach the tracker; repeated announcements cannot create a new conflict
+########
+
+BUCKET_LENGTH = {4: 16, 6: 32}
+
+class AnnouncedPrefix:
+	__slots__ = ("prefix", "net", "length", "value")
+
+	def __init__(self, prefix, net, length, origin):
+		self.prefix = prefix  # The announced prefix string, for the summary
+		self.net = net
+		self.length = length
+		self.value = origin   # The origin, or a list of origins once there are several
+
+	def origins(self):
+		return self.value if type(self.value) is list else [self.value]
+
+	def lacks(self, origin):
+		value = self.value
+		return origin not in value if type(value) is list else value != origin
+
+class SubMOASTracker:
+	"""
+	Records every (more-specific, covering) prefix pair where the more-specific has an origin the covering prefix lacks.
+	A conflict found when the more-specific is announced is a 'sub' conflict (the sub-prefix hijack pattern),
+	one found when the covering prefix is announced after its more-specifics is a 'super' conflict.
+	"""
+	def __init__(self):
+		self.tables = {4: [], 6: []}  # version -> [(length, {net: AnnouncedPrefix})], shortest first
+		self.by_length = {}           # (version, length) -> the same dicts
+		self.buckets = {}             # (version, net at BUCKET_LENGTH) -> [longest length, AnnouncedPrefix...]
+		self.conflicts = {}           # (specific, covering) -> "sub" / "super", in detection order
+		self.size = 0
+
+	def add(self, prefix, origin):
+		"""Add a new (prefix, origin) pair; returns the number of new conflicts."""
+		try:
+			version, net, length = parse_prefix(prefix)
+		except ValueError:
+			return 0
+		net >>= WIDTH[version] - length
+		table = self.by_length.get((version, length))
+		if table is None:
+			table = self.by_length[(version, length)] = {}
+			self.tables[version].append((length, table))
+			self.tables[version].sort(key=lambda item: item[0])
+		announced = table.get(net)
+		is_new = announced is None
+		if is_new:
+			announced = table[net] = AnnouncedPrefix(prefix, net, length, origin)
+			self.size += 1
+			bucket_length = BUCKET_LENGTH[version]
+			if length >= bucket_length:
+				key = (version, net >> (length - bucket_length))
+				bucket = self.buckets.get(key)
+				if bucket is None:
+					self.buckets[key] = [length, announced]
+				else:
+					bucket.append(announced)
+					if length > bucket[0]:
+						bucket[0] = length
+		elif not announced.lacks(origin):
+			return 0
+		elif type(announced.value) is list:
+			announced.value.append(origin)
+		else:
+			announced.value = [announced.value, origin]
+
+		# Covering prefixes: one lookup per shorter prefix length in use
+		conflicts = self.conflicts
+		found = len(conflicts)
+		for covering_length, covering_table in self.tables[version]:
+			if covering_length >= length:
+				break
+			covering = covering_table.get(net >> (length - covering_length))
+			if covering is not None and covering.lacks(origin):
+				conflicts.setdefault((announced, covering), "sub")
+
+		# More-specifics: only a newly announced prefix can conflict with them
+		if is_new:
+			for specific in self.specifics(version, net, length):
+				if any(other != origin for other in specific.value) if type(specific.value) is list else specific.value != origin:
+					conflicts.setdefault((specific, announced), "super")
+		return len(conflicts) - found
+
+	def specifics(self, version, net, length):
+		"""Yield the announced prefixes strictly below a prefix."""
+		bucket_length = BUCKET_LENGTH[version]
+		if length >= bucket_length:
+			bucket = self.buckets.get((version, net >> (length - bucket_length)))
+			if bucket is None or bucket[0] <= length:
+				return
+			buckets = [bucket]
+		else:
+			for specific_length, table in self.tables[version]:
+				if length < specific_length < bucket_length:
+					for specific in table.values():
+						if specific.net >> (specific_length - length) == net:
+							yield specific
+			first, count = net << (bucket_length - length), 1 << (bucket_length - length)
+			if count <= len(self.buckets):
+				buckets = [self.buckets.get((version, key)) for key in range(first, first + count)]
+			else:
+				buckets = [
+					bucket for (bucket_version, key), bucket in self.buckets.items()
+					if bucket_version == version and key >> (bucket_length - length) == net
+				]
+		for bucket in buckets:
+			if bucket is None:
+				continue
+			for specific in bucket[1:]:
+				if specific.length > length and specific.net >> (specific.length - length) == net:
+					yield specific
+
+	def records(self):
+		"""(prefix, origins, covering prefix, covering origins, conflict) per pair, origins as strings in the order seen."""
+		for (specific, covering), conflict in self.conflicts.items():
+			yield (
+				specific.prefix, [str(origin) for origin in specific.origins()],
+				covering.prefix, [str(origin) for origin in covering.origins()],
+				conflict,
+			)
+
+	def __len__(self):
+		return len(self.conflicts)
@@ -0,0 +1,191 @@
+import os
+import re
+from collections import namedtuple
+
+########
+# streaming parser for the text logs written by the scripts
+# summary_*.txt files from main.py and the one_session / multi_session files from the analysis scripts
+# plus the timing_*.tsv tables main.py writes with --timing
+# records are matched by their keys, never by line number, and read one line at a time
+########
+
+SessionHeader = namedtuple(
+	"SessionHeader", ["collector", "start_time", "end_time", "total_updates", "moas_count", "sub_moas_count", "peers"], defaults=(None, None),
+)
+PrefixRecord = namedtuple("PrefixRecord", ["prefix", "origins"])
+PeerCountRecord = namedtuple("PeerCountRecord", ["prefix", "counts"])  # Peers behind each origin of the PrefixRecord before it
+SubMOASRecord = namedtuple("SubMOASRecord", ["prefix", "origins", "covering_prefix", "covering_origins", "conflict"])
+TimingRecord = namedtuple("TimingRecord", [
+	"prefix", "origin", "first", "last", "announcements", "up_seconds", "moas_first", "moas_seconds", "withdrawals",
+])
+
+# Builds namedtuples without going through their Python-level __new__, which dominates the per-record cost
+_new_record = tuple.__new__
+
+HEADER_RE = re.compile(r"BGPStream Summary for (\S+) \((.+) to (.+)\)")
+
+def list_summary_files(data_folder="data"):
+	"""Return the summary file names in the data folder, sorted like the analysis scripts expect."""
+	return sorted(
+		filename for filename in os.listdir(data_folder)
+		if filename.startswith("summary_") and filename.endswith(".txt")
+	)
+
+def source_signature(data_folder="data"):
+	"""Name, size and mtime of every summary file, used to tell if derived data is stale."""
+	signature = []
+	for filename in list_summary_files(data_folder):
+		stat = os.stat(os.path.join(data_folder, filename))
+		signature.append([filename, stat.st_size, int(stat.st_mtime)])
+	return signature
+
+def split_origins(value):
+	"""Split an 'Origin ASNs' value; AS sets such as {1,2} stay a single origin."""
+	return value.strip().split(", ") if value.strip() else []
+
+def iter_summary(filepath, sub_moas=False, peer_counts=False):
+	"""
+	Yield the SessionHeader of a summary file followed by one PrefixRecord per MOAS prefix.
+	The header is yielded once, before the first record (or at the end for files without records).
+	With sub_moas the SubMOASRecords of main.py --sub-moas are yielded too; otherwise they are skipped.
+	With peer_counts the PeerCountRecord of main.py --peers follows its PrefixRecord; otherwise it is skipped.
+	"""
+	collector = start_time = end_time = None
+	total_updates = moas_count = 0
+	sub_moas_count = peers = None
+	header_sent = False
+	prefix = None
+	counted_prefix = None
+	sub_record = None
+
+	with open(filepath, "r") as file:
+		for line in file:
+			if not line.startswith("Prefix:"):
+				line = line.strip()
+			if line.startswith("Prefix:"):
+				if not header_sent:
+					yield SessionHeader(collector, start_time, end_time, total_updates, moas_count, sub_moas_count, peers)
+					header_sent = True
+				prefix = line[7:].strip()
+				sub_record = None
+			elif line.startswith("Origin ASNs:"):
+				if prefix is not None:
+					origins = line[12:].strip()
+					yield _new_record(PrefixRecord, (prefix, origins.split(", ") if origins else []))
+					counted_prefix = prefix
+					prefix = None
+				elif sub_record is not None:
+					sub_record[1] = split_origins(line[12:])
+			elif line.startswith("Peer Counts:"):
+				if peer_counts and counted_prefix is not None:
+					yield PeerCountRecord(counted_prefix, [int(count) for count in line[12:].split(",")])
+				counted_prefix = None
+			elif line.startswith("Sub-MOAS Prefix:"):
+				if not header_sent:
+					yield SessionHeader(collector, start_time, end_time, total_updates, moas_count, sub_moas_count, peers)
+					header_sent = True
+				prefix = counted_prefix = None
+				sub_record = [line[16:].strip(), [], None, [], None] if sub_moas else None
+			elif sub_record is not None:
+				key, _, value = line.partition(":")
+				if key == "Covering Prefix":
+					sub_record[2] = value.strip()
+				elif key == "Covering Origin ASNs":
+					sub_record[3] = split_origins(value)
+				elif key == "Conflict":
+					sub_record[4] = value.strip()
+					yield SubMOASRecord(*sub_record)
+					sub_record = None
+			elif header_sent:
+				continue
+			elif line.startswith("Total Updates:"):
+				total_updates = int(line.partition(":")[2])
+			elif line.startswith("MOAS Count:"):
+				moas_count = int(line.partition(":")[2])
+			elif line.startswith("Sub-MOAS Count:"):
+				sub_moas_count = int(line.partition(":")[2])
+			elif line.startswith("Peers:"):
+				peers = int(line.partition(":")[2])
+			elif line.startswith("BGPStream Summary for"):
+				match = HEADER_RE.search(line)
+				if match:
+					collector, start_time, end_time = match.groups()
+
+	if not header_sent:
+		yield SessionHeader(collector, start_time, end_time, total_updates, moas_count, sub_moas_count, peers)
+
+def read_header(filepath):
+	"""Return only the SessionHeader of a summary file, without reading its records."""
+	return next(iter_summary(filepath))
+
+def iter_prefix_records(filepath, peer_counts=False):
+	"""Yield the PrefixRecords of a summary file (each followed by its PeerCountRecord, if any, with peer_counts)."""
+	records = iter_summary(filepath, peer_counts=peer_counts)
+	next(records)  # Skip the SessionHeader
+	yield from records
+
+def iter_sub_moas_records(filepath):
+	"""Yield the SubMOASRecords of a summary file."""
+	for record in iter_summary(filepath, sub_moas=True):
+		if isinstance(record, SubMOASRecord):
+			yield record
+
+def iter_summaries(data_folder="data", filename_filter=None):
+	"""Yield (filename, record) for every record of every summary file, in file name order."""
+	for filename in list_summary_files(data_folder):
+		if filename_filter and not filename_filter(filename):
+			continue
+		for record in iter_summary(os.path.join(data_folder, filename)):
+			yield filename, record
+
+def iter_event_log(filepath):
+	"""
+	Yield one dict per 'Prefix:' block of a one_session / multi_session file.
+	Keys are the lower-cased field names ('seen_in', 'first_seen', 'origin_asns', 'peer_counts', ...);
+	'origin_asns' is split into a list, 'peer_counts' too (one count per origin, '-' where unknown).
+	"""
+	event = None
+	with open(filepath, "r") as file:
+		for line in file:
+			line = line.strip()
+			if not line:
+				continue
+			key, _, value = line.partition(": ")
+			if key == "Prefix":
+				if event is not None:
+					yield event
+				event = {"prefix": value.strip()}
+			elif event is not None:
+				key = key.lower().replace(" ", "_")
+				event[key] = split_origins(value) if key in ("origin_asns", "peer_counts") else value.strip()
+	if event is not None:
+		yield event
+
+def list_timing_files(data_folder="data"):
+	"""Return the timing table names in the data folder, sorted."""
+	return sorted(
+		filename for filename in os.listdir(data_folder)
+		if filename.startswith("timing_") and filename.endswith(".tsv")
+	)
+
+def iter_timing(filepath):
+	"""
+	Yield one TimingRecord per (MOAS prefix, origin) of a timing table.
+	Times are unix seconds; moas_first is None when the origins were never up together.
+	"""
+	session_start = 0
+	with open(filepath, "r") as file:
+		for line in file:
+			if line.startswith("#"):
+				key, _, value = line[1:].strip().partition(" ")
+				if key == "session_start":
+					session_start = int(value)
+				continue
+			fields = line.rstrip("\n").split("\t")
+			if len(fields) != 9 or fields[0] == "prefix":
+				continue  # Column header
+			prefix, origin, first, last, announcements, up_seconds, moas_first, moas_seconds, withdrawals = fields
+			yield _new_record(TimingRecord, (
+				prefix, origin, session_start + int(first), session_start + int(last), int(announcements), int(up_seconds),
+				None if moas_first == "-" else session_start + int(moas_first), int(moas_seconds), int(withdrawals),
+			))
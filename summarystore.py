@@ -0,0 +1,269 @@
+import json
+import os
+import shutil
+
+import numpy as np
+
+from summaryparser import PrefixRecord, iter_summaries, iter_summary, list_summary_files, read_header, source_signature
+from summaryparser import iter_prefix_records as iter_file_records
+
+########
+# columnar copy of the data/summary_*.txt files
+# sessions, prefix records and origin sets are kept in .npy columns that are memory mapped on load
+# session_table / record_table expose them as pandas DataFrames for grouped aggregation (pandas is imported on first use)
+# build it with: python summarystore.py
+########
+
+STORE_FOLDER = "data_store"
+STORE_VERSION = 3
+
+def _offset_path(path):
+	return path[:-len(".npy")] + "_offset.npy"
+
+def _save_strings(path, strings):
+	"""A string column: the UTF-8 bytes in one blob plus a <name>_offset.npy column, like the origin lists."""
+	encoded = [string.encode() for string in strings]
+	np.save(path, np.frombuffer(b"".join(encoded), dtype=np.uint8))
+	np.save(_offset_path(path), np.cumsum([0] + [len(string) for string in encoded], dtype=np.int64))
+
+def _load_strings(path):
+	blob = np.load(path, mmap_mode="r").tobytes()
+	offsets = np.load(_offset_path(path)).tolist()
+	return [blob[start:end].decode() for start, end in zip(offsets, offsets[1:])]
+
+def build_store(data_folder="data", store_folder=STORE_FOLDER):
+	"""
+	Convert every summary file in the data folder into the columnar store.
+	The store is written to a temporary folder and swapped in when complete.
+	"""
+	session_files, session_collectors = [], []
+	start_times, end_times, total_updates, moas_counts, sub_moas_counts = [], [], [], [], []
+	record_offsets = [0]
+	record_session, record_prefix, origin_offsets, origin_ids = [], [], [0], []
+	prefix_ids, origin_table = {}, {}
+
+	signature = source_signature(data_folder)
+	for session_index, (filename, _, _) in enumerate(signature):
+		records = iter_summary(os.path.join(data_folder, filename))
+		header = next(records)
+		session_files.append(filename)
+		session_collectors.append(header.collector or "")
+		start_times.append(header.start_time or "NaT")
+		end_times.append(header.end_time or "NaT")
+		total_updates.append(header.total_updates)
+		moas_counts.append(header.moas_count)
+		sub_moas_counts.append(-1 if header.sub_moas_count is None else header.sub_moas_count)
+
+		for prefix, origins in records:
+			record_session.append(session_index)
+			record_prefix.append(prefix_ids.setdefault(prefix, len(prefix_ids)))
+			origin_ids.extend(origin_table.setdefault(origin, len(origin_table)) for origin in origins)
+			origin_offsets.append(len(origin_ids))
+		record_offsets.append(len(record_session))
+
+	tmp_folder = store_folder + ".tmp"
+	shutil.rmtree(tmp_folder, ignore_errors=True)
+	os.makedirs(tmp_folder)
+
+	_save_strings(os.path.join(tmp_folder, "session_file.npy"), session_files)
+	_save_strings(os.path.join(tmp_folder, "session_collector.npy"), session_collectors)
+	np.save(os.path.join(tmp_folder, "session_start.npy"), np.array(start_times, dtype="datetime64[s]"))
+	np.save(os.path.join(tmp_folder, "session_end.npy"), np.array(end_times, dtype="datetime64[s]"))
+	np.save(os.path.join(tmp_folder, "session_total_updates.npy"), np.array(total_updates, dtype=np.int64))
+	np.save(os.path.join(tmp_folder, "session_moas_count.npy"), np.array(moas_counts, dtype=np.int64))
+	np.save(os.path.join(tmp_folder, "session_sub_moas_count.npy"), np.array(sub_moas_counts, dtype=np.int64))  # -1: not recorded
+	np.save(os.path.join(tmp_folder, "session_record_offset.npy"), np.array(record_offsets, dtype=np.int64))
+	np.save(os.path.join(tmp_folder, "record_session.npy"), np.array(record_session, dtype=np.int32))
+	np.save(os.path.join(tmp_folder, "record_prefix.npy"), np.array(record_prefix, dtype=np.int32))
+	np.save(os.path.join(tmp_folder, "record_origin_offset.npy"), np.array(origin_offsets, dtype=np.int64))
+	np.save(os.path.join(tmp_folder, "record_origin.npy"), np.array(origin_ids, dtype=np.int32))
+	_save_strings(os.path.join(tmp_folder, "prefix_table.npy"), list(prefix_ids))
+	_save_strings(os.path.join(tmp_folder, "origin_table.npy"), list(origin_table))
+	with open(os.path.join(tmp_folder, "manifest.json"), "w") as file:
+		json.dump({"version": STORE_VERSION, "data_folder": os.path.abspath(data_folder), "sources": signature}, file)
+
+	shutil.rmtree(store_folder, ignore_errors=True)
+	os.replace(tmp_folder, store_folder)
+	print(f"Stored {len(session_files)} sessions and {len(record_session)} prefix records in {store_folder}")
+
+def store_is_current(data_folder="data", store_folder=STORE_FOLDER):
+	"""True if the store exists and was built from the current summary files."""
+	manifest_path = os.path.join(store_folder, "manifest.json")
+	if not os.path.exists(manifest_path):
+		return False
+	with open(manifest_path, "r") as file:
+		manifest = json.load(file)
+	return manifest.get("version") == STORE_VERSION and manifest.get("sources") == source_signature(data_folder)
+
+class SummaryStore:
+	"""
+	Memory-mapped view of a built store.
+	Numeric columns are numpy arrays; prefix and origin columns hold ids into prefix_table and origin_table.
+	"""
+	def __init__(self, store_folder=STORE_FOLDER):
+		def column(name):
+			return np.load(os.path.join(store_folder, f"{name}.npy"), mmap_mode="r")
+
+		self.session_file = _load_strings(os.path.join(store_folder, "session_file.npy"))
+		self.session_collector = _load_strings(os.path.join(store_folder, "session_collector.npy"))
+		self.session_start = column("session_start")
+		self.session_end = column("session_end")
+		self.session_total_updates = column("session_total_updates")
+		self.session_moas_count = column("session_moas_count")
+		self.session_sub_moas_count = column("session_sub_moas_count")
+		self.session_record_offset = column("session_record_offset")
+		self.record_session = column("record_session")
+		self.record_prefix = column("record_prefix")
+		self.record_origin_offset = column("record_origin_offset")
+		self.record_origin = column("record_origin")
+		self.prefix_table = _load_strings(os.path.join(store_folder, "prefix_table.npy"))
+		self.origin_table = _load_strings(os.path.join(store_folder, "origin_table.npy"))
+
+	def sessions(self):
+		"""Yield one header dict per session, in file name order."""
+		for index, filename in enumerate(self.session_file):
+			yield {
+				"filename": filename,
+				"collector": self.session_collector[index],
+				"start_time": str(self.session_start[index]).replace("T", " "),
+				"end_time": str(self.session_end[index]).replace("T", " "),
+				"total_updates": int(self.session_total_updates[index]),
+				"moas_count": int(self.session_moas_count[index]),
+				"sub_moas_count": None if self.session_sub_moas_count[index] < 0 else int(self.session_sub_moas_count[index]),
+			}
+
+	def prefix_records(self, filename_filter=None):
+		"""Yield (session file, prefix, origins) for every prefix record, in file order."""
+		prefix_table = self.prefix_table
+		origin_table = self.origin_table
+		origin_offsets = self.record_origin_offset.tolist()
+		origins = self.record_origin.tolist()
+		record_prefix = self.record_prefix.tolist()
+		record_offsets = self.session_record_offset.tolist()
+		for index, filename in enumerate(self.session_file):
+			if filename_filter and not filename_filter(filename):
+				continue
+			for record in range(record_offsets[index], record_offsets[index + 1]):
+				yield (
+					filename,
+					prefix_table[record_prefix[record]],
+					[origin_table[origin] for origin in origins[origin_offsets[record]:origin_offsets[record + 1]]],
+				)
+
+def load_sessions(data_folder="data", store_folder=STORE_FOLDER):
+	"""
+	Header fields of every session, read from the store when it is current
+	and from the summary text files otherwise.
+	"""
+	if store_is_current(data_folder, store_folder):
+		return list(SummaryStore(store_folder).sessions())
+
+	sessions = []
+	for filename in list_summary_files(data_folder):
+		header = read_header(os.path.join(data_folder, filename))
+		sessions.append(dict(header._asdict(), filename=filename))
+	return sessions
+
+def iter_prefix_records(data_folder="data", store_folder=STORE_FOLDER, filename_filter=None):
+	"""
+	Yield (session file, prefix, origins) for every MOAS prefix record,
+	from the store when it is current and from the summary text files otherwise.
+	"""
+	if store_is_current(data_folder, store_folder):
+		yield from SummaryStore(store_folder).prefix_records(filename_filter)
+		return
+
+	for filename, record in iter_summaries(data_folder, filename_filter):
+		if isinstance(record, PrefixRecord):
+			yield filename, record.prefix, record.origins
+
+# Group keys derived from a session's start time, for session_table(...).groupby(...)
+TIME_KEYS = {
+	"year": lambda start_time: start_time.dt.year,
+	"month": lambda start_time: start_time.dt.month,
+	"day": lambda start_time: start_time.dt.day,
+	"hour": lambda start_time: start_time.dt.hour,
+	"weekday": lambda start_time: start_time.dt.weekday,
+}
+
+def add_time_keys(table, keys=TIME_KEYS):
+	"""Add a column per requested time key (year, month, day, hour, weekday) computed from start_time."""
+	for key in keys:
+		table[key] = TIME_KEYS[key](table["start_time"])
+	return table
+
+def session_table(data_folder="data", store_folder=STORE_FOLDER):
+	"""
+	One row per session: filename, collector, start_time, end_time, total_updates, moas_count, sub_moas_count
+	and the TIME_KEYS columns. Built straight from the store columns when it is current.
+	"""
+	import pandas as pd
+
+	if store_is_current(data_folder, store_folder):
+		store = SummaryStore(store_folder)
+		sub_moas_counts = pd.Series(np.asarray(store.session_sub_moas_count))
+		table = pd.DataFrame({
+			"filename": store.session_file,
+			"collector": pd.Categorical(store.session_collector),
+			"start_time": np.asarray(store.session_start),
+			"end_time": np.asarray(store.session_end),
+			"total_updates": np.asarray(store.session_total_updates),
+			"moas_count": np.asarray(store.session_moas_count),
+			"sub_moas_count": sub_moas_counts.where(sub_moas_counts >= 0).astype("Int64"),
+		})
+	else:
+		sessions = load_sessions(data_folder, store_folder)
+		columns = ["filename", "collector", "start_time", "end_time", "total_updates", "moas_count", "sub_moas_count"]
+		table = pd.DataFrame(sessions, columns=columns)
+		table["collector"] = pd.Categorical(table["collector"].fillna(""))
+		table["start_time"] = pd.to_datetime(table["start_time"]).astype("datetime64[s]")
+		table["end_time"] = pd.to_datetime(table["end_time"]).astype("datetime64[s]")
+		table["total_updates"] = table["total_updates"].astype(np.int64)
+		table["moas_count"] = table["moas_count"].astype(np.int64)
+		table["sub_moas_count"] = table["sub_moas_count"].astype("Int64")
+	return add_time_keys(table)
+
+def selected_sessions(sessions, count):
+	"""Row numbers from a boolean mask or a list of rows (None = every session)."""
+	if sessions is None:
+		return np.arange(count)
+	sessions = np.asarray(sessions)
+	return np.flatnonzero(sessions) if sessions.dtype == bool else sessions
+
+def record_table(data_folder="data", store_folder=STORE_FOLDER, sessions=None):
+	"""
+	One row per MOAS prefix record: session (row of session_table), prefix and origins (a list).
+	sessions limits the table to those session_table rows (a boolean mask or row numbers);
+	only the selected records have their origin lists built.
+	"""
+	import pandas as pd
+
+	if store_is_current(data_folder, store_folder):
+		store = SummaryStore(store_folder)
+		selected = selected_sessions(sessions, len(store.session_file))
+		record_offsets = np.asarray(store.session_record_offset)
+		rows = np.concatenate([np.arange(record_offsets[index], record_offsets[index + 1]) for index in selected] + [np.array([], dtype=np.int64)])
+		origin_offsets = np.asarray(store.record_origin_offset)
+		origin_ids = np.asarray(store.record_origin).tolist()
+		origin_table = store.origin_table
+		return pd.DataFrame({
+			"session": np.asarray(store.record_session)[rows],
+			"prefix": pd.Categorical.from_codes(np.asarray(store.record_prefix)[rows], categories=store.prefix_table),
+			"origins": [
+				[origin_table[origin] for origin in origin_ids[start:end]]
+				for start, end in zip(origin_offsets[rows].tolist(), origin_offsets[rows + 1].tolist())
+			],
+		})
+
+	filenames = list_summary_files(data_folder)
+	session_rows, prefixes, origins = [], [], []
+	for index in selected_sessions(sessions, len(filenames)):
+		for record in iter_file_records(os.path.join(data_folder, filenames[index])):
+			session_rows.append(index)
+			prefixes.append(record.prefix)
+			origins.append(record.origins)
+	return pd.DataFrame({"session": np.array(session_rows, dtype=np.int64), "prefix": pd.Categorical(prefixes), "origins": origins})
+
+if __name__ == "__main__":
+	build_store("data", STORE_FOLDER)
+	print("##########\n#Finished#\n##########")
@@ -1,50 +1,97 @@
+import argparse
+import json
 import os
-import requests
+import re
+import sys
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import time
 from statistics import median
-
-# Configuration
-URL_PREFIX_FROM_AS 	= "https://stat.ripe.net/data/announced-prefixes/data.json?resource=AS{asn}"
-URL_RPKI 			= "https://stat.ripe.net/data/rpki-validation/data.json?resource=AS{asn}&prefixes={prefix}"
-URL_WHOIS 			= 'https://stat.ripe.net/data/whois/data.json?data_overload_limit=ignore&resource={asn}'
-URL_RIR 			= 'https://stat.ripe.net/data/rir/data.json?data_overload_limit=ignore&resource={asn}&lod=2'
-URL_VISIBILITY 		= 'https://stat.ripe.net/data/visibility/data.json?data_overload_limit=ignore&include=peers_seeing&resource={asn}'
-URL_AS_PATH_LENGTH 	= 'https://stat.ripe.net/data/as-path-length/data.json?resource={asn}'
+from analysisresults import flatten_analysis
+from datasources import LocalSource, summarize_rir_statuses
+from rpkivalidator import RpkiValidator
+from responsecache import CACHE_PATH, ResponseCache
+from ripestat import DEFAULT_CONCURRENCY, DEFAULT_RATE, DEFAULT_RETRIES, RIPESTAT_BASE, RipeStatClient, RipeStatUnavailable, get_client, set_client
+from summaryparser import iter_event_log
+
+# Configuration (paths relative to the RIPEstat base URL, see ripestat.py)
+URL_PREFIX_FROM_AS 	= "/data/announced-prefixes/data.json?resource=AS{asn}"
+URL_RPKI 			= "/data/rpki-validation/data.json?resource=AS{asn}&prefixes={prefix}"
+URL_WHOIS 			= '/data/whois/data.json?data_overload_limit=ignore&resource={asn}'
+URL_RIR 			= '/data/rir/data.json?data_overload_limit=ignore&resource={asn}&lod=2'
+URL_VISIBILITY 		= '/data/visibility/data.json?data_overload_limit=ignore&include=peers_seeing&resource={asn}'
+URL_AS_PATH_LENGTH 	= '/data/as-path-length/data.json?resource={asn}'
+URL_AS_OVERVIEW 	= '/data/as-overview/data.json?resource=AS{asn}'
+
+MAX_RPKI_URL_LENGTH = 2000  # Longest rpki-validation URL path sent in one request
+RPKI_CHUNK_CONCURRENCY = 4  # Chunks of one ASN fetched at the same time
+
+rpki_validator = None  # RpkiValidator loaded from a local VRP dump (--vrps), replaces the rpki-validation calls
 
 def fetch_prefixes_from_asn(asn):
 	url = URL_PREFIX_FROM_AS.format(asn=asn)
 	try:
-		response = requests.get(url)
-		response.raise_for_status()
-		return [item.get("prefix") for item in response.json().get("data", {}).get("prefixes", [])]
+		return [item.get("prefix") for item in get_client().get_json(url).get("data", {}).get("prefixes", [])]
+	except RipeStatUnavailable:
+		raise  # Transient: never record it as data
 	except Exception as e:
 		print(f"Error fetching prefixes for ASN {asn}:")
 		return []
 
 
+def chunk_prefixes(asn, prefixes, max_url_length=MAX_RPKI_URL_LENGTH):
+	"""
+	Split prefixes into chunks whose rpki-validation URL stays under max_url_length.
+	"""
+	base_length = len(URL_RPKI.format(asn=asn, prefix=""))
+	chunk, url_length = [], base_length
+	for prefix in prefixes:
+		if chunk and url_length + len(prefix) + 1 > max_url_length:
+			yield chunk
+			chunk, url_length = [], base_length
+		chunk.append(prefix)
+		url_length += len(prefix) + 1
+	if chunk:
+		yield chunk
+
 def fetch_rpki_status(asn, prefixes):
 	"""
 	Fetch RPKI status for a given ASN and prefixes.
+	Large prefix lists are validated in URL-bounded chunks fetched concurrently;
+	with a local VRP dump loaded (rpki_validator) no request is made.
 	Args:
 		asn (str): ASN to fetch RPKI status for.
 		prefixes (list): List of prefixes.
 	
 	Returns:
-		dict: RPKI data containing statuses and related details.
+		list: RPKI data containing statuses and related details, merged over all chunks.
+	"""
+	if rpki_validator is not None:
+		return rpki_validator.validate_prefixes(asn, prefixes)
+
+	chunks = list(chunk_prefixes(asn, prefixes))
+	if len(chunks) <= 1:
+		return fetch_rpki_chunk(asn, prefixes)
+	with ThreadPoolExecutor(max_workers=min(RPKI_CHUNK_CONCURRENCY, len(chunks))) as executor:
+		results = executor.map(lambda chunk: fetch_rpki_chunk(asn, chunk), chunks)
+		return [entry for result in results for entry in result]
+
+def fetch_rpki_chunk(asn, prefixes):
+	"""
+	Fetch RPKI status for one chunk of prefixes of an ASN.
 	"""
 	prefix_param = ",".join(prefixes)
 	url = URL_RPKI.format(asn=asn, prefix=prefix_param)
 	try:
-		response = requests.get(url)
-		response.raise_for_status()
-		rpki_data = response.json().get("data", {})
+		rpki_data = get_client().get_json(url).get("data", {})
 		
 		# Ensure we handle cases with single item or list
 		if isinstance(rpki_data, dict):  # If it's a single dictionary, wrap it in a list
 			rpki_data = [rpki_data]
 		
 		return rpki_data
+	except RipeStatUnavailable:
+		raise  # Transient: never record it as data
 	except Exception as e:
 		print(f"Error fetching RPKI status for ASN {asn}:")
 		return []
@@ -100,9 +147,9 @@ def fetch_visibility(asn):
 	"""
 	url = URL_VISIBILITY.format(asn=asn)
 	try:
-		response = requests.get(url)
-		response.raise_for_status()
-		return response.json().get('data', {}).get('visibilities', [])
+		return get_client().get_json(url).get('data', {}).get('visibilities', [])
+	except RipeStatUnavailable:
+		raise  # Transient: never record it as data
 	except Exception as e:
 		print(f"Error fetching visibility data for ASN {asn}:")
 		return []
@@ -147,27 +194,12 @@ def fetch_rir_data(asn):
 	url = URL_RIR.format(asn=asn)  # Use the RIR API URL with the ASN
 	try:
 		# Make the API request
-		response = requests.get(url)
-		response.raise_for_status()
-		rir_data = response.json().get('data', {}).get('rirs', [])
-		
-		# Process the RIR data
-		if not rir_data:
-			return "no_rir_data"  # No RIR data available
-
-		# Extract RIR statuses
-		status_counts = defaultdict(int)
-		for rir_entry in rir_data:
-			status = rir_entry.get('status', 'unknown')  # Default to 'unknown' if status is missing
-			status_counts[status] += 1
+		rir_data = get_client().get_json(url).get('data', {}).get('rirs', [])
 
-		# Simplify the output
-		if len(status_counts) == 1:
-			# If there is only one status, return it directly
-			return next(iter(status_counts))
-		else:
-			# If multiple statuses exist, summarize them
-			return "multiple_statuses"
+		# Simplify the output: the single status, multiple_statuses or no_rir_data
+		return summarize_rir_statuses(rir_entry.get('status', 'unknown') for rir_entry in rir_data)
+	except RipeStatUnavailable:
+		raise  # Transient: never record it as data
 	except Exception as e:
 		print(f"Error fetching RIR data for ASN {asn}:")
 		return "error"
@@ -178,9 +210,9 @@ def fetch_as_path_length(asn):
 	"""
 	url = URL_AS_PATH_LENGTH.format(asn=asn)
 	try:
-		response = requests.get(url)
-		response.raise_for_status()
-		return response.json().get('data', {}).get('stats', [])
+		return get_client().get_json(url).get('data', {}).get('stats', [])
+	except RipeStatUnavailable:
+		raise  # Transient: never record it as data
 	except Exception as e:
 		print(f"Error fetching AS path length for ASN {asn}:")
 		return []
@@ -212,10 +244,47 @@ def calculate_median_as_path_length(stats):
 
 
 
-def analyze_asn(asn):
+class RipeStatSource:
+	"""
+	Data source backed by the live RIPEstat API (the fetch_* functions above).
+	LocalSource (datasources.py) implements the same methods from local datasets.
+	"""
+	def announced_prefixes(self, asn):
+		return fetch_prefixes_from_asn(asn)
+
+	def rpki_data(self, asn, prefixes):
+		return fetch_rpki_status(asn, prefixes)
+
+	def visibility(self, asn):
+		return fetch_visibility(asn)
+
+	def rir_status(self, asn):
+		return fetch_rir_data(asn)
+
+	def as_path_stats(self, asn):
+		return fetch_as_path_length(asn)
+
+data_source = RipeStatSource()  # Replaced by a LocalSource with --offline
+
+def fetch_rpki_summary(asn, source=None):
+	"""
+	Fetch the announced prefixes of an ASN and categorize their RPKI status.
+	"""
+	source = source or data_source
+	prefixes = source.announced_prefixes(asn)
+	if not prefixes:
+		return "no_prefixes"
+	# Fetch RPKI validation data for all prefixes
+	rpki_data = source.rpki_data(asn, prefixes)
+	return analyze_rpki_data(rpki_data)
+
+def analyze_asn(asn, executor=None, source=None):
 	"""
 	Analyze a single ASN by fetching various data and determining its properties.
+	With an executor the endpoint calls for the ASN run concurrently.
+	The source (RipeStatSource or LocalSource) only supplies raw data; the analysis is the same for both.
 	"""
+	source = source or data_source
 	analysis = {
 		"asn": asn,
 		"rpki_status": "unknown",  # Validity status: completely_valid, mostly_valid, less_valid, invalid
@@ -225,47 +294,69 @@ def analyze_asn(asn):
 		"path_length": None  # Placeholder for AS path length
 	}
 
-	as_path_stats = fetch_as_path_length(asn)
-	analysis["as_path"] = calculate_median_as_path_length(as_path_stats)
-	
-	# Fetch prefixes for the ASN
-	prefixes = fetch_prefixes_from_asn(asn)
-	if prefixes:
-		# Fetch RPKI validation data for all prefixes
-		rpki_data = fetch_rpki_status(asn, prefixes)
-		analysis["rpki_status"] = analyze_rpki_data(rpki_data)
+	if executor is None:
+		as_path_stats = source.as_path_stats(asn)
+		rpki_status = fetch_rpki_summary(asn, source)
+		visibility_data = source.visibility(asn)
+		rir_data = source.rir_status(asn)
 	else:
-		analysis["rpki_status"] = "no_prefixes"
+		as_path_future = executor.submit(source.as_path_stats, asn)
+		rpki_future = executor.submit(fetch_rpki_summary, asn, source)
+		visibility_future = executor.submit(source.visibility, asn)
+		rir_future = executor.submit(source.rir_status, asn)
+		as_path_stats = as_path_future.result()
+		rpki_status = rpki_future.result()
+		visibility_data = visibility_future.result()
+		rir_data = rir_future.result()
+
+	analysis["as_path"] = calculate_median_as_path_length(as_path_stats)
+	analysis["rpki_status"] = rpki_status
 
 	# Analyze visibility (using existing function)
-	visibility_data = fetch_visibility(asn)
 	analysis["visibility"] = analyze_visibility(visibility_data)
 
-	rir_data = fetch_rir_data(asn)
 	analysis["rir"] = rir_data
 
 	return analysis
 
+def analyze_asns(asns, concurrency=DEFAULT_CONCURRENCY):
+	"""
+	Analyze many ASNs concurrently and yield (asn, analysis, error) as soon as each is done.
+	analysis is None when RIPEstat stayed unavailable for that ASN.
+	The number of HTTP requests in flight is capped by the RIPEstat client.
+	A LocalSource answers from memory, so its ASNs are analyzed in order without threads.
+	"""
+	if isinstance(data_source, LocalSource):
+		for asn in asns:
+			yield asn, analyze_asn(asn), None
+		return
+	with ThreadPoolExecutor(max_workers=concurrency) as asn_executor, \
+			ThreadPoolExecutor(max_workers=concurrency * 4) as endpoint_executor:
+		futures = {asn_executor.submit(analyze_asn, asn, endpoint_executor): asn for asn in asns}
+		for future in as_completed(futures):
+			try:
+				yield futures[future], future.result(), None
+			except RipeStatUnavailable as e:
+				yield futures[future], None, str(e)
+
+def read_analyzed_asns(output_file):
+	"""ASNs that already have a result in the output file, so a rerun only fills the gaps."""
+	if not os.path.exists(output_file):
+		return set()
+	with open(output_file, "r") as file:
+		# JSON lines, or repr'd dicts in files written before the switch to JSON
+		return {int(match.group(1)) for match in re.finditer(r"[\"']asn[\"']: (\d+)", file.read())}
+
 
 
 
 
-def fetch_asn_data(asn, retries=5, delay=3):
+def fetch_asn_data(asn):
 	"""
-	Fetch ASN data from the RIPEstat API with retries and delay between attempts.
+	Fetch the AS overview from the RIPEstat API.
+	Retries, backoff and rate limiting are handled by the shared client.
 	"""
-	for attempt in range(retries):
-		try:
-			# Make the request to the RIPEstat API
-			response = requests.get(RIPESTAT_API_URL, params={"resource": f"AS{asn}"})
-			response.raise_for_status()  # Raise an error for bad responses
-			return response.json()  # Return the JSON data if the request is successful
-		except (requests.exceptions.ConnectionError, requests.exceptions.RequestException) as e:
-			print(f"Attempt {attempt + 1}/{retries} failed for ASN {asn}:")
-			if attempt < retries - 1:
-				time.sleep(delay)  # Wait before retrying
-			else:
-				raise e  # If retries are exhausted, raise the exception
+	return get_client().get_json(URL_AS_OVERVIEW.format(asn=asn))
 
 def check_asn_properties(asn):
 	"""
@@ -288,28 +379,25 @@ def check_asn_properties(asn):
 			score += 2  # Moderate suspicion for inactivity
 
 		return {"asn": asn, "valid": True, "status": status, "rpki_status": rpki_status, "score": score}
+	except RipeStatUnavailable:
+		raise  # Transient: never record it as data
 	except Exception as e:
-		print(f"Error fetching data for ASN {asn}:")
-		# Return a placeholder result if ASN data is unavailable
-		return {"asn": asn, "status": "unavailable", "country": "unknown", "type": "unknown"}
+		print(f"Error fetching data for ASN {asn}: {e}")
+		# Return a placeholder result if ASN data is unavailable, with the same default score as missing data
+		return {"asn": asn, "valid": False, "status": "unavailable", "score": 3}
 
 def parse_one_session(file_path):
 	"""
 	Parse the `one_session.txt` file to extract prefix, seen data, and origin ASNs.
 	"""
 	moas_data = []  # List to hold parsed MOAS event data
-	with open(file_path, 'r') as file:
-		lines = file.readlines()
-		total_lines = len(lines)
-
-		for i in range(0, total_lines, 4):  # Process each MOAS event (4-line groups)
-			if i % 1000 == 0:  # Print progress every 1000 lines
-				print(f"Parsing progress: {i}/{total_lines} lines processed...")
+	for index, event in enumerate(iter_event_log(file_path)):
+		if index % 1000 == 0:  # Print progress every 1000 events
+			print(f"Parsing progress: {index} events processed...")
 
-			prefix = lines[i].strip().split(": ")[1]
-			seen_in = lines[i + 1].strip().split(": ")[1]
-			origin_asns = list(map(int, lines[i + 2].strip().split(": ")[1].split(",")))  # Split by comma only
-			moas_data.append({"prefix": prefix, "seen_in": seen_in, "origin_asns": origin_asns})
+		# Split by comma only; members of AS sets such as {1,2} count as origin ASNs too
+		origin_asns = [int(asn) for asn in re.findall(r"\d+", ",".join(event.get("origin_asns", [])))]
+		moas_data.append({"prefix": event["prefix"], "seen_in": event.get("seen_in"), "origin_asns": origin_asns})
 
 	print("Parsing complete.")
 	return moas_data
@@ -317,10 +405,15 @@ def parse_one_session(file_path):
 def analyze_moas_events(moas_data):
 	"""
 	Analyze MOAS events and assign suspicion scores to each ASN.
+	suspicionscorer.py --events does the same per event from the enrichment results, without the network.
 	"""
 	asn_scores = defaultdict(list)  # {ASN: [scores]}
 	prefix_results = []  # Detailed results for each prefix
 	total_events = len(moas_data)
+
+	# Look every distinct ASN up once, however many events it is an origin in
+	distinct_asns = list(dict.fromkeys(asn for event in moas_data for asn in event["origin_asns"]))
+	asn_properties = {asn: check_asn_properties(asn) for asn in distinct_asns}
 	
 	for index, event in enumerate(moas_data):
 		if index % 100 == 0:  # Print progress every 100 events
@@ -333,7 +426,7 @@ def analyze_moas_events(moas_data):
 		# Analyze each ASN
 		asn_analysis = []
 		for asn in origin_asns:
-			asn_details = check_asn_properties(asn)
+			asn_details = asn_properties[asn]
 			asn_scores[asn].append(asn_details["score"])
 			asn_analysis.append(asn_details)
 			prefix_suspicion += asn_details["score"]
@@ -402,29 +495,63 @@ def write_results_to_file(prefix_results, categories, output_path):
 			file.write(", ".join(map(str, asns)) + "\n\n")
 
 
-def main():
-	one_session_file = "./output/one_session_2024.txt"
-	output_file = "./output/asn_analysis_results_2024.txt"
+def main(argv=None, prog=None):
+	parser = argparse.ArgumentParser(prog=prog, description="Analyze the ASNs of one-session MOAS events with RIPEstat")
+	parser.add_argument("--input", default="./output/one_session_2024.txt", help="one_session file to read")
+	parser.add_argument("--output", default="./output/asn_analysis_results_2024.jsonl", help="JSON lines file the analyses are appended to (schema in analysisresults.py)")
+	parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY, help="Maximum number of RIPEstat requests in flight")
+	parser.add_argument("--base-url", default=RIPESTAT_BASE, help="RIPEstat base URL (e.g. a local mock server)")
+	parser.add_argument("--rate", type=float, default=DEFAULT_RATE, help="Maximum RIPEstat requests per second")
+	parser.add_argument("--retries", type=int, default=DEFAULT_RETRIES, help="Retries per request on timeouts, 429 and 5xx")
+	parser.add_argument("--vrps", help="Validate RPKI locally against a VRP CSV/JSON dump instead of RIPEstat")
+	parser.add_argument("--cache", default=CACHE_PATH, help="SQLite file caching RIPEstat responses")
+	parser.add_argument("--no-cache", action="store_true", help="Always query RIPEstat")
+	parser.add_argument("--offline", action="store_true", help="Use only local datasets (--delegated, --vrps, --pfx2as, ...), never RIPEstat")
+	parser.add_argument("--delegated", nargs="*", default=[], help="RIR delegated-stats files (offline mode)")
+	parser.add_argument("--pfx2as", help="Prefix-to-AS snapshot giving the announced prefixes (offline mode)")
+	parser.add_argument("--visibility", help="JSON snapshot of RIPEstat visibility data per ASN (offline mode)")
+	parser.add_argument("--as-path", help="JSON snapshot of RIPEstat as-path-length stats per ASN (offline mode)")
+	args = parser.parse_args(argv)
+
+	global rpki_validator, data_source
+	if args.offline:
+		data_source = LocalSource(args.delegated, args.vrps, args.pfx2as, args.visibility, args.as_path)
+	elif args.vrps:
+		rpki_validator = RpkiValidator.from_file(args.vrps)
+
+	cache = None if args.no_cache or args.offline else ResponseCache(args.cache)
+	client = RipeStatClient(args.base_url, args.concurrency, cache=cache, rate=args.rate, retries=args.retries)
+	set_client(client)
+	one_session_file = args.input
+	output_file = args.output
 
 	event_list = parse_one_session(one_session_file)
-	asns_to_analyze = {asn for event in event_list for asn in event["origin_asns"]}
-	processed_asns = set()  # Track ASNs already processed
+	analyzed_asns = read_analyzed_asns(output_file)
+	asns_to_analyze = sorted({asn for event in event_list for asn in event["origin_asns"]} - analyzed_asns)
+	print(f"Skipping {len(analyzed_asns)} already analyzed ASNs")
 
+	failed_asns = []
 	start_time = time.time()
 	with open(output_file, "a") as file:  # Use 'a' mode to append to the file
-		for asn in asns_to_analyze:
-			if asn in processed_asns:
-				print(f"Skipping already analyzed ASN {asn}")
+		for asn, result, error in analyze_asns(asns_to_analyze, args.concurrency):
+			if result is None:
+				print(f"RIPEstat unavailable for ASN {asn}, not recording it: {error}")
+				failed_asns.append(asn)
 				continue
-			
-			print(f"Analyzing ASN {asn}...")
-			result = analyze_asn(asn)
-			file.write(f"{result}\n")  # Write the result immediately after analysis
-			processed_asns.add(asn)  # Mark ASN as processed
+			print(f"Analyzed ASN {asn}")
+			file.write(json.dumps(flatten_analysis(result)) + "\n")  # Write the result immediately after analysis
 			
 	total_time = time.time() - start_time
 	print(f"Processed {len(asns_to_analyze)} ASNs in {total_time:.2f} seconds.")
+	if failed_asns:
+		print(f"{len(failed_asns)} ASNs failed and were not recorded; rerun to retry them")
+	if cache is not None:
+		stats = cache.stats()
+		print(f"Cache: {stats['hits']} hits, {stats['misses']} misses ({stats['expired']} expired), {stats['evicted']} evicted, hit ratio {stats['hit_ratio']:.2%}")
+	client.close()
 	print(f"Results written to {output_file}.")
+	if failed_asns:
+		sys.exit(1)  # Incomplete results: a pipeline run must not record the stage as done
 
 if __name__ == "__main__":
 	main()
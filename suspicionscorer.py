@@ -1,5 +1,18 @@
-import ast
-from collections import defaultdict
+import argparse
+import re
+
+from analysisresults import load_results
+from summaryparser import iter_event_log
+
+########
+# suspicion scores of the analyzed ASNs of every year at once
+# the rules are applied per column: each status column is categorical, so a rule is looked up once per distinct status
+# score = rpki points + rir points + ipv4 visibility points + ipv6 visibility points
+# with --events, the one-session MOAS events are joined with the scored ASNs: every distinct ASN is looked up once
+# (hash joins on (year, asn), falling back to the latest year the ASN was analyzed in) and each event is scored from its origin set
+# one-session files from main.py --peers summaries carry the peers behind each origin; the ranking shows them per origin
+# and the fewest peers of any origin (min_peers), since an origin only one peer saw may be a stale or leaked path
+########
 
 # Define the suspicion scoring rules
 SUSPICION_RULES = {
@@ -24,49 +37,182 @@ SUSPICION_RULES = {
 	}
 }
 
+# Rule category -> the result columns it scores
+RULE_COLUMNS = {
+	"rpki_status": ("rpki_status",),
+	"rir": ("rir",),
+	"visibility": ("ipv4_visibility", "ipv6_visibility"),
+}
+
 def calculate_suspicion_score(asn_data):
-	"""Calculate the suspicion score for a given ASN entry."""
+	"""Calculate the suspicion score for a given ASN entry (a flat record of analysisresults.py)."""
 	score = 0
-
-	# RPKI status
-	score += SUSPICION_RULES["rpki_status"].get(asn_data.get("rpki_status"), 0)
-	
-	# RIR status
-	score += SUSPICION_RULES["rir"].get(asn_data.get("rir"), 0)
-	
-	# Visibility (process IPv4 and IPv6 visibility separately if provided as dict)
-	visibility = asn_data.get("visibility")
-	if isinstance(visibility, dict):
-		for key in ["ipv4_status", "ipv6_status"]:
-			score += SUSPICION_RULES["visibility"].get(visibility.get(key, "unknown"), 0)
-	elif isinstance(visibility, tuple) and visibility[0] == "unknown":
-		score += SUSPICION_RULES["visibility"]["unknown"]
-	
+	for category, columns in RULE_COLUMNS.items():
+		for column in columns:
+			score += SUSPICION_RULES[category].get(asn_data.get(column), 0)
 	return score
 
-def analyze_asn_scores(file_path):
-	print(file_path)
-	"""Read ASN data from file, calculate scores, and tally the results."""
-	score_counts = defaultdict(int)
-
-	# Read the file and process each ASN
-	with open(file_path, "r") as file:
-		for line in file:
-			try:
-				asn_data = ast.literal_eval(line.strip())
-				if isinstance(asn_data, dict):  # Ensure the parsed line is a dictionary
-					score = calculate_suspicion_score(asn_data)
-					score_counts[score] += 1
-				else:
-					print(f"Skipping invalid line (not a dictionary): {line.strip()}")
-			except Exception as e:
-				print(f"Skipping invalid line (error: {e}): {line.strip()}")
+def rule_points(column, rules):
+	"""Points of every row of a categorical status column; statuses without a rule (or missing) score 0."""
+	return column.map(rules).astype("float64").fillna(0).astype("int64")
+
+def score_results(results):
+	"""Add a <category>_points column per rule category and their sum as score."""
+	score = 0
+	for category, columns in RULE_COLUMNS.items():
+		points = sum(rule_points(results[column], SUSPICION_RULES[category]) for column in columns)
+		results[f"{category}_points"] = points
+		score = score + points
+	results["score"] = score
+	return results
+
+def score_distributions(scored):
+	"""
+	Number of ASNs per (year, points) for the total score and for each rule category, from one groupby:
+	a DataFrame indexed by (category, year) with one column per point value.
+	"""
+	columns = ["score"] + [f"{category}_points" for category in RULE_COLUMNS]
+	long = scored.melt(id_vars="year", value_vars=columns, var_name="category", value_name="points")
+	long["category"] = long["category"].str.removesuffix("_points")
+	return long.groupby(["category", "year", "points"]).size().unstack(fill_value=0)
+
+# Highest score an ASN can get (20): every column at the worst status of its rule category
+MAX_SCORE = sum(max(SUSPICION_RULES[category].values()) * len(columns) for category, columns in RULE_COLUMNS.items())
+# Category of an event by the mean score of its analyzed origins, on this 0-20 scale: below a quarter of the maximum
+# (one or two common gaps such as no IPv6 or no ROAs) is likely legitimate, from half of it (several red flags) likely malicious
+LEGITIMATE_BELOW = MAX_SCORE / 4
+MALICIOUS_FROM = MAX_SCORE / 2
+EVENT_CATEGORIES = ((LEGITIMATE_BELOW, "Likely Legitimate"), (MALICIOUS_FROM, "Potentially Suspicious"), (float("inf"), "Likely Malicious"))
+SEEN_IN_YEAR = re.compile(r"_(\d{4})\d{4}_\d{4}\.txt$")
+
+def event_table(one_session_files):
+	"""
+	One row per (event, origin ASN) of the one-session files: event (running number), prefix, seen_in, year, asn and
+	peers (how many peers announced the origin, NaN without Peer Counts). Members of AS sets count as origins
+	and share the set's peer count; an ASN appears once per event.
+	"""
+	import pandas as pd
+
+	columns = {"event": [], "prefix": [], "seen_in": [], "year": [], "asn": [], "peers": []}
+	event_index = 0
+	for one_session_file in one_session_files:
+		for event in iter_event_log(one_session_file):
+			seen_in = event.get("seen_in")
+			match = SEEN_IN_YEAR.search(seen_in or "")
+			year = int(match.group(1)) if match else -1
+			counts = event.get("peer_counts", [])
+			peers = {}
+			for position, token in enumerate(event.get("origin_asns", [])):
+				count = int(counts[position]) if position < len(counts) and counts[position].isdigit() else None
+				for asn in re.findall(r"\d+", token):
+					asn = int(asn)
+					if count is not None and (peers.get(asn) is None or count > peers[asn]):
+						peers[asn] = count
+					else:
+						peers.setdefault(asn, None)
+			for asn, count in peers.items():
+				columns["event"].append(event_index)
+				columns["prefix"].append(event["prefix"])
+				columns["seen_in"].append(seen_in)
+				columns["year"].append(year)
+				columns["asn"].append(asn)
+				columns["peers"].append(float("nan") if count is None else count)
+			event_index += 1
+	table = pd.DataFrame(columns)
+	table["prefix"] = table["prefix"].astype("category")
+	table["seen_in"] = table["seen_in"].astype("category")
+	return table.astype({"event": "int64", "year": "int64", "asn": "int64", "peers": "float64"})
+
+def join_scores(events, scored):
+	"""
+	Add the score of every origin to the event rows (NaN when the ASN was never analyzed).
+	The score of the event's year is used when there is one, else the one of the latest year.
+	"""
+	scores = scored[["year", "asn", "score"]].drop_duplicates(["year", "asn"], keep="last")
+	latest = scores.sort_values("year", kind="stable").drop_duplicates("asn", keep="last")
+	joined = events.merge(scores, on=["year", "asn"], how="left")
+	fallback = joined[["asn"]].merge(latest[["asn", "score"]], on="asn", how="left")["score"]
+	joined["score"] = joined["score"].fillna(fallback)
+	return joined
+
+def rank_events(joined):
+	"""
+	One row per event: prefix, seen_in, origins ("asn:score" with ? for unknown ASNs, "@peers" when counted), total / max / mean
+	score of the analyzed origins, number of unknown origins, fewest peers of any origin and category;
+	sorted from the most suspicious event down: by max score, then mean score, the total only breaking ties
+	(so an event does not rank higher just for having more origins), events without analyzed origins last.
+	"""
+	import numpy as np
+
+	joined = joined.assign(
+		known=joined["score"].notna(),
+		origin=joined["asn"].astype(str) + ":" + joined["score"].map("{:.0f}".format).str.replace("nan", "?")
+		+ joined["peers"].map("@{:.0f}".format).str.replace("@nan", ""),
+	)
+	grouped = joined.groupby("event", sort=False)
+	ranking = grouped.agg(
+		prefix=("prefix", "first"),
+		seen_in=("seen_in", "first"),
+		total_score=("score", "sum"),
+		max_score=("score", "max"),
+		mean_score=("score", "mean"),
+		origins=("asn", "size"),
+		known=("known", "sum"),
+		min_peers=("peers", "min"),
+	)
+	ranking["origin_scores"] = grouped["origin"].agg(", ".join)
+	ranking["unknown"] = ranking["origins"] - ranking["known"]
+	bounds, names = zip(*EVENT_CATEGORIES)
+	ranking["category"] = np.where(
+		ranking["known"] == 0,
+		"Lacking Information",
+		np.array(names, dtype=object)[np.searchsorted(bounds, ranking["mean_score"].fillna(0), side="right")],
+	)
+	ranking["total_score"] = ranking["total_score"].astype("int64")
+	return ranking.sort_values(["max_score", "mean_score", "total_score"], ascending=False, kind="stable", na_position="last").drop(columns=["known"])
+
+def write_ranking(ranking, output_file):
+	with open(output_file, "w") as file:
+		file.write("rank\tprefix\tseen_in\ttotal_score\tmax_score\tmean_score\tunknown\tmin_peers\tcategory\torigins\n")
+		for rank, row in enumerate(ranking.itertuples(index=False), 1):
+			max_score = "" if row.max_score != row.max_score else f"{row.max_score:.0f}"
+			mean_score = "" if row.mean_score != row.mean_score else f"{row.mean_score:.2f}"
+			min_peers = "" if row.min_peers != row.min_peers else f"{row.min_peers:.0f}"
+			file.write(f"{rank}\t{row.prefix}\t{row.seen_in}\t{row.total_score}\t{max_score}\t{mean_score}\t{row.unknown}\t{min_peers}\t{row.category}\t{row.origin_scores}\n")
+
+def score_events(one_session_files, folder="output", output_file="output/moas_event_ranking.tsv", years=None):
+	"""Join the one-session events with the scored ASN results, write the per-event ranking and return it."""
+	events = event_table(one_session_files)
+	scored = score_results(load_results(folder, years))
+	ranking = rank_events(join_scores(events, scored))
+	write_ranking(ranking, output_file)
+	print(f"{len(ranking)} events ({events['asn'].nunique()} distinct ASNs) ranked, written to {output_file}")
+	print(ranking["category"].value_counts().to_string())
+	return ranking
+
+def analyze_asn_scores(folder="output", years=None):
+	"""Score the results of every year (or the given ones) and print the distributions."""
+	scored = score_results(load_results(folder, years))
+	distributions = score_distributions(scored)
 
 	# Print results
-	print("Suspicion Score Distribution:")
-	for score, count in sorted(score_counts.items()):
-		print(f"Score {score}: {count} ASNs")
+	for category in ["score"] + list(RULE_COLUMNS):
+		table = distributions.loc[category]
+		table = table.loc[:, (table != 0).any()]
+		title = "Suspicion Score Distribution" if category == "score" else f"{category} points distribution"
+		print(f"{title} (ASNs per year and points):")
+		print(table.to_string())
+		print()
+	return scored, distributions
 
-# Usage
-file_path = "./output/asn_analysis_results_2024.txt"  # Replace with the path to your file
-analyze_asn_scores(file_path)
+if __name__ == "__main__":
+	parser = argparse.ArgumentParser(description="Suspicion score distributions of the analyzed ASNs per year")
+	parser.add_argument("--folder", default="output", help="Folder with the asn_analysis_results_<year>.jsonl / .txt files")
+	parser.add_argument("--years", type=int, nargs="+", help="Only these years (default: every year found)")
+	parser.add_argument("--events", nargs="+", help="One-session files whose events are scored from their origins instead")
+	parser.add_argument("--ranking", default="output/moas_event_ranking.tsv", help="Per-event ranking written with --events")
+	args = parser.parse_args()
+	if args.events:
+		score_events(args.events, args.folder, args.ranking, args.years)
+	else:
+		analyze_asn_scores(args.folder, args.years)
@@ -0,0 +1,66 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+########
+# local stand-in for the RIPEstat API, for the tests and for running the scripts without network access
+# every path (with its query string) answers a scripted list of responses in turn; the last one keeps repeating
+# e.g. with RipeStatStub() as stub: stub.script("/data/rir/data.json?resource=1", (503, {}), (200, {"data": {}}))
+########
+
+class RipeStatStub:
+	"""Threaded HTTP server on a free local port; requests lists the paths asked for, in order."""
+	def __init__(self):
+		self.responses = {}  # path -> [(status, body, headers), ...]
+		self.requests = []
+		self.default = None  # (status, body, headers) for paths without a script; 404 when None
+		self.lock = threading.Lock()
+		stub = self
+
+		class Handler(BaseHTTPRequestHandler):
+			def do_GET(self):
+				status, body, headers = stub.respond(self.path)
+				payload = body if isinstance(body, bytes) else json.dumps(body).encode()
+				self.send_response(status)
+				for name, value in headers.items():
+					self.send_header(name, value)
+				self.send_header("Content-Type", "application/json")
+				self.send_header("Content-Length", str(len(payload)))
+				self.end_headers()
+				self.wfile.write(payload)
+
+			def log_message(self, format, *args):
+				pass
+
+		self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+		self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+	@property
+	def base_url(self):
+		return f"http://127.0.0.1:{self.server.server_address[1]}"
+
+	def script(self, path, *responses):
+		"""Answer path with the responses ((status, body) or (status, body, headers)) in turn."""
+		with self.lock:
+			self.responses[path] = [response if len(response) == 3 else (*response, {}) for response in responses]
+
+	def respond(self, path):
+		with self.lock:
+			self.requests.append(path)
+			responses = self.responses.get(path)
+			if not responses and self.default is not None:
+				return self.default
+			if not responses:
+				return 404, {"status": "error", "messages": [["error", f"no scripted response for {path}"]]}, {}
+			return responses.pop(0) if len(responses) > 1 else responses[0]
+
+	def count(self, path):
+		return self.requests.count(path)
+
+	def __enter__(self):
+		self.thread.start()
+		return self
+
+	def __exit__(self, *exc_info):
+		self.server.shutdown()
+		self.server.server_close()
@@ -0,0 +1,70 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import sus_asn_detection
+from analysisresults import ANALYSIS_FIELDS, convert_results, flatten_analysis, iter_results, list_result_files, load_results
+from ripestat import set_client
+
+OLD_LINES = [
+	{"asn": 64500, "rpki_status": "completely_valid", "rir": "ASSIGNED", "visibility": {"ipv4_status": "visible", "ipv6_status": "invisible"}, "as_path": 4.5},
+	{"asn": 64501, "rpki_status": "no_prefixes", "rir": {}, "visibility": ("unknown", 0, 0), "as_path": None},
+]
+
+class AnalysisResultsTest(unittest.TestCase):
+	def setUp(self):
+		self.folder = tempfile.mkdtemp()
+
+	def write(self, name, lines):
+		path = os.path.join(self.folder, name)
+		with open(path, "w") as file:
+			file.write("\n".join(lines) + "\n")
+		return path
+
+	def test_flatten(self):
+		self.assertEqual(flatten_analysis(OLD_LINES[0]), {
+			"asn": 64500, "rpki_status": "completely_valid", "rir": "ASSIGNED",
+			"ipv4_visibility": "visible", "ipv6_visibility": "invisible", "as_path": 4.5,
+		})
+		record = flatten_analysis(OLD_LINES[1])
+		self.assertEqual((record["rir"], record["ipv4_visibility"], record["ipv6_visibility"]), (None, "unknown", None))
+
+	def test_old_text_files_read_like_json_lines(self):
+		old = self.write("asn_analysis_results_2023.txt", [repr(line) for line in OLD_LINES] + ["not a dict", "[1, 2]"])
+		new = convert_results(old)
+		self.assertEqual(list(iter_results(new)), list(iter_results(old)))
+		self.assertEqual(list(iter_results(new)), [flatten_analysis(line) for line in OLD_LINES])
+		self.assertEqual(list_result_files(self.folder), {2023: new})  # The .jsonl wins over the .txt
+
+	def test_load_results(self):
+		self.write("asn_analysis_results_2022.txt", [repr(OLD_LINES[0])])
+		self.write("asn_analysis_results_2024.jsonl", [json.dumps(flatten_analysis(line)) for line in OLD_LINES])
+		table = load_results(self.folder)
+		self.assertEqual(list(table.columns), ["year"] + list(ANALYSIS_FIELDS))
+		self.assertEqual(list(table["year"]), [2022, 2024, 2024])
+		self.assertEqual(list(table["asn"]), [64500, 64500, 64501])
+		self.assertEqual(str(table["rpki_status"].dtype), "category")
+		self.assertEqual(len(load_results(self.folder, years=[2024])), 2)
+
+	def test_offline_run_appends_json_lines(self):
+		one_session = self.write("one_session.txt", ["Prefix: 192.0.2.0/24", "  Seen in: summary_a.txt", "  Origin ASNs: 64500, {64501,64502}"])
+		pfx2as = self.write("pfx2as.txt", ["192.0.2.0/24 64500"])
+		output = os.path.join(self.folder, "asn_analysis_results_2024.jsonl")
+		self.addCleanup(set_client, None)
+		argv = ["--input", one_session, "--output", output, "--offline", "--pfx2as", pfx2as]
+		with mock.patch.object(sus_asn_detection, "data_source", sus_asn_detection.data_source):
+			sus_asn_detection.main(argv)
+			records = list(iter_results(output))
+			self.assertEqual([record["asn"] for record in records], [64500, 64501, 64502])
+			self.assertEqual(records[0]["rpki_status"], sus_asn_detection.analyze_rpki_data([{"prefix": "192.0.2.0/24", "status": "unknown"}]))
+			self.assertEqual(records[1]["rpki_status"], "no_prefixes")
+			with open(output) as file:
+				self.assertEqual([list(json.loads(line)) for line in file], [list(ANALYSIS_FIELDS)] * 3)
+
+			sus_asn_detection.main(argv)  # A rerun has nothing left to analyze
+			self.assertEqual(len(list(iter_results(output))), 3)
+
+if __name__ == "__main__":
+	unittest.main()
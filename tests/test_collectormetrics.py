@@ -0,0 +1,95 @@
+import contextlib
+import io
+import json
+import os
+import tempfile
+import time
+import unittest
+from datetime import datetime
+
+import main
+from collectormetrics import IntervalMetrics, TimedStream, profiled
+from moasdetector import MOASDetector
+
+FIXTURES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "fixtures", "mrt")
+START = datetime(2024, 1, 1)
+
+def slow_stream(count, delay):
+	for elem in range(count):
+		time.sleep(delay)
+		yield elem
+
+class TimedStreamTest(unittest.TestCase):
+	def test_splits_wait_from_the_loop(self):
+		stream = TimedStream(slow_stream(3, 0.02))
+		for _ in stream:
+			time.sleep(0.01)  # Processing
+		self.assertEqual(stream.elems, 3)
+		self.assertGreaterEqual(stream.wait, 0.06)
+		self.assertGreaterEqual(stream.loop - stream.wait, 0.03)
+
+	def test_counts_add_up_when_the_loop_stops_early(self):
+		stream = TimedStream(range(10))
+		for elem in stream:
+			if elem == 3:
+				break
+		self.assertEqual(stream.elems, 4)
+		self.assertEqual(list(stream), list(range(10)))  # A second pass over a re-iterable stream adds to the counts
+		self.assertEqual(stream.elems, 14)
+
+class IntervalMetricsTest(unittest.TestCase):
+	def test_as_dict(self):
+		metrics = IntervalMetrics("rrc00", START, "batch")
+		detector = MOASDetector()
+		for elem in metrics.wrap(range(5)):
+			detector.announce(f"192.0.2.{elem}/32", "64500")
+		metrics.record_state(detector)
+		record = metrics.as_dict(5)
+		self.assertEqual((record["collector"], record["start_time"], record["mode"]), ("rrc00", "2024-01-01 00:00:00", "batch"))
+		self.assertEqual((record["elems"], record["announcements"], record["prefixes"], record["moas_prefixes"]), (5, 5, 5, 0))
+		self.assertGreaterEqual(record["wall_s"], record["stream_wait_s"])
+		json.dumps(record)
+
+	def test_without_a_stream(self):
+		record = IntervalMetrics("rrc00", START, "stream").as_dict(0)
+		self.assertEqual((record["elems"], record["elems_per_s"], record["processing_elems_per_s"]), (0, 0, 0))
+
+class RunMetricsTest(unittest.TestCase):
+	def test_units_record_and_report_their_metrics(self):
+		folder = tempfile.mkdtemp()
+		unit = ("route-views2", START, datetime(2024, 1, 1, 0, 30))
+		with contextlib.redirect_stdout(io.StringIO()):
+			result = main.run_unit(unit, folder, sub_moas=True, metrics=True, mrt=(FIXTURES, 1))
+			plain = main.run_unit(unit, folder, mrt=(FIXTURES, 1))
+		self.assertEqual(result["status"], "done")
+		self.assertNotIn("metrics", plain)
+		metrics = result["metrics"]
+		self.assertEqual(metrics["elems"], result["total_updates"])
+		self.assertEqual(metrics["moas_prefixes"], result["moas_count"])
+		self.assertIn("sub_moas_conflicts", metrics)
+
+		main.record_metrics(result, folder)
+		main.record_metrics(plain, folder)  # Nothing to record
+		with open(os.path.join(folder, main.metrics_name)) as file:
+			self.assertEqual([json.loads(line) for line in file], [metrics])
+
+		output = io.StringIO()
+		with contextlib.redirect_stdout(output):
+			main.report_metrics([result, result, plain])
+		self.assertIn(f"route-views2: 2 units, {2 * metrics['elems']} elems", output.getvalue())
+
+class ProfiledTest(unittest.TestCase):
+	def test_profiles(self):
+		folder = tempfile.mkdtemp()
+		with profiled(None, os.path.join(folder, "none", "profile")):
+			pass
+		self.assertEqual(os.listdir(folder), [])
+		with profiled("cprofile", os.path.join(folder, "profiles", "profile")):
+			sum(range(1000))
+		self.assertEqual(os.listdir(os.path.join(folder, "profiles")), ["profile.prof"])
+		with self.assertRaises(ValueError):
+			with profiled("perf", os.path.join(folder, "profile")):
+				pass
+
+if __name__ == "__main__":
+	unittest.main()
@@ -0,0 +1,78 @@
+import json
+import os
+import tempfile
+import unittest
+
+import sus_asn_detection
+from datasources import LocalSource
+
+DELEGATED_RIPE = """2|ripencc|20240101|4|19830705|20240101|+0100
+ripencc|*|asn|*|3|summary
+ripencc|NL|asn|64500|10|20000101|allocated|abc
+ripencc|DE|asn|3333|1|19930901|assigned|def
+ripencc|ZZ|asn|64600|5||available
+"""
+DELEGATED_ARIN = """# a comment
+arin|US|asn|64505|1|20100101|assigned|ghi
+"""
+PFX2AS = """192.0.2.0\t24\t64500
+198.51.100.0\t24\t64500_64501
+203.0.113.0\t24\t64501,64502
+# prefix asn lines work too
+2001:db8::/32 64500
+"""
+VRPS = """ASN,IP Prefix,Max Length,Trust Anchor
+AS64500,192.0.2.0/24,24,ripe
+AS64502,198.51.100.0/22,24,ripe
+"""
+
+class LocalSourceTest(unittest.TestCase):
+	def setUp(self):
+		folder = tempfile.mkdtemp()
+		files = {
+			"delegated-ripencc-extended-latest": DELEGATED_RIPE,
+			"delegated-arin-extended-latest": DELEGATED_ARIN,
+			"pfx2as.txt": PFX2AS,
+			"vrps.csv": VRPS,
+			"visibility.json": json.dumps({"64500": [{"ipv4_full_table_peers_not_seeing": []}]}),
+		}
+		for name, text in files.items():
+			with open(os.path.join(folder, name), "w") as file:
+				file.write(text)
+		path = lambda name: os.path.join(folder, name)
+		self.source = LocalSource(
+			delegated_files=[path("delegated-ripencc-extended-latest"), path("delegated-arin-extended-latest")],
+			vrp_file=path("vrps.csv"), pfx2as_file=path("pfx2as.txt"), visibility_file=path("visibility.json"),
+		)
+
+	def test_rir_status(self):
+		self.assertEqual(self.source.rir_status(64502), "ALLOCATED")
+		self.assertEqual(self.source.rir_status("3333"), "ASSIGNED")
+		self.assertEqual(self.source.rir_status(64602), "UNALLOCATED")
+		self.assertEqual(self.source.rir_status(64510), "no_rir_data")  # Just past 64500-64509
+		# 64505 is in the RIPE range and also delegated by ARIN
+		self.assertEqual(self.source.rir_status(64505), "multiple_statuses")
+
+	def test_announced_prefixes(self):
+		self.assertEqual(self.source.announced_prefixes(64500), ["192.0.2.0/24", "198.51.100.0/24", "2001:db8::/32"])
+		self.assertEqual(self.source.announced_prefixes("64501"), ["198.51.100.0/24", "203.0.113.0/24"])
+		self.assertEqual(self.source.announced_prefixes(64502), ["203.0.113.0/24"])
+		self.assertEqual(self.source.announced_prefixes(64999), [])
+
+	def test_rpki_and_snapshots(self):
+		self.assertEqual(self.source.rpki_data(64500, ["192.0.2.0/24", "198.51.100.0/24", "203.0.113.0/24"]), [
+			{"prefix": "192.0.2.0/24", "status": "valid"},
+			{"prefix": "198.51.100.0/24", "status": "invalid_asn"},
+			{"prefix": "203.0.113.0/24", "status": "unknown"},
+		])
+		self.assertEqual(self.source.visibility(64500), [{"ipv4_full_table_peers_not_seeing": []}])
+		self.assertEqual(self.source.visibility(64501), [])
+		self.assertEqual(self.source.as_path_stats(64500), [])
+
+	def test_analysis_needs_no_network(self):
+		analysis = sus_asn_detection.analyze_asn(64502, source=self.source)
+		self.assertEqual(analysis["rir"], "ALLOCATED")
+		self.assertEqual(analysis["rpki_status"], sus_asn_detection.analyze_rpki_data([{"prefix": "203.0.113.0/24", "status": "unknown"}]))
+
+if __name__ == "__main__":
+	unittest.main()
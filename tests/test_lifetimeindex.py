@@ -0,0 +1,42 @@
+import os
+import tempfile
+import unittest
+
+from lifetimeindex import LifetimeIndex
+
+def write_summary(folder, name, prefixes):
+	os.makedirs(folder, exist_ok=True)
+	with open(os.path.join(folder, name), "w") as file:
+		file.write("BGPStream Summary for route-views2 (2024-01-01 00:00:00 to 2024-01-01 02:00:00)\nTotal Updates: 10\n")
+		file.write(f"MOAS Count: {len(prefixes)}\n\n")
+		for prefix in prefixes:
+			file.write(f"Prefix: {prefix}\nOrigin ASNs: 1, 2\n\n")
+
+class LifetimeIndexTest(unittest.TestCase):
+	def setUp(self):
+		root = tempfile.mkdtemp()
+		self.first, self.second = os.path.join(root, "first"), os.path.join(root, "second")
+		write_summary(self.first, "summary_route-views2_20240101_0000.txt", ["192.0.2.0/24"])
+		write_summary(self.first, "summary_route-views2_20240101_1200.txt", ["192.0.2.0/24", "198.51.100.0/24"])
+		write_summary(self.second, "summary_route-views2_20240101_0000.txt", ["203.0.113.0/24"])
+		self.path = os.path.join(root, "index.json")
+
+	def test_incremental_update_and_reload(self):
+		index = LifetimeIndex(self.path)
+		self.assertEqual(index.update(self.first), 2)
+		index.save()
+		index = LifetimeIndex(self.path)
+		self.assertEqual(index.update(self.first), 0)
+		self.assertEqual(index.prefixes["192.0.2.0/24"][:3], ["summary_route-views2_20240101_0000.txt", "summary_route-views2_20240101_1200.txt", 2])
+
+	def test_another_folder_rebuilds_instead_of_mixing(self):
+		index = LifetimeIndex(self.path)
+		index.update(self.first)
+		index.save()
+		index = LifetimeIndex(self.path)
+		self.assertEqual(index.update(self.second), 1)
+		self.assertEqual(set(index.prefixes), {"203.0.113.0/24"})
+		self.assertEqual(index.data_folder, os.path.abspath(self.second))
+
+if __name__ == "__main__":
+	unittest.main()
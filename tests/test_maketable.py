@@ -0,0 +1,33 @@
+import os
+import tempfile
+import unittest
+
+import pandas as pd
+
+from maketable import write_table
+
+class WriteTableTest(unittest.TestCase):
+	def write(self, table, keys):
+		output_file = os.path.join(tempfile.mkdtemp(), "moas_table.txt")
+		write_table(table, keys, output_file)
+		with open(output_file) as file:
+			return file.read().splitlines()
+
+	def test_long_collector_names_keep_their_column(self):
+		index = pd.MultiIndex.from_tuples([(2024, "route-views.amsix"), (2024, "rrc00")], names=["year", "collector"])
+		table = pd.DataFrame({"total_updates": [1000, 20], "moas_count": [10, 1], "moas_ratio": [0.01, 0.05], "short_count": [3, 0]}, index=index)
+		header, rule, first, second = self.write(table, ["year", "collector"])
+		column = header.index("Announcements")
+		self.assertEqual(first[column:].split()[0], "1000")
+		self.assertEqual(second[column:].split()[0], "20")
+		self.assertEqual(first[:column].split(), ["2024", "route-views.amsix"])
+		self.assertEqual(rule, "=" * len(header))
+
+	def test_single_key(self):
+		table = pd.DataFrame({"total_updates": [5], "moas_count": [1], "moas_ratio": [0.2], "short_count": [1]}, index=pd.Index([2024], name="year"))
+		header, rule, row = self.write(table, ["year"])
+		self.assertEqual(row.split(), ["2024", "5", "1", "0.200000", "1"])
+		self.assertTrue(header.startswith("Year  Announcements"))
+
+if __name__ == "__main__":
+	unittest.main()
@@ -0,0 +1,116 @@
+import contextlib
+import io
+import json
+import os
+import tempfile
+import unittest
+from datetime import datetime
+
+import main
+
+FIXTURES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "fixtures", "mrt")
+START = datetime(2024, 1, 1)
+UNIT = ("route-views2", START, datetime(2024, 1, 1, 2))
+
+class PendingUnitsTest(unittest.TestCase):
+	def setUp(self):
+		self.folder = tempfile.mkdtemp()
+		self.options = main.unit_options(sub_moas=True)
+		open(main.summary_filename("route-views2", START, self.folder), "w").close()
+		main.record_unit({**dict(zip(("collector", "start_time", "end_time"), UNIT)), "options": self.options, "status": "done", "filename": ""}, self.folder)
+
+	def test_same_options_are_done(self):
+		self.assertEqual(main.pending_units([UNIT], self.folder, main.unit_options(sub_moas=True)), ([], []))
+
+	def test_other_options_or_end_time_do_not_count(self):
+		for options in (main.unit_options(), main.unit_options(sub_moas=True, peers=True), main.unit_options(2 * 60 * 60), main.unit_options(sub_moas=True, filters={"ipversion": "4"})):
+			self.assertEqual(main.pending_units([UNIT], self.folder, options), ([UNIT], [UNIT]))
+		longer = (UNIT[0], START, datetime(2024, 1, 2))
+		self.assertEqual(main.pending_units([longer], self.folder, self.options), ([longer], [longer]))
+
+	def test_missing_files_are_redone(self):
+		os.remove(main.summary_filename("route-views2", START, self.folder))
+		self.assertEqual(main.pending_units([UNIT], self.folder, self.options), ([UNIT], []))
+		self.assertEqual(main.pending_units([UNIT], self.folder, main.unit_options(timing=True)), ([UNIT], []))
+
+	def test_only_the_given_units_lose_their_part_files(self):
+		other = datetime(2024, 1, 1, 12)
+		leftovers = main.partial_filenames("route-views2", START, self.folder)
+		running = main.partial_filenames("route-views2", other, self.folder)  # Another run is still writing these
+		for filename in leftovers + running:
+			open(filename, "w").close()
+		main.remove_partial_files([UNIT], self.folder)
+		self.assertFalse(any(os.path.exists(filename) for filename in leftovers))
+		self.assertTrue(all(os.path.exists(filename) for filename in running))
+
+class PoolTest(unittest.TestCase):
+	UNITS = [
+		("route-views2", START, datetime(2024, 1, 1, 0, 15)),
+		("route-views2", datetime(2024, 1, 1, 0, 15), datetime(2024, 1, 1, 0, 30)),
+	]
+
+	def run_units(self, workers, **options):
+		folder = tempfile.mkdtemp()
+		with contextlib.redirect_stdout(io.StringIO()):
+			results = list(main.run_units(self.UNITS, workers, folder, mrt=(FIXTURES, 1), **options))
+		return folder, results
+
+	def test_units_are_ordered_collector_first(self):
+		intervals = [(START, UNIT[2]), (UNIT[2], datetime(2024, 1, 1, 4))]
+		self.assertEqual(
+			[(collector, start_time) for collector, start_time, _ in main.generate_units(["rrc00", "route-views2"], intervals)],
+			[("rrc00", START), ("rrc00", UNIT[2]), ("route-views2", START), ("route-views2", UNIT[2])],
+		)
+
+	def test_pool_writes_the_same_summaries_as_a_serial_run(self):
+		summaries = []
+		for workers in (1, 2):
+			folder, results = self.run_units(workers)
+			self.assertEqual([result["status"] for result in results], ["done", "done"])
+			if workers > 1:
+				self.assertNotIn(os.getpid(), [result["worker"] for result in results])
+			contents = {}
+			for result in results:
+				with open(result["filename"]) as file:
+					contents[os.path.basename(result["filename"])] = file.read()
+			summaries.append(contents)
+		self.assertEqual(len(summaries[0]), 2)
+		self.assertEqual(summaries[0], summaries[1])
+
+	def test_failed_units_are_recorded_and_redone(self):
+		folder, results = self.run_units(2, filters={"prefixes": ["not-a-prefix"]})
+		self.assertEqual([result["status"] for result in results], ["failed", "failed"])
+		self.assertIn("ValueError", results[0]["error"])
+		for result in results:
+			main.record_unit(result, folder)
+		with open(os.path.join(folder, main.manifest_name), "a") as file:
+			file.write('{"collector": "route-views2", "sta')  # Torn last line of a killed run
+		self.assertEqual(len(main.load_manifest(folder)), 2)
+		self.assertEqual(main.pending_units(self.UNITS, folder), (self.UNITS, []))
+
+class ResumeTest(unittest.TestCase):
+	def run_main(self, *options):
+		with contextlib.redirect_stdout(io.StringIO()) as output, contextlib.redirect_stderr(io.StringIO()):
+			main.main(["0", "--data", self.folder, "--schedule", self.schedule, "--mrt", FIXTURES, *options])
+		return output.getvalue()
+
+	def setUp(self):
+		self.folder = tempfile.mkdtemp()
+		self.schedule = os.path.join(self.folder, "schedule.json")
+		with open(self.schedule, "w") as file:
+			json.dump({"years": [2024], "days": [1], "times": ["00:00:00"]}, file)
+		self.addCleanup(main.__dict__.update, {"years": main.years, "session_duration": main.session_duration})
+
+	def test_rerun_with_other_options_stops(self):
+		self.assertIn("Processed route-views2", self.run_main())
+		self.assertIn("Skipping 12 completed units", self.run_main())
+		for options in (["--peers"], ["--duration", "1"]):
+			with self.assertRaises(SystemExit):
+				self.run_main(*options)
+		output = self.run_main("--peers", "--restart")
+		self.assertIn("Skipping 0 completed units", output)
+		with open(main.summary_filename("route-views2", START, self.folder)) as file:
+			self.assertIn("Peer Counts:", file.read())
+
+if __name__ == "__main__":
+	unittest.main()
@@ -0,0 +1,19 @@
+import contextlib
+import io
+import unittest
+
+import maketable
+import moas
+
+class TableCommandTest(unittest.TestCase):
+	def test_group_keys_match_maketable(self):
+		self.assertEqual(moas.TABLE_KEYS, maketable.GROUP_KEYS)
+
+	def test_unknown_group_key_is_rejected(self):
+		with contextlib.redirect_stderr(io.StringIO()), self.assertRaises(SystemExit):
+			moas.build_parser().parse_args(["table", "--by", "year", "peer"])
+		args = moas.build_parser().parse_args(["table", "--by", "year", "collector"])
+		self.assertEqual(args.by, ["year", "collector"])
+
+if __name__ == "__main__":
+	unittest.main()
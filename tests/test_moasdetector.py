@@ -0,0 +1,126 @@
+import json
+import os
+import tempfile
+import unittest
+from datetime import datetime
+from types import SimpleNamespace
+from unittest import mock
+
+import main
+from benchmark import compact_detect, legacy_detect, synthetic_stream
+from moasdetector import MOASDetector, StreamingMOASDetector, TimedMOASDetector
+from summaryparser import iter_summary
+
+def announce(time, prefix, origin, peer="192.0.2.1"):
+	return SimpleNamespace(type="A", time=time, fields={"prefix": prefix, "as-path": f"64500 3356 {origin}"}, peer_address=peer)
+
+def withdraw(time, prefix, peer="192.0.2.1"):
+	return SimpleNamespace(type="W", time=time, fields={"prefix": prefix}, peer_address=peer)
+
+class MOASDetectorTest(unittest.TestCase):
+	def test_events_and_peer_counts(self):
+		detector = MOASDetector(peers=True)
+		total = detector.process([
+			announce(0, "192.0.2.0/24", 100),
+			announce(1, "192.0.2.0/24", 100, "192.0.2.2"),
+			announce(2, "192.0.2.0/24", 200, "192.0.2.3"),
+			announce(3, "198.51.100.0/24", 300),
+			withdraw(4, "192.0.2.0/24"),
+		])
+		self.assertEqual(total, 4)
+		self.assertEqual(detector.moas_count, 1)
+		self.assertEqual(detector.moas_events(), {"192.0.2.0/24": ["100", "200"]})
+		self.assertEqual(detector.peer_counts(), {"192.0.2.0/24": [2, 1]})
+
+	def test_matches_the_legacy_sets(self):
+		expected = legacy_detect(synthetic_stream(20000, 5000, seed=3))
+		self.assertGreater(expected[1], 0)
+		self.assertEqual(compact_detect(synthetic_stream(20000, 5000, seed=3)), expected)
+
+		detector = MOASDetector()
+		for elem in synthetic_stream(20000, 5000, seed=3):
+			detector.announce(elem.fields["prefix"], elem.fields["as-path"])
+		self.assertEqual((detector.moas_count, detector.moas_events()), expected[1:])
+
+	def test_as_sets_and_trailing_whitespace(self):
+		elems = [announce(0, "2001:db8::/32", "{100,200}"), announce(1, "2001:db8::/32", "300 ")]
+		self.assertEqual(compact_detect(elems), legacy_detect(elems))
+		self.assertEqual(compact_detect(elems)[2], {"2001:db8::/32": ["{100,200}", "300"]})
+
+# 192.0.2.0/24 conflicts, goes idle long enough to expire, then conflicts again with a third origin
+EXPIRING = [
+	announce(0, "192.0.2.0/24", 100),
+	announce(10, "192.0.2.0/24", 200),
+	announce(20, "198.51.100.0/24", 300),
+	announce(200, "198.51.100.0/24", 300),
+	announce(400, "198.51.100.0/24", 300),
+	announce(410, "192.0.2.0/24", 100),
+	announce(420, "192.0.2.0/24", 400),
+]
+
+class StreamingMOASDetectorTest(unittest.TestCase):
+	def test_expired_prefix_is_flushed_and_starts_over(self):
+		events, flushed = [], []
+		detector = StreamingMOASDetector(100, lambda time, prefix, origins: events.append((time, prefix, origins)), lambda *record: flushed.append(record))
+		detector.process(EXPIRING)
+		self.assertEqual(flushed, [("192.0.2.0/24", ["100", "200"])])  # Expired by the second rotation
+		self.assertEqual(detector.expired, 1)
+		self.assertEqual(detector.finish(), 2)
+		self.assertEqual(flushed[1:], [("192.0.2.0/24", ["100", "400"])])
+		self.assertEqual(events, [(10, "192.0.2.0/24", ["100", "200"]), (420, "192.0.2.0/24", ["100", "400"])])
+		self.assertEqual(detector.moas_count, 2)
+
+	def test_summary_has_one_record_per_prefix(self):
+		folder = tempfile.mkdtemp()
+		filename, events_file = os.path.join(folder, "summary.txt"), os.path.join(folder, "events.jsonl")
+		with mock.patch.object(main, "get_stream", return_value=EXPIRING):
+			main.stream_interval("rrc00", datetime(2024, 1, 1), datetime(2024, 1, 1, 2), filename, events_file, 100)
+		records = list(iter_summary(filename))
+		self.assertEqual(records[0].moas_count, 2)
+		self.assertEqual(records[1:], [("192.0.2.0/24", ["100", "200", "400"])])
+		with open(events_file) as file:
+			self.assertEqual([json.loads(line)["time"] for line in file], [10, 420])
+		self.assertEqual(sorted(os.listdir(folder)), ["events.jsonl", "summary.txt"])
+
+class TimedMOASDetectorTest(unittest.TestCase):
+	def rows(self, elems, end):
+		detector = TimedMOASDetector()
+		detector.process(elems)
+		detector.finish(end)
+		return {row[1]: row for row in detector.timing_rows()}
+
+	def test_flaps_before_the_first_conflict_are_kept(self):
+		rows = self.rows([
+			announce(0, "192.0.2.0/24", 100),
+			withdraw(100, "192.0.2.0/24"),
+			announce(150, "192.0.2.0/24", 100),
+			announce(200, "192.0.2.0/24", 200),
+		], 300)
+		# prefix, origin, first, last, announcements, up_seconds, moas_first, moas_seconds, withdrawals
+		self.assertEqual(rows["100"], ("192.0.2.0/24", "100", 0, 150, 2, 250, 200, 100, 1))
+		self.assertEqual(rows["200"], ("192.0.2.0/24", "200", 200, 200, 1, 100, 200, 100, 1))
+
+	def test_single_origin_down_at_the_conflict(self):
+		rows = self.rows([
+			announce(0, "192.0.2.0/24", 100),
+			withdraw(50, "192.0.2.0/24"),
+			announce(200, "192.0.2.0/24", 200),
+			withdraw(250, "192.0.2.0/24"),
+			announce(260, "192.0.2.0/24", 100),
+		], 300)
+		self.assertEqual(rows["100"], ("192.0.2.0/24", "100", 0, 260, 2, 90, None, 0, 2))
+		self.assertEqual(rows["200"], ("192.0.2.0/24", "200", 200, 200, 1, 50, None, 0, 2))
+
+	def test_moas_seconds(self):
+		rows = self.rows([
+			announce(10, "2001:db8::/32", 100),
+			announce(20, "2001:db8::/32", 200),
+			withdraw(80, "2001:db8::/32"),
+			announce(90, "2001:db8::/32", 200),
+			announce(100, "2001:db8::/32", 100),
+		], 120)
+		self.assertEqual(rows["100"][5:], (90, 20, 80, 1))
+		self.assertEqual(rows["200"][5:], (90, 20, 80, 1))
+
+if __name__ == "__main__":
+	unittest.main()
@@ -0,0 +1,62 @@
+import contextlib
+import io
+import json
+import os
+import tempfile
+import unittest
+from types import SimpleNamespace
+
+from monitor import CLASSES_NAME, WindowMonitor
+
+HOUR = 3600
+
+def announce(time, prefix, origin):
+	return SimpleNamespace(type="A", time=time, fields={"prefix": prefix, "as-path": f"64500 {origin}"}, peer_address="192.0.2.1")
+
+def moas(time, prefix="192.0.2.0/24"):
+	return [announce(time, prefix, 100), announce(time + 1, prefix, 200)]
+
+class WindowMonitorTest(unittest.TestCase):
+	def setUp(self):
+		self.data = tempfile.mkdtemp()
+
+	def monitor(self, horizon=2):
+		return WindowMonitor("route-views2", HOUR, self.data, os.path.join(self.data, "index.json"), horizon)
+
+	def run_monitor(self, monitor, elems, start=None, until=None):
+		with contextlib.redirect_stdout(io.StringIO()):
+			monitor.process(elems, start, until)
+
+	def summaries(self):
+		return sorted(name for name in os.listdir(self.data) if name.startswith("summary_"))
+
+	def test_window_the_stream_ends_in_is_not_written(self):
+		monitor = self.monitor()
+		self.run_monitor(monitor, moas(10) + moas(HOUR + 10), start=0, until=HOUR + 1800)
+		self.assertEqual(self.summaries(), ["summary_route-views2_19700101_0000.txt"])
+		self.assertEqual((monitor.windows, monitor.skipped), (1, 1))
+		with open(os.path.join(self.data, "manifest.jsonl")) as file:
+			records = [json.loads(line) for line in file]
+		self.assertEqual([(record["start_time"], record["end_time"], record["status"]) for record in records], [("1970-01-01 00:00:00", "1970-01-01 01:00:00", "done")])
+
+	def test_until_at_the_window_end_completes_it(self):
+		monitor = self.monitor()
+		self.run_monitor(monitor, moas(10), start=0, until=HOUR)
+		self.assertEqual(monitor.windows, 1)
+
+	def test_start_inside_a_window_skips_it(self):
+		monitor = self.monitor()
+		self.run_monitor(monitor, moas(1800) + moas(HOUR + 10) + moas(2 * HOUR + 10), start=1800)
+		self.assertEqual(self.summaries(), ["summary_route-views2_19700101_0100.txt"])
+
+	def test_waiting_prefixes_survive_a_restart(self):
+		self.run_monitor(self.monitor(), moas(10) + moas(HOUR + 10, "198.51.100.0/24"), start=0, until=2 * HOUR)
+		restarted = self.monitor()
+		self.assertEqual(restarted.waiting, {"192.0.2.0/24": 0, "198.51.100.0/24": HOUR})
+		self.run_monitor(restarted, moas(2 * HOUR + 10, "198.51.100.0/24") + moas(3 * HOUR + 10, "203.0.113.0/24"), start=2 * HOUR)
+		with open(os.path.join(self.data, CLASSES_NAME)) as file:
+			decisions = {(decision["class"], decision["prefix"]) for decision in map(json.loads, file)}
+		self.assertEqual(decisions, {("short-lived", "192.0.2.0/24"), ("persistent", "198.51.100.0/24")})
+
+if __name__ == "__main__":
+	unittest.main()
@@ -0,0 +1,100 @@
+import os
+import tempfile
+import unittest
+
+from benchmark import write_dumps
+from main import stream_filter
+from mrtreader import MRTStream, list_dumps, merge_decoded, parse_filter
+
+def stream_tuples(stream):
+	return [(elem.time, elem.type, elem.fields["prefix"], elem.fields.get("as-path"), elem.peer_asn, elem.peer_address) for elem in stream]
+
+class MergeDecodedTest(unittest.TestCase):
+	def test_merges_overlapping_files_in_time_order(self):
+		files = [[(1, "a"), (5, "a"), (9, "a")], [(2, "b"), (5, "b"), (10, "b")], [], [(4, "c")], [(20, "d")]]
+		merged = list(merge_decoded(files))
+		self.assertEqual([elem[0] for elem in merged], [1, 2, 4, 5, 5, 9, 10, 20])
+		self.assertEqual(merged[3:5], [(5, "a"), (5, "b")])  # Ties keep the file order
+
+	def test_empty(self):
+		self.assertEqual(list(merge_decoded([])), [])
+		self.assertEqual(list(merge_decoded([[], []])), [])
+
+class MRTStreamTest(unittest.TestCase):
+	@classmethod
+	def setUpClass(cls):
+		cls.folder = tempfile.mkdtemp()
+		cls.elems = write_dumps(cls.folder, "route-views2", 3000, 4, 500, seed=7)
+
+	def test_round_trip(self):
+		dumps = list_dumps(self.folder, "route-views2")
+		self.assertEqual(len(dumps), 4)
+		self.assertEqual(stream_tuples(MRTStream(dumps, bgp_filter="type updates")), self.elems)
+
+	def test_parallel_decoding_matches_serial(self):
+		dumps = list_dumps(self.folder, "route-views2")
+		self.assertEqual(stream_tuples(MRTStream(dumps, workers=3)), stream_tuples(MRTStream(dumps)))
+
+	def test_filter_and_time_window(self):
+		dumps = list_dumps(self.folder, "route-views2")
+		start = self.elems[0][0]
+		stream = MRTStream(dumps, int(start) + 600, int(start) + 1200, bgp_filter="elemtype announcements and ipversion 6")
+		expected = [
+			elem for elem in self.elems
+			if elem[1] == "A" and ":" in elem[2] and int(start) + 600 <= elem[0] <= int(start) + 1200
+		]
+		self.assertTrue(expected)
+		self.assertEqual(stream_tuples(stream), expected)
+
+	def test_peer_and_prefix_terms(self):
+		dumps = list_dumps(self.folder, "route-views2")
+		stream = MRTStream(dumps, bgp_filter=stream_filter(prefixes=["0.1.0.0/16"], peers=[64501, 64502]))
+		expected = [
+			elem for elem in self.elems
+			if elem[1] == "A" and elem[2].startswith("0.1.") and elem[4] in (64501, 64502)
+		]
+		self.assertTrue(expected)
+		self.assertEqual(stream_tuples(stream), expected)
+
+	def test_withdrawals_only_with_timing(self):
+		dumps = list_dumps(self.folder, "route-views2")
+		announcements = stream_tuples(MRTStream(dumps, bgp_filter=stream_filter()))
+		self.assertEqual(announcements, [elem for elem in self.elems if elem[1] == "A"])
+		self.assertEqual(stream_tuples(MRTStream(dumps, bgp_filter=stream_filter(withdrawals=True))), self.elems)
+
+	def test_list_dumps_window(self):
+		# Files up to DUMP_SPAN (1h) before from_time are kept, since their names only carry the start time
+		dumps = list_dumps(self.folder, "route-views2", from_time=1704067200 + 3600 + 900, until_time=1704067200 + 1800)
+		self.assertEqual([os.path.basename(path) for path in dumps], ["updates.20240101.0015.bz2", "updates.20240101.0030.gz"])
+
+class StreamFilterTest(unittest.TestCase):
+	def test_announcements_only_unless_timing(self):
+		self.assertEqual(stream_filter(), "type updates and elemtype announcements")
+		self.assertEqual(parse_filter(stream_filter()).elem_types, {"announcements"})
+		self.assertEqual(parse_filter(stream_filter(withdrawals=True)).elem_types, {"announcements", "withdrawals"})
+
+	def test_narrowing_terms(self):
+		bgp_filter = stream_filter(ipversion="6", prefixes=["2001:db8::/32", "10.0.0.0/8"], peers=[64500, 64501])
+		self.assertEqual(
+			bgp_filter,
+			"type updates and elemtype announcements and ipversion 6 and prefix more 2001:db8::/32 and prefix more 10.0.0.0/8"
+			" and peer 64500 and peer 64501",
+		)
+		parsed = parse_filter(bgp_filter)
+		self.assertEqual(parsed.ipversion, "6")
+		self.assertEqual([(match, str(network)) for match, network in parsed.prefixes], [("more", "2001:db8::/32"), ("more", "10.0.0.0/8")])
+		self.assertEqual(parsed.peers, {64500, 64501})
+
+	def test_no_filter_reads_everything(self):
+		self.assertEqual(parse_filter(None).elem_types, {"announcements", "withdrawals"})
+		self.assertEqual(parse_filter("type updates and collector route-views2").elem_types, {"announcements", "withdrawals"})
+
+	def test_unsupported_terms(self):
+		for bgp_filter in ("community 65000:1", "elemtype ribs", "ipversion 5", "peer rrc00", "prefix 10.0.0.0/8", "prefix more not-a-prefix"):
+			with self.subTest(bgp_filter=bgp_filter), self.assertRaises(ValueError):
+				parse_filter(bgp_filter)
+		with self.assertRaises(ValueError):
+			MRTStream([], bgp_filter="type updates and aspath _3356_")  # Fails before any decoding
+
+if __name__ == "__main__":
+	unittest.main()
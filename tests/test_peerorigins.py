@@ -0,0 +1,70 @@
+import os
+import random
+import tempfile
+import unittest
+from datetime import datetime
+from types import SimpleNamespace
+
+import main
+from durationcounter import write_logs
+from lifetimeindex import LifetimeIndex
+from moasdetector import MOASDetector, TimedMOASDetector
+from peerorigins import PeerOrigins
+from summaryparser import iter_event_log
+
+def random_stream(updates, seed):
+	"""Announcements of a few prefixes by a few origins, each from one of twenty peers."""
+	rng = random.Random(seed)
+	for time in range(updates):
+		prefix = f"192.0.2.{rng.randrange(40)}/32"
+		yield SimpleNamespace(
+			type="A", time=time, peer_address=f"198.51.100.{rng.randrange(20)}",
+			fields={"prefix": prefix, "as-path": f"64500 {64510 + rng.randrange(3)}"},
+		)
+
+class PeerOriginsTest(unittest.TestCase):
+	def test_masks_follow_the_origin_state(self):
+		peers = PeerOrigins()
+		peers.see("192.0.2.0/24", None, "100", "a")
+		peers.see("192.0.2.0/24", "100", "100", "b")
+		self.assertEqual(peers.masks["192.0.2.0/24"], 0b11)  # Single origin: one plain mask
+		self.assertEqual(peers.counts("192.0.2.0/24", ["100"]), [0])  # Not MOAS yet
+		peers.see("192.0.2.0/24", "100", "200", "a")
+		peers.see("192.0.2.0/24", {"100", "200"}, "300", "c")
+		peers.see("192.0.2.0/24", {"100", "200", "300"}, "200", "b")
+		self.assertEqual(peers.counts("192.0.2.0/24", ["300", "100", "200"]), [1, 2, 2])
+		self.assertEqual(peers.counts("198.51.100.0/24", ["100", "200"]), [0, 0])
+		self.assertEqual(peers.state_sizes(), {"peers": 3, "peer_masks": 1})
+
+	def test_detectors_match_a_count_of_distinct_peers(self):
+		expected = {}
+		for elem in random_stream(3000, seed=5):
+			origin = elem.fields["as-path"].split()[-1]
+			expected.setdefault(elem.fields["prefix"], {}).setdefault(origin, set()).add(elem.peer_address)
+
+		for detector in (MOASDetector(peers=True), TimedMOASDetector(peers=True)):
+			detector.process(random_stream(3000, seed=5))
+			peer_counts = detector.peer_counts()
+			self.assertEqual(set(peer_counts), {prefix for prefix, origins in expected.items() if len(origins) > 1})
+			for prefix, origins in detector.moas_events().items():
+				self.assertEqual(peer_counts[prefix], [len(expected[prefix][origin]) for origin in origins])
+			self.assertEqual(detector.state_sizes()["peers"], 20)
+
+class PeerCountsLogTest(unittest.TestCase):
+	def test_most_peers_per_origin_reach_the_event_logs(self):
+		folder = tempfile.mkdtemp()
+		events = {"192.0.2.0/24": ["100", "200"]}
+		for name, peer_counts in (("summary_route-views2_20240101_0000.txt", [5, 1]), ("summary_route-views2_20240101_0200.txt", [3, 2])):
+			main.write_summary(os.path.join(folder, name), "route-views2", datetime(2024, 1, 1), datetime(2024, 1, 1, 2), 10, 1, events,
+				peer_counts={"192.0.2.0/24": peer_counts}, peers=6)
+		index = LifetimeIndex(os.path.join(folder, "index.json"))
+		index.update(folder)
+		self.assertEqual(index.prefixes["192.0.2.0/24"][4], {"100": 5, "200": 2})
+
+		one_session, multi_session = os.path.join(folder, "one_session.txt"), os.path.join(folder, "multi_session.txt")
+		write_logs(index.prefix_data(), one_session, multi_session)
+		[event] = iter_event_log(multi_session)
+		self.assertEqual((event["origin_asns"], event["peer_counts"]), (["100", "200"], ["5", "2"]))
+
+if __name__ == "__main__":
+	unittest.main()
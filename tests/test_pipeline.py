@@ -0,0 +1,91 @@
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+
+import pipeline
+import sus_asn_detection
+from ripestat import set_client
+from tests.ripestat_stub import RipeStatStub
+
+# Stub stage: copies its input to its output, or exits 1 when the fail file exists
+STAGE_SCRIPT = """import os, shutil, sys
+source, target, fail = sys.argv[1:]
+shutil.copy(source, target)
+sys.exit(1 if os.path.exists(fail) else 0)
+"""
+
+class PipelineTest(unittest.TestCase):
+	def setUp(self):
+		self.folder = tempfile.mkdtemp()
+		self.script = self.path("stage.py")
+		with open(self.script, "w") as file:
+			file.write(STAGE_SCRIPT)
+		self.write("a.txt", "1")
+		self.stages = [
+			pipeline.Stage("b", [self.script, self.path("a.txt"), self.path("b.txt"), self.path("fail_b")], [self.path("a.txt")], [self.path("b.txt")]),
+			pipeline.Stage("c", [self.script, self.path("b.txt"), self.path("c.txt"), self.path("fail_c")], [self.path("b.txt")], [self.path("c.txt")]),
+		]
+
+	def path(self, name):
+		return os.path.join(self.folder, name)
+
+	def write(self, name, content):
+		with open(self.path(name), "w") as file:
+			file.write(content)
+
+	def run_pipeline(self, **options):
+		with contextlib.redirect_stdout(io.StringIO()):
+			return pipeline.run_pipeline(self.stages, state_path=self.path("state.json"), log_folder=self.path("logs"), **options)
+
+	def test_stale_reason(self):
+		stage = self.stages[0]
+		inputs = pipeline.fingerprint(stage.inputs)
+		self.assertEqual(pipeline.stale_reason(stage, None, inputs), "never run")
+		self.run_pipeline()
+		record = pipeline.load_state(self.path("state.json"))["b"]
+		self.assertIsNone(pipeline.stale_reason(stage, record, inputs))
+		self.assertEqual(pipeline.stale_reason(stage, record, inputs, force=True), "forced")
+		self.assertEqual(pipeline.stale_reason(stage._replace(command=stage.command + ["x"]), record, inputs), "command changed")
+		os.remove(self.path("b.txt"))
+		self.assertEqual(pipeline.stale_reason(stage, record, inputs), "outputs missing")
+		self.write("a.txt", "2")
+		self.assertEqual(pipeline.stale_reason(stage, record, pipeline.fingerprint(stage.inputs)), "inputs changed (1 files)")
+
+	def test_only_stale_stages_rerun(self):
+		self.assertEqual(self.run_pipeline(), {"b": "done", "c": "done"})
+		self.assertEqual(self.run_pipeline(), {"b": "up to date", "c": "up to date"})
+		self.write("a.txt", "2")
+		self.assertEqual(self.run_pipeline(dry_run=True), {"b": "would run", "c": "would run"})
+		self.assertEqual(self.run_pipeline(), {"b": "done", "c": "done"})
+		with open(self.path("c.txt")) as file:
+			self.assertEqual(file.read(), "2")
+
+	def test_failed_stage_is_retried(self):
+		self.run_pipeline()
+		self.write("a.txt", "2")
+		self.write("fail_b", "")
+		# b writes its output but exits 1, like an enrichment run with failed ASNs
+		self.assertEqual(self.run_pipeline(), {"b": "failed", "c": "skipped"})
+		self.assertEqual(self.run_pipeline(), {"b": "failed", "c": "skipped"})
+		os.remove(self.path("fail_b"))
+		self.assertEqual(self.run_pipeline(), {"b": "done", "c": "done"})
+
+class EnrichExitTest(unittest.TestCase):
+	def test_failed_asns_exit_non_zero(self):
+		folder = tempfile.mkdtemp()
+		one_session = os.path.join(folder, "one_session_2024.txt")
+		with open(one_session, "w") as file:
+			file.write("Prefix: 192.0.2.0/24\nSeen In: summary_route-views2_20240101_0000.txt\nOrigin ASNs: 64500, 64501\n\n")
+		output = os.path.join(folder, "results.jsonl")
+		with RipeStatStub() as stub, contextlib.redirect_stdout(io.StringIO()):
+			stub.default = (503, {}, {})
+			self.addCleanup(set_client, None)
+			with self.assertRaises(SystemExit) as raised:
+				sus_asn_detection.main(["--input", one_session, "--output", output, "--base-url", stub.base_url, "--retries", "0", "--no-cache"])
+		self.assertEqual(raised.exception.code, 1)
+		self.assertEqual(os.path.getsize(output), 0)
+
+if __name__ == "__main__":
+	unittest.main()
@@ -0,0 +1,72 @@
+import os
+import tempfile
+import unittest
+
+from responsecache import DAY, ResponseCache, endpoint_name, normalize_url
+
+RIR = "/data/rir/data.json?resource=64500&lod=2"
+WHOIS = "/data/whois/data.json?resource=64500"
+PREFIXES = "/data/announced-prefixes/data.json?resource=64500"
+
+class ResponseCacheTest(unittest.TestCase):
+	def cache(self, **options):
+		cache = ResponseCache(os.path.join(tempfile.mkdtemp(), "cache.sqlite"), **options)
+		self.addCleanup(cache.close)
+		return cache
+
+	def age(self, cache, url, seconds):
+		cache.connection.execute("UPDATE responses SET fetched_at = fetched_at - ? WHERE key = ?", (seconds, cache.key(url)))
+
+	def test_equivalent_urls_share_an_entry(self):
+		self.assertEqual(normalize_url(RIR), normalize_url("/data/rir/data.json?lod=2&resource=64500"))
+		self.assertEqual(endpoint_name(RIR), "rir")
+		cache = self.cache()
+		cache.put(RIR, {"data": 1})
+		self.assertEqual(cache.get("/data/rir/data.json?lod=2&resource=64500"), {"data": 1})
+		self.assertIsNone(cache.get("/data/rir/data.json?lod=1&resource=64500"))
+		self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+	def test_ttl_per_endpoint(self):
+		cache = self.cache(ttls={"whois": 2 * DAY})
+		for url in (RIR, WHOIS, PREFIXES):
+			cache.put(url, {"url": url})
+			self.age(cache, url, 3 * DAY)
+		self.assertEqual(cache.get(RIR), {"url": RIR})  # 30 days
+		self.assertIsNone(cache.get(WHOIS))             # Overridden to 2 days
+		self.assertIsNone(cache.get(PREFIXES))          # 1 day
+		self.assertEqual(cache.stats()["expired"], 2)
+
+		cache.put(PREFIXES, {"fresh": True})  # A refetch replaces the expired entry
+		self.assertEqual(cache.get(PREFIXES), {"fresh": True})
+
+	def test_evicts_least_recently_used(self):
+		urls = [f"/data/whois/data.json?resource={asn}" for asn in range(64500, 64504)]
+		cache = self.cache()
+		cache.put(urls[0], {"payload": "x" * 10})
+		entry_size = cache.total_bytes
+		cache.max_bytes = 3 * entry_size
+		for url in urls[1:3]:
+			cache.put(url, {"payload": "x" * 10})
+		for accessed_at, url in zip((10, 1, 2), urls):  # urls[0] was read last
+			cache.connection.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (accessed_at, cache.key(url)))
+
+		cache.put(urls[3], {"payload": "x" * 10})
+		self.assertEqual(cache.evicted, 1)
+		self.assertIsNone(cache.get(urls[1]))
+		self.assertIsNotNone(cache.get(urls[0]))
+		self.assertLessEqual(cache.total_bytes, cache.max_bytes)
+
+	def test_survives_a_reopen(self):
+		path = os.path.join(tempfile.mkdtemp(), "cache.sqlite")
+		cache = ResponseCache(path)
+		cache.put(RIR, {"data": 1})
+		cache.put(RIR, {"data": 2})  # Replacing an entry does not count it twice
+		size = cache.total_bytes
+		cache.close()
+		cache = ResponseCache(path)
+		self.addCleanup(cache.close)
+		self.assertEqual(cache.total_bytes, size)
+		self.assertEqual(cache.get(RIR), {"data": 2})
+
+if __name__ == "__main__":
+	unittest.main()
@@ -0,0 +1,138 @@
+import os
+import tempfile
+import time
+import unittest
+
+import sus_asn_detection
+from responsecache import ResponseCache
+from ripestat import CircuitBreaker, RipeStatClient, RipeStatError, RipeStatUnavailable, TokenBucket, set_client
+from tests.ripestat_stub import RipeStatStub
+
+PATH = "/data/rir/data.json?data_overload_limit=ignore&resource=64500&lod=2"
+OK = (200, {"data": {"rirs": [{"rir": "RIPE NCC"}]}})
+
+class RipeStatClientTest(unittest.TestCase):
+	def setUp(self):
+		self.stub = RipeStatStub().__enter__()
+		self.addCleanup(self.stub.__exit__)
+
+	def client(self, **options):
+		options = dict({"rate": 1000, "backoff": 0, "retries": 3}, **options)
+		client = RipeStatClient(self.stub.base_url, **options)
+		self.addCleanup(client.close)
+		return client
+
+	def test_retries_server_errors(self):
+		self.stub.script(PATH, (503, {}), (502, {}), OK)
+		self.assertEqual(self.client().get_json(PATH), OK[1])
+		self.assertEqual(self.stub.count(PATH), 3)
+
+	def test_gives_up_after_the_retries(self):
+		self.stub.script(PATH, (500, {}))
+		with self.assertRaises(RipeStatUnavailable):
+			self.client(retries=2).get_json(PATH)
+		self.assertEqual(self.stub.count(PATH), 3)
+
+	def test_client_errors_are_not_retried(self):
+		self.stub.script(PATH, (400, {}))
+		with self.assertRaises(RipeStatError) as raised:
+			self.client().get_json(PATH)
+		self.assertNotIsInstance(raised.exception, RipeStatUnavailable)
+		self.assertEqual(self.stub.count(PATH), 1)
+
+	def test_throttle_honours_retry_after(self):
+		self.stub.script(PATH, (429, {}, {"Retry-After": "0.3"}), OK)
+		client = self.client(rate=10)
+		start = time.monotonic()
+		self.assertEqual(client.get_json(PATH), OK[1])
+		self.assertGreaterEqual(time.monotonic() - start, 0.3)
+		self.assertLess(client.bucket.rate, 10)
+
+	def test_connection_errors_are_unavailable(self):
+		client = RipeStatClient("http://127.0.0.1:9", rate=1000, backoff=0, retries=1)
+		self.addCleanup(client.close)
+		with self.assertRaises(RipeStatUnavailable):
+			client.get_json(PATH)
+
+	def test_breaker_opens_and_half_opens(self):
+		self.stub.script(PATH, (503, {}), (503, {}), OK)
+		client = self.client(retries=0)
+		client.breaker = CircuitBreaker(threshold=2, cooldown=0.2)
+		for _ in range(2):
+			with self.assertRaises(RipeStatUnavailable):
+				client.get_json(PATH)
+		with self.assertRaisesRegex(RipeStatUnavailable, "circuit open"):
+			client.get_json(PATH)
+		self.assertEqual(self.stub.count(PATH), 2)  # Failed fast, no request
+		time.sleep(0.25)
+		self.assertEqual(client.get_json(PATH), OK[1])  # Trial request closes the circuit
+		self.assertIsNone(client.breaker.opened_at)
+
+	def test_cache_serves_until_the_ttl(self):
+		self.stub.script(PATH, OK)
+		folder = tempfile.mkdtemp()
+		cache = ResponseCache(os.path.join(folder, "cache.sqlite"))
+		client = self.client(cache=cache)
+		client.get_json(PATH)
+		client.get_json(PATH)
+		self.assertEqual(self.stub.count(PATH), 1)
+		self.assertEqual(cache.hits, 1)
+
+		# rir responses live 30 days
+		cache.connection.execute("UPDATE responses SET fetched_at = fetched_at - 31 * 24 * 60 * 60")
+		client.get_json(PATH)
+		self.assertEqual(self.stub.count(PATH), 2)
+		self.assertEqual(cache.expired, 1)
+
+	def test_fetch_functions_use_the_shared_client(self):
+		path = sus_asn_detection.URL_PREFIX_FROM_AS.format(asn=64500)
+		self.stub.script(path, (503, {}), (200, {"data": {"prefixes": [{"prefix": "192.0.2.0/24"}, {"prefix": "2001:db8::/32"}]}}))
+		set_client(self.client())
+		self.addCleanup(set_client, None)
+		self.assertEqual(sus_asn_detection.fetch_prefixes_from_asn(64500), ["192.0.2.0/24", "2001:db8::/32"])
+
+	def test_client_errors_get_the_default_score(self):
+		self.stub.script(sus_asn_detection.URL_AS_OVERVIEW.format(asn=64500), (404, {}))
+		self.stub.script(sus_asn_detection.URL_AS_OVERVIEW.format(asn=64501), (200, {"data": {"status": "inactive", "rpki_status": "invalid"}}))
+		set_client(self.client())
+		self.addCleanup(set_client, None)
+		self.assertEqual(sus_asn_detection.check_asn_properties(64500), {"asn": 64500, "valid": False, "status": "unavailable", "score": 3})
+		asn_scores, prefix_results = sus_asn_detection.analyze_moas_events([{"prefix": "192.0.2.0/24", "origin_asns": [64500, 64501]}])
+		self.assertEqual(dict(asn_scores), {64500: [3], 64501: [5]})
+		self.assertEqual(prefix_results[0]["total_suspicion"], 8)
+
+class CircuitBreakerTest(unittest.TestCase):
+	def test_single_trial_while_half_open(self):
+		breaker = CircuitBreaker(threshold=1, cooldown=0.05)
+		breaker.record_failure()
+		self.assertFalse(breaker.allow())
+		time.sleep(0.06)
+		self.assertTrue(breaker.allow())
+		self.assertFalse(breaker.allow())  # Only one trial at a time
+		breaker.record_failure()  # Failed trial reopens for another cooldown
+		self.assertFalse(breaker.allow())
+		time.sleep(0.06)
+		self.assertTrue(breaker.allow())
+		breaker.record_success()
+		self.assertTrue(breaker.allow())
+		self.assertTrue(breaker.allow())
+
+class TokenBucketTest(unittest.TestCase):
+	def test_paces_after_the_burst(self):
+		bucket = TokenBucket(rate=20, burst=1)
+		start = time.monotonic()
+		for _ in range(3):
+			bucket.acquire()
+		self.assertGreaterEqual(time.monotonic() - start, 0.09)
+
+	def test_throttle_halves_once_per_second_and_recovers(self):
+		bucket = TokenBucket(rate=8)
+		bucket.throttled()
+		bucket.throttled()
+		self.assertEqual(bucket.rate, 4)
+		for _ in range(100):
+			bucket.succeeded()
+		self.assertEqual(bucket.rate, 8)
+
+if __name__ == "__main__":
+	unittest.main()
@@ -0,0 +1,82 @@
+import ipaddress
+import json
+import os
+import random
+import tempfile
+import unittest
+
+from rpkivalidator import RpkiValidator, iter_vrps
+
+class RpkiValidatorTest(unittest.TestCase):
+	def setUp(self):
+		self.validator = RpkiValidator([
+			("192.0.2.0/24", 24, 64500),
+			("198.51.100.0/22", 24, 64501),
+			("203.0.113.0/24", 24, 0),
+			("2001:db8::/32", 48, 64502),
+		])
+
+	def test_states(self):
+		validate = self.validator.validate
+		self.assertEqual(validate("192.0.2.0/24", 64500), "valid")
+		self.assertEqual(validate("198.51.101.0/24", "AS64501"), "valid")
+		self.assertEqual(validate("198.51.100.0/25", 64501), "invalid_length")
+		self.assertEqual(validate("192.0.2.0/24", 64999), "invalid_asn")
+		self.assertEqual(validate("203.0.113.0/24", 0), "invalid_asn")  # AS0 ROAs never validate
+		self.assertEqual(validate("2001:db8:1::/48", 64502), "valid")
+		self.assertEqual(validate("2001:db8:1::/49", 64502), "invalid_length")
+		self.assertEqual(validate("10.0.0.0/8", 64500), "unknown")
+		self.assertEqual(validate("2001:db9::/32", 64502), "unknown")
+		self.assertEqual(validate("bogus", 64500), "unknown")
+
+	def test_validate_prefixes(self):
+		self.assertEqual(
+			self.validator.validate_prefixes(64500, ["192.0.2.0/24", "10.0.0.0/8"]),
+			[{"prefix": "192.0.2.0/24", "status": "valid"}, {"prefix": "10.0.0.0/8", "status": "unknown"}],
+		)
+
+	def test_added_vrps_are_used(self):
+		self.assertEqual(self.validator.validate("10.1.0.0/16", 64503), "unknown")
+		self.validator.add("10.0.0.0/8", 16, 64503)
+		self.assertEqual(self.validator.validate("10.1.0.0/16", 64503), "valid")
+		self.assertEqual(self.validator.validate("10.1.0.0/16", 64504), "invalid_asn")
+
+	def test_matches_a_linear_scan(self):
+		rng = random.Random(3)
+		def network(min_length, max_length):
+			return ipaddress.ip_network((rng.getrandbits(12) << 20, rng.randint(min_length, max_length)), strict=False)
+		vrps = [(network(8, 20), rng.randrange(4)) for _ in range(300)]
+		vrps = [(str(prefix), min(24, prefix.prefixlen + rng.choice((0, 2, 4))), asn) for prefix, asn in vrps]
+		validator = RpkiValidator(vrps)
+		networks = [(ipaddress.ip_network(prefix), max_length, asn) for prefix, max_length, asn in vrps]
+
+		def expected(route, origin):
+			covering = [(asn, max_length) for prefix, max_length, asn in networks if route.subnet_of(prefix)]
+			if not covering:
+				return "unknown"
+			if any(asn == origin and asn != 0 and route.prefixlen <= max_length for asn, max_length in covering):
+				return "valid"
+			return "invalid_length" if any(asn == origin and asn != 0 for asn, _ in covering) else "invalid_asn"
+
+		statuses = set()
+		for _ in range(1000):
+			route, origin = network(8, 26), rng.randrange(4)
+			status = validator.validate(str(route), origin)
+			self.assertEqual(status, expected(route, origin), (str(route), origin))
+			statuses.add(status)
+		self.assertEqual(statuses, {"valid", "invalid_asn", "invalid_length", "unknown"})
+
+	def test_vrp_files(self):
+		folder = tempfile.mkdtemp()
+		csv_path = os.path.join(folder, "vrps.csv")
+		with open(csv_path, "w") as file:
+			file.write("ASN,IP Prefix,Max Length,Trust Anchor\nAS64500,192.0.2.0/24,24,ripe\nAS64501,198.51.100.0/22,,arin\n")
+		json_path = os.path.join(folder, "vrps.json")
+		with open(json_path, "w") as file:
+			json.dump({"roas": [{"asn": "AS64500", "prefix": "192.0.2.0/24", "maxLength": 24}, {"asn": 64501, "prefix": "198.51.100.0/22"}]}, file)
+		expected = [("192.0.2.0/24", 24, 64500), ("198.51.100.0/22", 22, 64501)]
+		self.assertEqual(list(iter_vrps(csv_path)), expected)
+		self.assertEqual(list(iter_vrps(json_path)), expected)
+
+if __name__ == "__main__":
+	unittest.main()
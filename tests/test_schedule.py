@@ -0,0 +1,36 @@
+import contextlib
+import io
+import os
+import unittest
+from collections import Counter
+
+import main
+from schedule import build_schedule, load_config
+
+EXAMPLE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "schedule_example.json")
+
+class ScheduleTest(unittest.TestCase):
+	def test_default_is_the_first_week_grid(self):
+		self.assertEqual(build_schedule(load_config()), sorted(main.generate_intervals()))
+
+	def test_budgets(self):
+		config = load_config(strategy="stratified", budget={"2023": 30, "2024": 13}, years=[2023, 2024])
+		intervals = build_schedule(config)
+		self.assertEqual(Counter(start.year for start, _ in intervals), {2023: 30, 2024: 13})
+		self.assertEqual(build_schedule(config), intervals)  # Seeded
+
+	def test_every_year_needs_a_budget(self):
+		with self.assertRaisesRegex(ValueError, "2023"):
+			load_config(strategy="stratified", budget={"2024": 10}, years=[2023, 2024])
+		with self.assertRaisesRegex(ValueError, "budget"):
+			load_config(strategy="random")
+		with self.assertRaisesRegex(ValueError, "2023"):
+			load_config(EXAMPLE, years=[2023])
+
+	def test_main_reports_a_missing_budget(self):
+		with contextlib.redirect_stderr(io.StringIO()) as errors, self.assertRaises(SystemExit):
+			main.main(["0", "--schedule", EXAMPLE, "--years", "2023"])
+		self.assertIn("--schedule: The stratified strategy needs a budget", errors.getvalue())
+
+if __name__ == "__main__":
+	unittest.main()
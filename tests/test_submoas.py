@@ -0,0 +1,69 @@
+import ipaddress
+import random
+import unittest
+
+from submoas import SubMOASTracker
+
+class SubMOASTrackerTest(unittest.TestCase):
+	def test_sub_conflict(self):
+		tracker = SubMOASTracker()
+		self.assertEqual(tracker.add("10.0.0.0/8", 1), 0)
+		self.assertEqual(tracker.add("10.1.0.0/16", 2), 1)
+		self.assertEqual(tracker.add("10.1.0.0/16", 2), 0)  # Repeated announcement
+		self.assertEqual(tracker.add("10.2.0.0/16", 1), 0)  # Same origin as the covering prefix
+		self.assertEqual(list(tracker.records()), [("10.1.0.0/16", ["2"], "10.0.0.0/8", ["1"], "sub")])
+
+	def test_super_conflict(self):
+		tracker = SubMOASTracker()
+		tracker.add("192.168.1.0/24", 5)
+		tracker.add("192.168.2.0/24", 6)
+		self.assertEqual(tracker.add("192.168.0.0/16", 6), 1)
+		self.assertEqual(list(tracker.records()), [("192.168.1.0/24", ["5"], "192.168.0.0/16", ["6"], "super")])
+
+	def test_every_covering_prefix(self):
+		tracker = SubMOASTracker()
+		tracker.add("2001:db8::/32", 1)
+		tracker.add("2001:db8::/40", 2)
+		tracker.add("2001:db8::/48", 3)
+		self.assertEqual(len(tracker), 3)
+		self.assertEqual(
+			sorted((record[0], record[2]) for record in tracker.records()),
+			[("2001:db8::/40", "2001:db8::/32"), ("2001:db8::/48", "2001:db8::/32"), ("2001:db8::/48", "2001:db8::/40")],
+		)
+
+	def test_versions_do_not_mix_and_bad_prefixes_are_ignored(self):
+		tracker = SubMOASTracker()
+		tracker.add("0.0.0.0/0", 1)
+		self.assertEqual(tracker.add("::/1", 2), 0)
+		self.assertEqual(tracker.add("not a prefix", 2), 0)
+		self.assertEqual(len(tracker), 0)
+
+	def test_matches_a_pairwise_check(self):
+		rng = random.Random(5)
+		pairs = []
+		for _ in range(600):
+			length = rng.choice([0, 6, 8, 12, 15, 16, 17, 20, 24, 25, 32])
+			network = ipaddress.ip_network((rng.getrandbits(8) << 24 | rng.getrandbits(2) << 22, length), strict=False)
+			pairs.append((str(network), rng.randrange(3)))
+		pairs += [("2001:db8::/32", 1), ("2001:db8:1::/48", 2), ("2001:db0::/28", 2), ("2001:db8:1::/48", 1)]
+		tracker = SubMOASTracker()
+		origins = {}
+		networks = {}
+		expected = set()
+		for prefix, origin in pairs:
+			tracker.add(prefix, origin)
+			network = networks.setdefault(prefix, ipaddress.ip_network(prefix))
+			is_new = prefix not in origins
+			origins.setdefault(prefix, set()).add(origin)
+			for other, other_network in networks.items():
+				if other == prefix or other_network.version != network.version:
+					continue
+				if network.subnet_of(other_network) and origin not in origins[other]:
+					expected.add((prefix, other))
+				if is_new and other_network.subnet_of(network) and origins[other] - {origin}:
+					expected.add((other, prefix))
+		self.assertEqual({(record[0], record[2]) for record in tracker.records()}, expected)
+		self.assertGreater(len(expected), 100)
+
+if __name__ == "__main__":
+	unittest.main()
@@ -0,0 +1,73 @@
+import calendar
+import os
+import tempfile
+import unittest
+from datetime import datetime
+
+import main
+from benchmark import legacy_parse_file
+from durationcounter import write_logs
+from summaryparser import PeerCountRecord, PrefixRecord, SessionHeader, SubMOASRecord, iter_event_log, iter_summary, iter_timing, read_header
+
+START, END = datetime(2024, 1, 1), datetime(2024, 1, 1, 2)
+EVENTS = {"192.0.2.0/24": ["100", "200"], "2001:db8::/32": ["{300,301}", "400", "500"]}
+
+class SummaryParserTest(unittest.TestCase):
+	def setUp(self):
+		self.folder = tempfile.mkdtemp()
+
+	def write(self, name="summary_route-views2_20240101_0000.txt", events=EVENTS, **options):
+		filename = os.path.join(self.folder, name)
+		main.write_summary(filename, "route-views2", START, END, 1000, 3, events, **options)
+		return filename
+
+	def test_round_trip(self):
+		records = list(iter_summary(self.write()))
+		self.assertEqual(records[0], SessionHeader("route-views2", "2024-01-01 00:00:00", "2024-01-01 02:00:00", 1000, 3))
+		self.assertEqual(records[1:], [PrefixRecord(prefix, origins) for prefix, origins in EVENTS.items()])
+
+		# The positional parser the scripts used to copy agrees on IPv4 (it splits IPv6 prefixes on ':')
+		ipv4 = {"192.0.2.0/24": ["100", "200"], "198.51.100.0/24": ["{300,301}", "400"]}
+		self.assertEqual(legacy_parse_file(self.write(events=ipv4)), [(prefix, set(origins)) for prefix, origins in ipv4.items()])
+
+	def test_sub_moas_and_peer_counts(self):
+		sub_moas = [("192.0.2.128/25", ["300"], "192.0.2.0/24", ["100", "200"], "sub")]
+		peer_counts = {"192.0.2.0/24": [5, 1], "2001:db8::/32": [2, 2, 1]}
+		filename = self.write("summary_route-views2_20240101_0200.txt", sub_moas=sub_moas, peer_counts=peer_counts, peers=7)
+		header = read_header(filename)
+		self.assertEqual((header.sub_moas_count, header.peers), (1, 7))
+		self.assertEqual(list(iter_summary(filename))[1:], list(iter_summary(self.write()))[1:])  # Extra lines are skipped
+		records = list(iter_summary(filename, sub_moas=True, peer_counts=True))[1:]
+		self.assertEqual(records, [
+			PrefixRecord("192.0.2.0/24", ["100", "200"]), PeerCountRecord("192.0.2.0/24", [5, 1]),
+			PrefixRecord("2001:db8::/32", ["{300,301}", "400", "500"]), PeerCountRecord("2001:db8::/32", [2, 2, 1]),
+			SubMOASRecord(*sub_moas[0]),
+		])
+
+	def test_header_without_records(self):
+		filename = os.path.join(self.folder, "summary_route-views2_20240101_1200.txt")
+		main.write_summary(filename, "route-views2", START, END, 50, 0, {})
+		self.assertEqual(list(iter_summary(filename)), [SessionHeader("route-views2", "2024-01-01 00:00:00", "2024-01-01 02:00:00", 50, 0)])
+
+	def test_event_log(self):
+		one_session, multi_session = os.path.join(self.folder, "one_session.txt"), os.path.join(self.folder, "multi_session.txt")
+		write_logs({
+			"192.0.2.0/24": {"first_seen": "summary_a.txt", "last_seen": "summary_a.txt", "last_seen_changes": 1, "origins": {"200", "100"}},
+			"198.51.100.0/24": {"first_seen": "summary_a.txt", "last_seen": "summary_b.txt", "last_seen_changes": 2, "origins": {"300", "400"}},
+		}, one_session, multi_session)
+		self.assertEqual(list(iter_event_log(one_session)), [{"prefix": "192.0.2.0/24", "seen_in": "summary_a.txt", "origin_asns": ["100", "200"]}])
+		[event] = iter_event_log(multi_session)
+		self.assertEqual((event["prefix"], event["origin_asns"]), ("198.51.100.0/24", ["300", "400"]))
+
+	def test_timing_round_trip(self):
+		filename = os.path.join(self.folder, "timing_route-views2_20240101_0000.tsv")
+		session_start = calendar.timegm(START.timetuple())
+		rows = [
+			("192.0.2.0/24", "100", session_start + 5, session_start + 90, 3, 85, session_start + 30, 60, 1),
+			("192.0.2.0/24", "200", session_start + 30, session_start + 90, 2, 60, None, 0, 0),
+		]
+		main.write_timing(filename, START, rows)
+		self.assertEqual([tuple(record) for record in iter_timing(filename)], rows)
+
+if __name__ == "__main__":
+	unittest.main()
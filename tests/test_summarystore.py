@@ -0,0 +1,28 @@
+import os
+import tempfile
+import unittest
+
+from summarystore import SummaryStore, _load_strings, _save_strings, build_store
+
+class StringColumnTest(unittest.TestCase):
+	def test_round_trip(self):
+		folder = tempfile.mkdtemp()
+		for strings in ([], [""], ["", ""], ["a", "", "b"], ["two\nlines", "ünicode"]):
+			path = os.path.join(folder, "column.npy")
+			_save_strings(path, strings)
+			self.assertEqual(_load_strings(path), strings)
+
+class BuildStoreTest(unittest.TestCase):
+	def test_session_without_collector_keeps_the_columns_aligned(self):
+		data = tempfile.mkdtemp()
+		with open(os.path.join(data, "summary_x_20240101_0000.txt"), "w") as file:
+			file.write("Total Updates: 10\nMOAS Count: 1\n\nPrefix: 192.0.2.0/24\nOrigin ASNs: 1, 2\n")
+		store_folder = os.path.join(tempfile.mkdtemp(), "store")
+		build_store(data, store_folder)
+		store = SummaryStore(store_folder)
+		self.assertEqual(store.session_collector, [""])
+		self.assertEqual(len(store.session_collector), len(store.session_file))
+		self.assertEqual(store.prefix_table, ["192.0.2.0/24"])
+
+if __name__ == "__main__":
+	unittest.main()
@@ -0,0 +1,61 @@
+import unittest
+
+import pandas as pd
+
+from suspicionscorer import MAX_SCORE, rank_events, score_results
+
+def joined(rows):
+	"""Event rows as join_scores returns them: (event, asn, score) with score None for an ASN never analyzed."""
+	return pd.DataFrame({
+		"event": [event for event, _, _ in rows],
+		"prefix": [f"192.0.2.{event}/32" for event, _, _ in rows],
+		"seen_in": "summary_route-views2_20240101_0000.txt",
+		"year": 2024,
+		"asn": [asn for _, asn, _ in rows],
+		"peers": float("nan"),
+		"score": [float("nan") if score is None else float(score) for _, _, score in rows],
+	})
+
+class ScoreResultsTest(unittest.TestCase):
+	def test_scores_on_the_0_to_20_scale(self):
+		results = pd.DataFrame({
+			"rpki_status": ["valid", "unknown", "invalid"],
+			"rir": ["ALLOCATED", "ALLOCATED", "UNALLOCATED"],
+			"ipv4_visibility": ["visible", "visible", "unknown"],
+			"ipv6_visibility": ["visible", "invisible", "unknown"],
+		}, dtype="category")
+		self.assertEqual(score_results(results)["score"].tolist(), [0, 6, 20])
+		self.assertEqual(MAX_SCORE, 20)
+
+class RankEventsTest(unittest.TestCase):
+	def test_categories(self):
+		ranking = rank_events(joined([
+			(0, 1, 0), (0, 2, 3),     # No IPv6 on one origin: mean 1.5
+			(1, 3, 4), (1, 4, 4),     # Mean 4: still below a quarter of the maximum
+			(2, 5, 5), (2, 6, 8),     # Mean 6.5
+			(3, 7, 10), (3, 8, None), # Mean of the analyzed origin only: 10
+			(4, 9, 14), (4, 10, 20),  # Mean 17
+			(5, 11, None),            # Nothing analyzed
+		])).set_index("prefix")
+		self.assertEqual(ranking["category"].to_dict(), {
+			"192.0.2.0/32": "Likely Legitimate",
+			"192.0.2.1/32": "Likely Legitimate",
+			"192.0.2.2/32": "Potentially Suspicious",
+			"192.0.2.3/32": "Likely Malicious",
+			"192.0.2.4/32": "Likely Malicious",
+			"192.0.2.5/32": "Lacking Information",
+		})
+		self.assertEqual(ranking.loc["192.0.2.3/32", "unknown"], 1)
+
+	def test_more_origins_do_not_outrank_a_worse_one(self):
+		ranking = rank_events(joined([
+			(0, 1, 3), (0, 2, 3), (0, 3, 3), (0, 4, 3), # Total 12, max 3
+			(1, 5, 10),                                 # Total 10, max 10
+			(2, 6, None),
+			(3, 7, 10), (3, 8, 0),                       # Max 10, lower mean
+			(4, 9, 10), (4, 10, 10),                     # Same max and mean as event 1, higher total
+		]))
+		self.assertEqual(ranking["prefix"].tolist(), ["192.0.2.4/32", "192.0.2.1/32", "192.0.2.3/32", "192.0.2.0/32", "192.0.2.2/32"])
+
+if __name__ == "__main__":
+	unittest.main()